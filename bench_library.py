@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+
+"""Script for measuring the memory used to hold files and their tags, with
+   the dicts clid used before and with `clid.library`.
+
+   Tags are made up, with 20 files per album and 5 albums per artist. Each
+   file gets its own string objects, as it would if its tags were read from
+   disk.
+   Eg: python3 bench_library.py --sizes 10000 100000 1000000
+"""
+
+import gc
+import os
+import argparse
+import tracemalloc
+
+from clid import readtag
+from clid import library
+
+
+def make_files(count):
+    """Yield (abs path, readtag.TagRecord) of `count` made up files"""
+    for number in range(count):
+        album = number // 20
+        artist = album // 5
+        path = os.path.join('/home/user/Music', 'Artist {}'.format(artist),
+                            'Album {}'.format(album), '{:02} Track {}.mp3'.format(number % 20 + 1, number))
+        yield (path, readtag.TagRecord(
+            title='Track {}'.format(number), artist='Artist {}'.format(artist),
+            album='Album {}'.format(album), album_artist='Artist {}'.format(artist),
+            genre='Rock', date='{}'.format(1970 + album % 50), track='{}'.format(number % 20 + 1),
+            comment=''
+        ))
+
+
+def dicts(files):
+    """Hold `files` the way clid did before `clid.library`: basename to abs
+       path, a sorted tuple of basenames, and abs path to tags
+    """
+    tags = dict(files)
+    file_dict = {os.path.basename(path): path for path in tags}
+    return (file_dict, tuple(sorted(file_dict)), tags)
+
+
+def columns(files):
+    """Hold `files` the way `Mp3DataBase` does: a `library.Library`,
+       basename to row, and a sorted list of basenames
+    """
+    files_library = library.Library()
+    rows_by_name = {}
+    for path, record in files:
+        row = files_library.add(path)
+        files_library.set_tags(row, record)
+        rows_by_name[files_library.names[row]] = row
+    return (files_library, rows_by_name, sorted(rows_by_name))
+
+
+def memory_used(func, count):
+    """Return(int) bytes allocated by func(files) for `count` made up files,
+       which are still held once it returns
+    """
+    gc.collect()
+    tracemalloc.start()
+    held = func(make_files(count))
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del held
+    return used
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000],
+                        help='numbers of files to measure')
+    args = parser.parse_args()
+
+    for count in args.sizes:
+        for name, func in (('dicts', dicts), ('clid.library', columns)):
+            used = memory_used(func, count)
+            print('{:<14} {:>9} files {:>9.1f} MB  {:>5} bytes/file'.format(
+                name, count, used / 1024 / 1024, used // count))
+
+
+if __name__ == '__main__':
+    main()
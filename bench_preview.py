@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+
+"""Script for timing how long making previews of many files takes, with the
+   chain of str.replace calls clid used before `clid.preview` and with
+   `preview.PreviewFormat`.
+
+   Tags are made up and already read, like the tags of files in the library
+   or the tag index, so only formatting is timed.
+   Eg: python3 bench_preview.py --records 100000 --format '%a - %l - %n. %t'
+"""
+
+import time
+import argparse
+
+from clid import const
+from clid import preview
+from clid import readtag
+
+
+def make_records(count):
+    """Return(list) `count` made up readtag.TagRecord"""
+    return [readtag.TagRecord(
+        title='Track {}'.format(number), artist='Artist {}'.format(number // 100),
+        album='Album {}'.format(number // 10), album_artist='Artist {}'.format(number // 100),
+        genre='Rock', date='2003', track=str(number % 10 + 1), comment=''
+    ) for number in range(count)]
+
+
+def replace_specs(pattern):
+    """Return a function making previews the way clid did before
+       `clid.preview`: each specifier is replaced in turn
+    """
+    specs = const.FORMAT_PAT.findall(pattern)
+
+    def make_previews(records):
+        previews = []
+        for record in records:
+            made = pattern
+            for spec in specs:
+                made = made.replace(spec, getattr(record, const.FORMAT_SPECS[spec]))
+            previews.append(made)
+        return previews
+    return make_previews
+
+
+def format_each(pattern):
+    """Return a function calling `PreviewFormat.format` for each record"""
+    formatter = preview.PreviewFormat(pattern)
+    return lambda records: [formatter.format(record) for record in records]
+
+
+def format_many(pattern):
+    """Return `PreviewFormat.format_many`"""
+    return preview.PreviewFormat(pattern).format_many
+
+
+def best_time(make_previews, records, repeat):
+    """Return(float) best time in seconds of `repeat` calls of make_previews(records)"""
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        make_previews(records)
+        times.append(time.perf_counter() - started)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--records', type=int, default=100000, help='number of previews to make')
+    parser.add_argument('--format', default='%a - %l - %n. %t', help='preview format')
+    parser.add_argument('--repeat', type=int, default=5, help='times each way is run; the best is shown')
+    args = parser.parse_args()
+
+    records = make_records(args.records)
+    for name, make in (('str.replace', replace_specs), ('format', format_each),
+                       ('format_many', format_many)):
+        seconds = best_time(make(args.format), records, args.repeat)
+        print('{:<12} {:>8.1f} ms  {:>6.2f} us/preview'.format(
+            name, seconds * 1000, seconds * 1000000 / args.records))
+
+
+if __name__ == '__main__':
+    main()
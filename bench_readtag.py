@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+
+"""Script for timing how long making the preview of a file takes, reading
+   its tags with stagger(`readtag.ReadTags`, the way clid did before
+   `clid.fastid3`) and with `readtag.read_tag_record`.
+
+   Files with an ID3v2.3 tag holding a few text frames and a cover of
+   --cover-kb KiB are made in a temporary directory. The page cache is not
+   dropped, so this times parsing rather than the disk.
+   Eg: python3 bench_readtag.py --files 200 --cover-kb 4096
+"""
+
+import os
+import time
+import struct
+import shutil
+import argparse
+import tempfile
+
+from clid import preview
+from clid import readtag
+
+PREVIEW_FORMAT = '%a - %l - %n. %t'
+
+
+def frame(frame_id, data):
+    """Return(bytes) an ID3v2.3 frame"""
+    return frame_id + struct.pack('>IH', len(data), 0) + data
+
+
+def text_frame(frame_id, text):
+    """Return(bytes) an ID3v2.3 text frame holding `text` as utf-16"""
+    return frame(frame_id, b'\x01' + text.encode('utf-16') + b'\0\0')
+
+
+def make_file(path, number, cover_size):
+    """Write an mp3 file with a tag holding a cover of `cover_size` bytes,
+       followed by some(fake) audio
+    """
+    frames = b''.join([
+        text_frame(b'TIT2', 'Track {}'.format(number)),
+        text_frame(b'TPE1', 'Artist {}'.format(number // 100)),
+        text_frame(b'TALB', 'Album {}'.format(number // 10)),
+        text_frame(b'TRCK', '{}/10'.format(number % 10 + 1)),
+        text_frame(b'TYER', '2003'),
+        frame(b'APIC', b'\0image/jpeg\0\x03\0' + os.urandom(cover_size)),
+    ])
+    size = bytes((len(frames) >> shift) & 0x7f for shift in (21, 14, 7, 0))   # syncsafe
+    with open(path, 'wb') as file:
+        file.write(b'ID3\x03\x00\x00' + size + frames + b'\xff\xfb' * 4096)
+
+
+def read_with_stagger(path):
+    """Return(readtag.TagRecord) tags of `path` parsed by stagger"""
+    return readtag.ReadTags(path).record()
+
+
+def best_time(read, paths, repeat):
+    """Return(float) best time in seconds of `repeat` runs of making the
+       preview of each of `paths`, with tags read by read(path)
+    """
+    formatter = preview.PreviewFormat(PREVIEW_FORMAT)
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for path in paths:
+            formatter.format(read(path))
+        times.append(time.perf_counter() - started)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--files', type=int, default=200, help='number of files to make')
+    parser.add_argument('--cover-kb', type=int, default=2048, help='size of the cover in each file')
+    parser.add_argument('--repeat', type=int, default=3, help='times each way is run; the best is shown')
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix='clid-bench-')
+    try:
+        paths = [os.path.join(root, 'track{}.mp3'.format(number)) for number in range(args.files)]
+        for number, path in enumerate(paths):
+            make_file(path, number, args.cover_kb * 1024)
+        ways = [('read_tag_record', readtag.read_tag_record)]
+        try:
+            import stagger
+        except Exception as error:   # stagger doesn't work on every version of python
+            print('{:<16} skipped: {!r}'.format('stagger', error))
+        else:
+            ways.insert(0, ('stagger', read_with_stagger))
+        for name, read in ways:
+            seconds = best_time(read, paths, args.repeat)
+            print('{:<16} {:>8.3f} ms per preview'.format(name, seconds * 1000 / len(paths)))
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+
+"""Script for timing how long moving the cursor down the file list takes,
+   with npyscreen.MultiLine and the whole form redrawn on each move(the way
+   clid did before), and with `ClidMultiLine` drawing only lines that changed.
+
+   Each key press is what the edit loop of the list and `set_current_status`
+   do: move the cursor, draw, and refresh the screen. The list is drawn in a
+   pseudo terminal of --size, so the terminal this is run from isn't used.
+   Allocations(peak size traced by tracemalloc) are measured in a separate
+   run, as tracing slows everything down.
+   Eg: python3 bench_redraw.py --values 1000000 --keys 200
+"""
+
+import os
+import pty
+import sys
+import json
+import time
+import fcntl
+import struct
+import termios
+import argparse
+import tracemalloc
+
+import npyscreen as npy
+
+from clid import indexview
+from clid.base import forms
+from clid.base import widgets
+
+
+class Prefs():
+    """Stands in for the settings read by `ClidMultiLine`"""
+    def is_option_enabled(self, option):
+        return False
+
+
+class Previews():
+    """Stands in for the database making the status line(see `set_current_status`)"""
+    def parse_info_for_status(self, str_needing_info):
+        return str_needing_info
+
+
+class Form(npy.FormMuttActiveTraditional):
+    """Form showing the list, with a status line like `ClidMuttForm`"""
+    prefdb = Prefs()
+    maindb = Previews()
+    display_changes = forms.ClidMuttForm.display_changes
+
+
+class OldList(npy.MultiLine):
+    """The file list before `ClidMultiLine` drew only the lines that changed"""
+    def h_cursor_line_down(self, char):
+        super().h_cursor_line_down(char)
+        self.set_current_status()
+
+    def set_current_status(self):
+        self.parent.wStatus2.value = self.parent.maindb.parse_info_for_status(
+            self.values[self.cursor_line])
+        self.parent.display()
+
+
+def make_values(kind, count):
+    """Return `count` values, as a tuple(like `mp3_basenames` before it became a
+       sortedlist.SortedList) or as an indexview.IndexView of twice as many
+       values(like search results)
+    """
+    if kind == 'tuple':
+        return tuple('{:07} Artist - Title.mp3'.format(number) for number in range(count))
+    names = ['{:07} Artist - Title.mp3'.format(number) for number in range(count * 2)]
+    return indexview.IndexView(names, range(0, count * 2, 2))
+
+
+def time_keys(list_class, values, keys, traced):
+    """Return(tuple) (ms per key, peak KiB allocated by a key) of moving the
+       cursor of a `list_class` showing `values` down `keys` times
+    """
+    form = type('Form', (Form,), {'MAIN_WIDGET_CLASS': list_class})()
+    widget = form.wMain
+    widget.values = values
+    form.display()
+    widget.editing = True
+    peak = 0
+    started = time.perf_counter()
+    for _ in range(keys):
+        if traced:
+            tracemalloc.start()
+        # what the edit loop of the list does for a key press
+        widget.h_cursor_line_down(None)
+        widget.update(clear=None)
+        form.refresh()
+        if traced:
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+    elapsed = time.perf_counter() - started
+    return (elapsed * 1000 / keys, peak / 1024)
+
+
+def run_in_terminal(args, output):
+    """Run every benchmark(called in the pseudo terminal), writing results
+       to `output`(file descriptor) as a JSON list
+    """
+    results = []
+
+    def run(screen):
+        for kind in ('tuple', 'view'):
+            values = make_values(kind, args.values)
+            for name, list_class in (('MultiLine', OldList), ('ClidMultiLine', widgets.ClidMultiLine)):
+                ms_per_key, _ = time_keys(list_class, values, args.keys, traced=False)
+                _, peak = time_keys(list_class, values, min(args.keys, 20), traced=True)
+                results.append((name, kind, ms_per_key, peak))
+    npy.wrapper_basic(run)
+    os.write(output, json.dumps(results).encode())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--values', type=int, default=1000000, help='number of values in the list')
+    parser.add_argument('--keys', type=int, default=200, help='number of times the cursor is moved')
+    parser.add_argument('--size', default='100x45', help='columns x lines of the terminal')
+    args = parser.parse_args()
+    columns, lines = map(int, args.size.split('x'))
+
+    read_end, write_end = os.pipe()
+    pid, terminal = pty.fork()
+    if pid == 0:
+        os.close(read_end)
+        fcntl.ioctl(sys.stdin, termios.TIOCSWINSZ, struct.pack('HHHH', lines, columns, 0, 0))
+        os.environ.setdefault('TERM', 'xterm')
+        run_in_terminal(args, write_end)
+        os._exit(0)
+    os.close(write_end)
+    drawn = b''   # the child is blocked if what it draws isn't read
+    while True:
+        try:
+            data = os.read(terminal, 65536)
+        except OSError:   # the child has exited
+            break
+        if not data:
+            break
+        drawn = (drawn + data)[-4096:]
+    os.waitpid(pid, 0)
+    with os.fdopen(read_end) as results:
+        results = json.loads(results.read() or '[]')
+    if not results:
+        sys.exit('Benchmark failed:\n' + drawn.decode(errors='replace'))
+    for name, kind, ms_per_key, peak in results:
+        print('{:<14} {:<6} {:>8} values {:>9.2f} ms/key {:>10.1f} KiB peak'.format(
+            name, kind, args.values, ms_per_key, peak))
+
+
+if __name__ == '__main__':
+    main()
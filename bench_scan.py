@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+
+"""Script for timing how long finding mp3 files in a directory tree takes,
+   with the os.walk + glob way clid used before and with `clid.scan`.
+
+   A tree of fake mp3 files is made in a temporary directory, unless a tree
+   is given with --dir. --latency adds a delay to each listing of a
+   directory, to get an idea of how a network mount(like NFS) would behave.
+   Eg: python3 bench_scan.py --files 110000 --latency 2
+"""
+
+import os
+import glob
+import time
+import shutil
+import argparse
+import tempfile
+
+from clid import scan
+
+
+def make_tree(root, files, files_per_dir):
+    """Make `files` empty mp3 files in `root`, `files_per_dir` in each
+       directory, two levels deep
+    """
+    for number in range(files):
+        directory = os.path.join(root, 'artist{}'.format(number // (files_per_dir * 20)),
+                                 'album{}'.format(number // files_per_dir))
+        if number % files_per_dir == 0:
+            os.makedirs(directory, exist_ok=True)
+        open(os.path.join(directory, 'track{}.mp3'.format(number)), 'w').close()
+
+
+def walk_and_glob(root):
+    """List mp3 files the way clid did before `clid.scan`; followlinks is
+       False, as it never ends on a tree with a symlink cycle
+    """
+    mp3_files = []
+    for dir_tree in os.walk(root):
+        mp3_files.extend(glob.glob(os.path.join(dir_tree[0], '*.mp3')))
+    return mp3_files
+
+
+def walk_glob_and_stat(root):
+    """Like `walk_and_glob`, but with the stat data `clid.scan` also gives"""
+    return [(path, os.stat(path)) for path in walk_and_glob(root)]
+
+
+def add_latency(seconds):
+    """Make each os.scandir call(used by os.walk, glob and `clid.scan`)
+       wait `seconds` before listing the directory
+    """
+    scandir = os.scandir
+
+    def slow_scandir(*args, **kwargs):
+        time.sleep(seconds)
+        return scandir(*args, **kwargs)
+    os.scandir = slow_scandir
+
+
+def best_time(func, root, repeat):
+    """Return (best time in seconds of `repeat` calls of func(root), number of
+       files found)
+    """
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        found = len(func(root))
+        times.append(time.perf_counter() - started)
+    return (min(times), found)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--dir', help='time an existing tree instead of making one')
+    parser.add_argument('--files', type=int, default=110000, help='number of files to make')
+    parser.add_argument('--per-dir', type=int, default=20, help='number of files in each directory')
+    parser.add_argument('--latency', type=float, default=0, help='ms added to each directory listing')
+    parser.add_argument('--repeat', type=int, default=3, help='times each way is run; the best is shown')
+    args = parser.parse_args()
+
+    root = args.dir or tempfile.mkdtemp(prefix='clid-bench-')
+    try:
+        if args.dir is None:
+            make_tree(root, args.files, args.per_dir)
+        if args.latency:
+            add_latency(args.latency / 1000)
+        ways = [('os.walk + glob', walk_and_glob),
+                ('os.walk + glob + stat', walk_glob_and_stat)]
+        for workers in (1, scan.SCAN_WORKERS):
+            ways.append(('clid.scan, {} worker(s)'.format(workers),
+                         lambda root, workers=workers: list(scan.scan_mp3_files(root, workers))))
+        for name, func in ways:
+            seconds, found = best_time(func, root, args.repeat)
+            print('{:<24} {:>8.2f} s  {} files'.format(name, seconds, found))
+    finally:
+        if args.dir is None:
+            shutil.rmtree(root)
+
+
+if __name__ == '__main__':
+    main()
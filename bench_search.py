@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+
+"""Script for timing each keystroke of the live search, scanning every
+   basename the way clid did before `clid.searchindex` and with
+   `searchindex.SearchIndex`. With --fuzzy, the fuzzy search mode is
+   timed instead, against scoring and sorting every name that matches.
+
+   A query is typed a char at a time and then erased with backspace; each
+   step is a search. Names are made up from a few dozen words, so words
+   repeat like they do in a music library.
+   Eg: python3 bench_search.py --sizes 10000 100000 1000000 --query 'love song'
+       python3 bench_search.py --fuzzy --query 'lvsng'
+"""
+
+import time
+import random
+import argparse
+
+from clid import searchindex
+
+WORDS = ('love song night day heart fire rain blue girl boy dance dream time '
+         'life world light dark home road sky sun moon star river sea wind '
+         'gold baby city street summer winter angel ghost black white red '
+         'electric sweet wild young old lonely crazy happy sad forever').split()
+
+
+def make_names(count):
+    """Return(list) `count` made up basenames, sorted like `mp3_basenames`"""
+    pick = random.Random(0).choice
+    names = ['{} {} - {} {} {} {}.mp3'.format(pick(WORDS).title(), pick(WORDS).title(),
+                                               pick(WORDS), pick(WORDS), pick(WORDS), number)
+             for number in range(count)]
+    return sorted(names)
+
+
+def keystrokes(query):
+    """Return(list) the search after each keystroke of typing `query` and
+       then erasing it
+    """
+    typed = [query[:end] for end in range(1, len(query) + 1)]
+    return typed + typed[-2::-1]
+
+
+def scan_all(names):
+    """Return a search function which checks every name the way clid did
+       before `clid.searchindex`
+    """
+    def search(query):
+        query = query.lower()
+        return [index for index, name in enumerate(names) if query in name.lower()]
+    return search
+
+
+def search_index(names):
+    """Return the search function of a `searchindex.SearchIndex` of `names`"""
+    return searchindex.SearchIndex(names).search
+
+
+def score_all(names):
+    """Return a fuzzy search function which scores every name and sorts all
+       of them that match, keeping the best `searchindex.FUZZY_RESULTS`
+    """
+    folded = [searchindex.fold(name) for name in names]
+
+    def search(query):
+        key = searchindex.fold(query)
+        scored = []
+        for index, name in enumerate(folded):
+            score = searchindex.fuzzy_score(key, name)
+            if score is not None:
+                scored.append((-score, len(name), index))
+        scored.sort()
+        return [index for _, _, index in scored[:searchindex.FUZZY_RESULTS]]
+    return search
+
+
+def fuzzy_search_index(names):
+    """Return the fuzzy search function of a `searchindex.SearchIndex` of `names`"""
+    return searchindex.SearchIndex(names).fuzzy_search
+
+
+def time_keystrokes(search, query):
+    """Return(tuple) (mean, max) time in seconds of a search for each of
+       `keystrokes(query)`
+    """
+    times = []
+    for typed in keystrokes(query):
+        started = time.perf_counter()
+        search(typed)
+        times.append(time.perf_counter() - started)
+    return (sum(times) / len(times), max(times))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000],
+                        help='numbers of names to search')
+    parser.add_argument('--query', default='love song', help='search that is typed')
+    parser.add_argument('--fuzzy', action='store_true', help='time the fuzzy search mode')
+    args = parser.parse_args()
+
+    if args.fuzzy:
+        ways = (('score all', score_all), ('SearchIndex', fuzzy_search_index))
+    else:
+        ways = (('scan all', scan_all), ('SearchIndex', search_index))
+    for count in args.sizes:
+        names = make_names(count)
+        for name, make_search in ways:
+            started = time.perf_counter()
+            search = make_search(names)
+            built = time.perf_counter() - started
+            mean, worst = time_keystrokes(search, args.query)
+            print('{:<12} {:>8} names  built in {:>6.2f} s  {:>8.2f} ms/key  {:>8.2f} ms max'.format(
+                name, count, built, mean * 1000, worst * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -1 +1,3 @@
 #!/usr/bin/env python3
+
+from . import trace   # first, so that imports are timed by `clid --startup-trace`
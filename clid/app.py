@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+
+"""The curses interface of clid, made of the forms in `forms`"""
+
+import curses
+
+import npyscreen
+
+from . import util
+from . import trace
+from . import forms
+from . import database
+
+
+class ClidApp(npyscreen.NPSAppManaged):
+    """Class used by npyscreen to manage forms.
+
+       Attributes:
+            current_files(list):
+                List of abs path of files selected for editing
+            mp3db(database.Mp3DataBase):
+                Used to manage mp3 files. Handles discovering files, storing a
+                metadata cache, etc
+            prefdb(database.PreferencesDataBase):
+                Used to manage preferences. Handles validating new settings, etc
+            browsedb(database.BrowseDataBase):
+                Used to manage the tree of directories shown by the browser
+            current_field(int):
+                Used to automatically jump to last selected tag field when
+                editing tags
+            files_view(str):
+                Name of the form in which files to be edited were selected;
+                shown again after editing
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.current_files = []   # changed when a file is selected in main screen
+        self.current_field = 0   # remember last edited tag field
+        self.files_view = 'MAIN'
+        # databases for managing mp3 files and preferences
+        self.prefdb = database.PreferencesDataBase(app=self)
+        trace.mark('preferences')
+        self.mp3db = database.Mp3DataBase(app=self)
+        self.browsedb = database.BrowseDataBase(app=self)
+        trace.mark('databases')
+
+    def set_current_files(self, files):
+        """Set `current_files` attribute"""
+        self.current_files = [self.mp3db.get_abs_path(file) for file in files]
+
+    def show_notif(self, title, msg):
+        """Notify the user of something, either using the command line or a popup"""
+        self._THISFORM.show_notif(title, msg)
+
+    def quit(self, *args, **kwargs):
+        """Exit the app, after writing tags queued by `write_behind`. Files
+           whose tags couldn't be written are listed before exiting.
+        """
+        pending = self.mp3db.pending_writes()
+        if pending:
+            npyscreen.notify(message='Saving tags of {} file(s)...'.format(pending),
+                             title='Please wait', form_color=util.get_color('Info'))
+        self.mp3db.stop_scanning()
+        self.mp3db.stop_indexing()
+        failed = self.mp3db.flush_writes()
+        if failed:
+            npyscreen.notify_confirm(message=util.describe_failed_writes(failed),
+                                     title='Error', form_color=util.get_color('Error'))
+        exit()
+
+    def onStart(self):
+        self.configure_mouse_support()
+
+        npyscreen.setTheme(npyscreen.Themes.ElegantTheme)
+        self.addForm("MAIN", forms.MainView)
+        self.addForm("SETTINGS", forms.PreferencesView)
+        self.addForm("BROWSE", forms.BrowseView)
+        if self.prefdb.is_option_enabled('browse_mode'):
+            self.setNextForm("BROWSE")
+        # addFormClass to create a new instance every time
+        self.addFormClass("MULTIEDIT", forms.MultiEditMetaView)
+        self.addFormClass("SINGLEEDIT", forms.SingleEditMetaView)
+        trace.mark('forms')
+
+    def configure_mouse_support(self):
+        """Configure mouse to be enabled or disabled"""
+        if self.prefdb.is_option_enabled('mouse_support') is True:
+            curses.mousemask(curses.ALL_MOUSE_EVENTS)
+        else:
+            curses.mousemask(0)   # do not listen for mouse events
+
+
+def run():
+    """Launch the app"""
+    ClidApp().run()
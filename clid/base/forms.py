@@ -2,13 +2,15 @@
 
 """Base classes for Forms"""
 
-import os
+import time
+import curses
 
 import npyscreen as npy
 
 from clid import base
 from clid import util
-from clid import readtag
+from clid import version
+from clid import tagwriter
 
 
 class ClidForm(npy.FormBaseNew):
@@ -25,6 +27,13 @@ class ClidForm(npy.FormBaseNew):
         """Load user defined keybindings"""
         pass
 
+    def display(self, clear=False):
+        """Erase the screen and draw every widget"""
+        for widget in self._widgets__:
+            if isinstance(widget, base.ClidMultiLine):
+                widget.reset_display_cache()   # its lines are erased too
+        super().display(clear=clear)
+
 
 class ClidMuttForm(ClidForm, npy.FormMuttActiveTraditional):
     """Forms with a traditional mutt-like interface - content first, status line
@@ -38,6 +47,9 @@ class ClidMuttForm(ClidForm, npy.FormMuttActiveTraditional):
         ...
         ]
     """
+    # shown in the upper status line by `show_background_work`
+    TITLE = 'clid v' + version.VERSION + ' '
+
     def __init__(self, parentApp, *args, **kwargs):
         super().__init__(parentApp=parentApp, *args, **kwargs)
         super(ClidForm, self).__init__(parentApp=parentApp, *args, **kwargs)
@@ -46,12 +58,44 @@ class ClidMuttForm(ClidForm, npy.FormMuttActiveTraditional):
         """Show notification through the command line"""
         self.wCommand.show_notif(title, msg)
 
+    def show_background_work(self):
+        """Show `TITLE` in the upper status line, along with the number of
+           files found while `music_dir` is listed, the number of files waiting
+           to be written if `write_behind` is enabled, and the progress of
+           reading tags of files which haven't been indexed
+        """
+        status = self.TITLE
+        found = self.mp3db.scanning_progress()
+        if found is not None:
+            status += '- scanning... {} files '.format(found)
+        progress = self.mp3db.indexing_progress()
+        if progress is not None:
+            status += '- reading tags {}/{}({:.0f} files/s) '.format(*progress)
+        pending = self.mp3db.pending_writes()
+        if pending:
+            status += '- writing {} file(s) '.format(pending)
+        if status != self.wStatus1.value:
+            self.wStatus1.value = status
+            self.wStatus1.display()   # only the status line changed
+
+    def display_changes(self):
+        """Draw the lower status line, and lines of `wMain` which changed since
+           they were last drawn. Much cheaper than `display`, which erases the
+           screen and draws everything again; used when the cursor moves.
+        """
+        # the status line is drawn over the line separating it from `wMain`
+        self.curses_pad.hline(self.wStatus2.rely, 0, curses.ACS_HLINE, self.columns - 1)
+        self.wStatus2.update(clear=False)
+        self.wMain.update(clear=None)
+        self.refresh()
+
     def load_keys(self):
         get_key = self.prefdb.get_key
         self.handlers.update({
-            get_key('quit'):         lambda *a, **k: exit(),
+            get_key('quit'):         self.parentApp.quit,
             get_key('preferences'):  self.h_switch_to_settings,
             get_key('files_view'):   self.h_switch_to_files_view,
+            get_key('browse_view'):  self.h_switch_to_browser,
         })
         self.wMain.load_keys()
 
@@ -63,6 +107,10 @@ class ClidMuttForm(ClidForm, npy.FormMuttActiveTraditional):
         """Go to Main View"""
         self.parentApp.switchForm("MAIN")
 
+    def h_switch_to_browser(self, char):
+        """Go to Browse View"""
+        self.parentApp.switchForm("BROWSE")
+
     @property
     def maindb(self):
         """The main db(prefdb, mp3db, etc) the form will be interacting with"""
@@ -93,6 +141,8 @@ class ClidEditMetaView(ClidActionForm):
     """
     OK_BUTTON_TEXT = 'Save'
     PRESERVE_SELECTED_WIDGET_DEFAULT = True   # to remember last position
+    # seconds between updates of the progress shown while saving tags
+    PROGRESS_INTERVAL = 0.2
 
     def __init__(self, *args, **kwags):
         super().__init__(*args, **kwags)
@@ -154,11 +204,11 @@ class ClidEditMetaView(ClidActionForm):
         self.on_cancel()
 
     def switch_to_main(self):
-        """Switch to main view. Used by `on_cancel` (at once) and
-           `on_ok` (after saving tags).
+        """Switch to the view the files were selected in. Used by `on_cancel`
+           (at once) and `on_ok` (after saving tags).
         """
         self.editing = False
-        self.parentApp.switchForm("MAIN")
+        self.parentApp.switchForm(self.parentApp.files_view)
 
     def get_fields_to_save(self):
         """Return a dict with name of tag as key and value of textbox
@@ -187,24 +237,57 @@ class ClidEditMetaView(ClidActionForm):
         # FIXME: values of tags are reset to initial when ok is pressed(no prob
         # with ^S)
 
-        tag_fields = self.get_fields_to_save().items()
-        for mp3 in self.files:
-            meta = readtag.ReadTags(mp3)
-            for tag, value in tag_fields:
-                setattr(meta, tag, value)
-            meta.write(mp3)
-            # update meta cache
-            self.mp3db.parse_info_for_status(
-                str_needing_info=os.path.basename(mp3), force=True
-            )
+        tags = self.get_fields_to_save()
+        main_form = self.parentApp.getForm(self.parentApp.files_view)
+        if self.prefdb.is_option_enabled('write_behind'):
+            self.mp3db.queue_tags(self.files, tags)
+            main_form.show_background_work()
+            failed = []
+        else:
+            failed, written = self.save_tags(tags)
+            if failed:
+                self.show_notif(title='Error', msg=util.describe_failed_writes(failed))
+            main_form.show_notif(title='Info', msg='Saved tags of {} file(s); {} written'.format(
+                len(self.files) - len(failed), util.format_size(written)
+            ))
 
         # show the new tags of file under cursor in the status line
-        self.parentApp.getForm("MAIN").wMain.set_current_status()
-        self.do_after_saving_tags()
+        main_form.wMain.set_current_status()
+        if not failed:
+            self.do_after_saving_tags()
 
         self.parentApp.current_field = self._get_tbox_to_remember()
         self.switch_to_main()
 
+    def save_tags(self, tags):
+        """Write `tags` to all files in parallel, showing the progress if it
+           takes a while. Stored tags of the files are updated with the values
+           that were written, so that they don't have to be read again.
+           Args:
+                tags(dict): name of tag as key and its new value as value
+           Returns:
+                tuple: (failed, written) where failed is a list of
+                    tagwriter.WriteResult of files whose tags couldn't be saved,
+                    and written is the total number of bytes written to disk
+        """
+        failed = []
+        written = 0
+        last_shown = time.monotonic()   # no progress is shown for quick saves
+        results = tagwriter.write_tags_to_files(
+            self.files, tags, padding=int(self.prefdb.get_pref('tag_padding'))
+        )
+        for done, result in enumerate(results, start=1):
+            if result.error is None:
+                self.mp3db.set_tag_record(result.path, result.record)
+                written += result.written
+            else:
+                failed.append(result)
+            if time.monotonic() - last_shown > self.PROGRESS_INTERVAL:
+                npy.notify(message='Saved {} of {} files'.format(done, len(self.files)),
+                           title='Saving tags', form_color=util.get_color('Info'))
+                last_shown = time.monotonic()
+        return (failed, written)
+
     def on_cancel(self):
         """Switch to main view at once without saving"""
         self.parentApp.current_field = self._get_tbox_to_remember()
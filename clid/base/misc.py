@@ -3,15 +3,29 @@
 """Base classes for miscellaneous objects"""
 
 import re
+import functools
 
 import npyscreen as npy
 
+from clid import indexview
+
+
+@functools.lru_cache(maxsize=32)
+def compile_regex(pattern):
+    """Return compiled `pattern`. Recent patterns are kept, so that a live
+       search doesn't compile them again on every keystroke.
+       Raises:
+            re.error: if `pattern` is invalid
+    """
+    return re.compile(pattern)
+
 
 class ClidActionController(npy.ActionControllerSimple):
     """Base class for the command line at the bottom of the screen"""
 
     def create(self):
-        self.add_action('^:q(uit)?$', lambda *args, **kwargs: exit(), live=False)
+        self.add_action('^:q(uit)?$', lambda *args, **kwargs: self.parent.parentApp.quit(),
+                        live=False)
         self.add_action('^:bind .+', function=self.change_key, live=False)
         self.add_action('^:set .+', function=self.change_setting, live=False)
 
@@ -36,6 +50,8 @@ class ClidActionController(npy.ActionControllerSimple):
 
 class ClidDataBase():
     """General structure of databases used by clid"""
+    # number of items searched at a time by `iter_filtered_values`
+    SEARCH_CHUNK = 10000
 
     def __init__(self, app):
         self.app = app
@@ -46,19 +62,40 @@ class ClidDataBase():
 
     def get_filtered_values(self, search):
         """Search the list of items returned by `get_values_to_display` for the
-           substring `search`
+           substring `search`. Returns a sequence(see `indexview.join`).
         """
+        return indexview.join(self.iter_filtered_values(search))
+
+    def iter_filtered_values(self, search):
+        """Yield indexview.IndexView of items(see `get_filtered_values`)
+           matching `search`, checking `SEARCH_CHUNK` items at a time, so that
+           a search can be stopped between chunks
+        """
+        values = self.get_values_to_display()
         if search == '':
-            return self.get_values_to_display()
+            yield values
+            return
         search = search.lower()
         if self.app.prefdb.is_option_enabled('use_regex_in_search'):
             try:
-                # check for invalid regex
-                re.compile(search)
-                return [item for item in self.get_values_to_display() if re.search(search, item)]
-            except re.error:
-                return self.get_values_to_display()
-        return [item for item in self.get_values_to_display() if search in item.lower()]
+                matches = compile_regex(search).search
+            except re.error:   # invalid regex
+                yield values
+                return
+        else:
+            matches = lambda item: search in item.lower()
+        chunk = self.SEARCH_CHUNK
+        for start in range(0, len(values), chunk):
+            yield self.make_view(values, [
+                index for index, item in enumerate(values[start:start + chunk], start)
+                if matches(item)
+            ])
+
+    def make_view(self, values, indexes):
+        """Return(indexview.IndexView) items at `indexes` in `values`, as
+           yielded by `iter_filtered_values`
+        """
+        return indexview.IndexView(values, indexes)
 
     def parse_info_for_status(self, str_needing_info, *args, **kwargs):
         """Return a string that will be displayed on the status line, providing
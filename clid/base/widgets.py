@@ -190,7 +190,10 @@ class ClidCommandLine(npy.fmFormMuttActive.TextCommandBoxTraditional, ClidTextfi
 
 
 class ClidMultiLine(npy.MultiLine, ClidWidget):
-    """MultiLine class used for showing files and prefs"""
+    """MultiLine class used for showing files and prefs. `values` can be any
+       sequence, like an indexview.IndexView of search results; only the
+       values on the screen are looked at when drawing.
+    """
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.slow_scroll = self.parent.prefdb.is_option_enabled('smooth_scroll')
@@ -210,13 +213,117 @@ class ClidMultiLine(npy.MultiLine, ClidWidget):
             get_key('goto_top'): self.h_cursor_beginning,
         })
 
+    def make_contained_widgets(self):
+        super().make_contained_widgets()
+        self.reset_display_cache()
+
+    def reset_display_cache(self):
+        """Forget what was drawn, so that every line is drawn by the next
+           `update`. Called when the screen has been erased.
+        """
+        super().reset_display_cache()
+        # what each line shows; see `update`
+        self._drawn_lines = [None] * len(self._my_widgets)
+
+    def get_filtered_indexes(self, force_remake_cache=False):
+        """npyscreen copies and compares all of `values` here on every `update`
+           to find values matching its own filter; skip it when there is none
+        """
+        if not self._filter:
+            return []
+        return super().get_filtered_indexes(force_remake_cache=True)
+
+    def update(self, clear=True):
+        """Draw the values on the screen. Unlike npyscreen.MultiLine.update,
+           which copies and compares all of `values` every time, only the values
+           on the screen are looked at, and lines that look the same as when
+           they were last drawn are skipped.
+           Args:
+                clear(bool): Whether to blank the widget and draw every line
+        """
+        if self.hidden:
+            if clear:
+                self.clear()
+            return False
+        if self.values is None:
+            self.values = []
+
+        display_length = len(self._my_widgets)
+        self._filtered_values_cache = self.get_filtered_indexes()
+        show_cursor = self.editing or self.always_show_cursor
+        if show_cursor:
+            self._scroll_to_cursor(display_length)
+        if clear:
+            self.clear()
+            self.reset_display_cache()
+
+        self._before_print_lines()
+        last = display_length - 1
+        for offset, line in enumerate(self._my_widgets):
+            indexer = self.start_display_at + offset
+            if offset == last and indexer + 1 < len(self.values):
+                drawn = npy.wgmultiline.MORE_LABEL   # there are more values below
+            else:
+                self._print_line(line, indexer)
+                self.set_is_line_cursor(line, show_cursor and indexer == self.cursor_line)
+                drawn = (line.value, line.hidden, line.important, line.show_bold,
+                         line.highlight, line.color)
+            if drawn == self._drawn_lines[offset]:
+                continue
+            self._drawn_lines[offset] = drawn
+            if drawn is npy.wgmultiline.MORE_LABEL:
+                line.name = line.task = npy.wgmultiline.MORE_LABEL
+                line.clear()
+                if self.do_colors():
+                    self.parent.curses_pad.addstr(
+                        self.rely + self.height - 1, self.relx, npy.wgmultiline.MORE_LABEL,
+                        self.parent.theme_manager.findPair(self, 'CONTROL')
+                    )
+                else:
+                    self.parent.curses_pad.addstr(self.rely + self.height - 1, self.relx,
+                                                  npy.wgmultiline.MORE_LABEL)
+            else:
+                line.task = 'PRINTLINE'
+                line.update(clear=True)
+
+        self._last_start_display_at = self.start_display_at
+        self._last_cursor_line = self.cursor_line
+        # the cursor can't be on the '-more-' line; scroll down and draw again
+        offset = self.cursor_line - self.start_display_at
+        if show_cursor and offset == last and \
+                self._drawn_lines[offset] is npy.wgmultiline.MORE_LABEL:
+            if self.slow_scroll:
+                self.start_display_at += 1
+            else:
+                self.start_display_at = self.cursor_line
+            self.update(clear=None)
+
+    def _scroll_to_cursor(self, display_length):
+        """Keep the cursor within `values`, and scroll so that it is on the
+           screen(same as npyscreen.MultiLine.update)
+        """
+        if self.cursor_line < 0:
+            self.cursor_line = 0
+        if self.cursor_line > len(self.values) - 1:
+            self.cursor_line = len(self.values) - 1
+        if self.slow_scroll:
+            if self.cursor_line > self.start_display_at + display_length - 1:
+                self.start_display_at = self.cursor_line - (display_length - 1)
+            if self.cursor_line < self.start_display_at:
+                self.start_display_at = self.cursor_line
+        else:
+            if self.cursor_line > self.start_display_at + (display_length - 2):
+                self.start_display_at = self.cursor_line
+            if self.cursor_line < self.start_display_at:
+                self.start_display_at = max(self.cursor_line - (display_length - 2), 0)
+
     def set_current_status(self, *args, **kwargs):
         """Show additional information about the thing under the cursor"""
         data = self.parent.maindb.parse_info_for_status(
             str_needing_info=self.get_selected(), *args, **kwargs
             )
         self.parent.wStatus2.value = data
-        self.parent.display()
+        self.parent.display_changes()
 
     def get_selected(self):
         """Return the item under the cursor line"""
@@ -0,0 +1,375 @@
+#!/usr/bin/env python3
+
+"""Commands for using clid without its interface, like from scripts or cron.
+   Only the parts of clid which don't need curses(reading and writing tags,
+   the tag index, queries) are imported, so these work without a terminal.
+
+        clid                                start the app
+        clid show [-f FORMAT] [PATH...]     print tags of files
+        clid tag --set TAG=VALUE [PATH...]  change tags of files
+        clid index                          read tags of new or changed files
+        clid export [-o FILE] [PATH...]     save tags of files as JSON Lines or CSV
+        clid import FILE                    write tags changed in an exported file
+
+   `show`, `tag` and `export` take files and directories(searched
+   recursively), or all of `music_dir` if none are given, and `--where QUERY`
+   to use only the files matching a query(see `query`), like
+   `--where 'artist:radiohead'`.
+   Files are handled `BATCH_SIZE` at a time as directories are listed, so
+   memory used doesn't grow with the number of files. Files of a directory
+   are sorted by name; directories come in the order they are listed.
+"""
+
+import os
+import csv
+import sys
+import json
+import time
+import argparse
+import itertools
+import contextlib
+
+import configobj
+
+from . import util
+from . import scan
+from . import const
+from . import trace
+from . import query
+from . import library
+from . import preview
+from . import readtag
+from . import indexbuild
+from . import tagindex
+from . import tagwriter
+from . import validators
+
+# files are written in worker processes when there are at least these many
+# (see indexbuild.MIN_FILES for reading)
+PROCESS_THRESHOLD = 256
+# number of files whose tags are looked up(and read if necessary) at a time
+BATCH_SIZE = 2048
+
+EXPORT_FORMATS = ('jsonl', 'csv')
+# columns of an exported file; `import` takes files with only some of the tags
+EXPORT_FIELDS = ('path',) + const.TAG_NAMES
+
+
+def iter_files(paths):
+    """Yield (abs path, os.stat_result) of mp3 files in `paths`(files, or
+       directories which are searched recursively), a directory at a time
+    """
+    for path in paths:
+        path = os.path.abspath(path)
+        if os.path.isdir(path):
+            for mp3_files in scan.scan_mp3_dirs(path):
+                yield from sorted(mp3_files, key=lambda item: item[0])
+        else:
+            yield (path, os.stat(path))
+
+
+def file_format(filename, given=None):
+    """Return the format('jsonl' or 'csv') of an exported file; `given` if
+       it was given on the command line, else guessed from `filename`
+    """
+    if given is not None:
+        return given
+    return 'csv' if filename.lower().endswith('.csv') else 'jsonl'
+
+
+class Cli():
+    """Runs a command given on the command line.
+       Attributes:
+            args(argparse.Namespace): Parsed command line arguments
+            settings(configobj.Section): General section of `clid.ini`
+            music_dir(str): abs path of `music_dir`
+            tag_index(tagindex.TagIndex): Same index of tags used by the app
+            files_read(int): Number of files whose tags have been read(instead
+                of being taken from `tag_index`)
+    """
+    def __init__(self, args):
+        self.args = args
+        self.settings = configobj.ConfigObj(const.CONFIG_DIR + 'clid.ini')['General']
+        self.music_dir = os.path.abspath(os.path.expanduser(self.settings['music_dir']))
+        self.tag_index = tagindex.TagIndex()
+        self.failed = False   # set when a file couldn't be read or written
+        self.files_read = 0
+        self._pool = None   # processes reading tags; started when first needed
+
+    def read_tags(self, stats):
+        """Read and index tags of files in `stats`(dict of abs path and
+           os.stat_result), reporting files which can't be read. The same
+           pool of processes is used for every batch of files.
+           Returns:
+                dict: abs path as key and readtag.TagRecord as value
+        """
+        paths = list(stats)
+        if len(paths) >= indexbuild.MIN_FILES and self._pool is None:
+            self._pool = util.process_pool(self.args.jobs)
+        records, entries = {}, []
+        for path, stat, record, error in indexbuild.read_tags(paths, pool=self._pool):
+            if record is None:
+                self.report('{}: {}'.format(path, error))
+            else:
+                records[path] = record
+                entries.append((path, stat, record))
+        self.tag_index.put_many(entries)
+        self.files_read += len(paths)
+        return records
+
+    def iter_tags(self, files):
+        """Yield (abs path, readtag.TagRecord) of `files`(iterable of (abs path,
+           os.stat_result)), in order, `BATCH_SIZE` at a time. Tags are taken
+           from `tag_index`, and read(see `read_tags`) if the file isn't indexed
+           or has changed since. Files which can't be read are left out.
+        """
+        for batch in util.batches(files, BATCH_SIZE):
+            stats = dict(batch)
+            records = self.tag_index.get_many(stats)
+            records.update(self.read_tags({path: stat for path, stat in stats.items()
+                                           if path not in records}))
+            for path, _ in batch:
+                if path in records:
+                    yield (path, records[path])
+
+    def iter_selected(self):
+        """Yield (abs path, readtag.TagRecord) like `iter_tags`, of files given
+           on the command line(or all files in `music_dir`) which match `--where`
+           Raises:
+                query.InvalidQuery
+        """
+        tags = self.iter_tags(iter_files(self.args.paths or [self.music_dir]))
+        if not self.args.where:
+            yield from tags
+            return
+        query.parse(self.args.where)   # fail before reading files
+        # library.Library stores the tags as queries need them; a term
+        # matches each file on its own, so a batch is searched at a time
+        for batch in util.batches(tags, BATCH_SIZE):
+            files = library.Library()
+            for path, record in batch:
+                files.set_tags(files.add(path), record)
+            for row in query.compile_query(self.args.where, files)(files.rows()):
+                yield (files.path(row), files.get_tags(row))
+
+    def report(self, message):
+        """Print `message` about a file which couldn't be used"""
+        self.failed = True
+        print(message, file=sys.stderr)
+
+    def run(self):
+        """Run the command.
+           Returns:
+                int: exit status; 1 if some files couldn't be read or written
+        """
+        try:
+            getattr(self, 'run_' + self.args.command)()
+        finally:
+            if self._pool is not None:
+                self._pool.shutdown()
+        return 1 if self.failed else 0
+
+    def run_show(self):
+        """Print the tags of each file in `--format`"""
+        preview_format = self.args.format or self.settings['preview_format']
+        validators.preview_format(preview_format)
+        formatter = preview.PreviewFormat(preview_format)
+        for batch in util.batches(self.iter_selected(), BATCH_SIZE):
+            print('\n'.join(formatter.format_many(record for _, record in batch)))
+
+    def run_tag(self):
+        """Set tags given with `--set` in each file, skipping files which
+           already have them
+        """
+        tags = {}
+        for tag in self.args.set:
+            name, _, value = tag.partition('=')
+            validators.tag(name, value)
+            tags[name] = value
+        self.save_jobs((path, tags) for path, record in self.iter_selected()
+                       if readtag.changed_tags(record, tags))
+
+    def save_jobs(self, jobs):
+        """Write tags of `jobs`(iterable of (abs path, tags), see
+           `tagwriter.write_tags_to_many_files`) as they are taken, and index
+           them(see `save_results`). Files are written in processes only if
+           there are at least `PROCESS_THRESHOLD` of them.
+        """
+        first = list(itertools.islice(jobs, PROCESS_THRESHOLD))
+        self.save_results(tagwriter.write_tags_to_many_files(
+            itertools.chain(first, jobs), padding=int(self.settings['tag_padding']),
+            workers=self.args.jobs, processes=len(first) >= PROCESS_THRESHOLD
+        ))
+
+    def save_results(self, results):
+        """Index the tags of files written(see `tagwriter.WriteResult` of
+           `results`), reporting files that couldn't be written
+        """
+        saved = 0
+        for batch in util.batches(results, BATCH_SIZE):
+            entries = []
+            for result in batch:
+                if result.error is None:
+                    entries.append((result.path, os.stat(result.path), result.record))
+                else:
+                    self.report(util.describe_failed_writes([result]))
+            self.tag_index.put_many(entries)
+            saved += len(entries)
+        print('Saved tags of {} file(s)'.format(saved))
+
+    def run_index(self):
+        """Index tags of all files in `music_dir`, reading only files which are
+           new or have changed since they were indexed
+        """
+        self.tag_index.forget_missing(os.path.join(self.music_dir, ''))
+        started = time.monotonic()
+        found = sum(1 for _ in self.iter_tags(scan.scan_mp3_files(self.music_dir)))
+        elapsed = time.monotonic() - started
+        print('Indexed {} file(s); read {} new or changed file(s) in {:.1f} s({:.0f} files/s)'.format(
+            found, self.files_read, elapsed, self.files_read / max(elapsed, 0.001)))
+
+    def run_export(self):
+        """Write path and tags of each file to `--output` as JSON Lines(an
+           object on each line) or CSV
+        """
+        output_format = file_format(self.args.output, self.args.format)
+        if self.args.output == '-':
+            output = contextlib.nullcontext(sys.stdout)
+        else:
+            output = open(self.args.output, 'w', newline='', encoding='utf-8')
+        with output as output:
+            if output_format == 'csv':
+                writer = csv.writer(output)
+                writer.writerow(EXPORT_FIELDS)
+                for path, record in self.iter_selected():
+                    writer.writerow((path, *record))
+            else:
+                for path, record in self.iter_selected():
+                    output.write(json.dumps(dict(zip(EXPORT_FIELDS, (path, *record))),
+                                            ensure_ascii=False) + '\n')
+
+    def run_import(self):
+        """Write tags from a file made by `export`(maybe with only some of the
+           columns), to the files whose tags are different
+        """
+        input_format = file_format(self.args.input, self.args.format)
+        if self.args.input == '-':
+            file = contextlib.nullcontext(sys.stdin)
+        else:
+            file = open(self.args.input, newline='', encoding='utf-8')
+        with file as file:
+            # files are read, compared and written as rows are read from `file`
+            self.save_jobs(self.iter_changes(self.iter_rows(file, input_format)))
+
+    def iter_rows(self, file, input_format):
+        """Yield (abs path, tags) of each row of `file`, where tags is a dict of
+           name of tag and value. Invalid rows are reported and skipped.
+        """
+        if input_format == 'csv':
+            reader = csv.DictReader(file)
+            rows = ((reader.line_num, row) for row in reader)
+        else:
+            rows = ((number, line) for number, line in enumerate(file, start=1) if line.strip())
+        for number, row in rows:
+            try:
+                if input_format == 'jsonl':
+                    row = json.loads(row)
+                    if not isinstance(row, dict):
+                        raise ValueError('expected an object')
+                path = row.pop('path', None)
+                if not path:
+                    raise ValueError('path is missing')
+                tags = {tag: str(value) for tag, value in row.items() if value is not None}
+                for tag, value in tags.items():
+                    validators.tag(tag, value)
+            except (ValueError, validators.ValidationError) as error:
+                self.report('{}:{}: {}'.format(self.args.input, number, error))
+                continue
+            yield (os.path.abspath(path), tags)
+
+    def iter_changes(self, rows):
+        """Yield (abs path, tags) of `rows`(see `iter_rows`) with only the tags
+           which are different from those of the file
+        """
+        for batch in util.batches(rows, BATCH_SIZE):
+            files = []
+            for path, _ in batch:
+                try:
+                    files.append((path, os.stat(path)))
+                except OSError as error:
+                    self.report('{}: {}'.format(path, error.strerror))
+            records = dict(self.iter_tags(files))
+            for path, tags in batch:
+                if path in records:
+                    changes = readtag.changed_tags(records[path], tags)
+                    if changes:
+                        yield (path, changes)
+
+
+def make_parser():
+    """Return(argparse.ArgumentParser) parser of the arguments of clid"""
+    parser = argparse.ArgumentParser(
+        prog='clid', description='Edit ID3 tags of mp3 files. Starts the app if no command is given.'
+    )
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help='number of processes used for large batches of files')
+    parser.add_argument('--startup-trace', action='store_true',
+                        help='show the time taken by each phase of starting the app, after it is closed; '
+                             'not with a command')
+    commands = parser.add_subparsers(dest='command', metavar='command')
+
+    def add_files_arguments(command):
+        command.add_argument('paths', nargs='*', metavar='PATH',
+                             help='mp3 files or directories; music_dir if none are given')
+        command.add_argument('-w', '--where', metavar='QUERY',
+                             help="only files matching QUERY, like 'artist:radiohead year:>=1997'")
+
+    show = commands.add_parser('show', help='print tags of files')
+    show.add_argument('-f', '--format', help="like '%%a - %%t'; preview_format by default")
+    add_files_arguments(show)
+
+    tag = commands.add_parser('tag', help='change tags of files')
+    tag.add_argument('-s', '--set', action='append', required=True, metavar='TAG=VALUE',
+                     help='tag to be changed, like artist=Radiohead; can be repeated')
+    add_files_arguments(tag)
+
+    commands.add_parser('index', help='read tags of files in music_dir which are new or changed')
+
+    export = commands.add_parser('export', help='save tags of files as JSON Lines or CSV')
+    export.add_argument('-o', '--output', default='-',
+                        help='file to write to(CSV if it ends with .csv); stdout by default')
+    export.add_argument('--format', choices=EXPORT_FORMATS)
+    add_files_arguments(export)
+
+    import_ = commands.add_parser('import', help='write tags changed in a file made by export')
+    import_.add_argument('input', metavar='FILE', help="exported file; '-' for stdin")
+    import_.add_argument('--format', choices=EXPORT_FORMATS)
+    return parser
+
+
+def main(argv=None):
+    """Run a command, or start the app if there is none. This function is also
+       used as an entry point.
+    """
+    parser = make_parser()
+    args = parser.parse_args(argv)
+    if args.startup_trace and args.command is not None:
+        parser.error('--startup-trace can only be used when starting the app, not with a command')
+    if args.command is None:
+        trace.enabled = args.startup_trace
+        try:
+            from . import app   # imports curses and npyscreen
+            trace.mark('imports')
+            app.run()
+        finally:
+            if trace.enabled:
+                trace.report()
+        return
+    try:
+        status = Cli(args).run()
+    except BrokenPipeError:   # output was piped to a command like `head`, which exited
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        status = 1
+    except (OSError, query.InvalidQuery, validators.ValidationError) as error:
+        parser.error(str(error))
+    sys.exit(status)
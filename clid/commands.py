@@ -30,7 +30,7 @@ class Commands(object):
        the command line or key-bindings.
 
        Attributes:
-            app: Reference to the __main__.ClidApp
+            app: Reference to the app.ClidApp
     """
     def __init__(self, parent):
         self.parent = parent
@@ -4,7 +4,6 @@
 
 import os
 import re
-import curses
 
 # default config directory where data files are kept
 CONFIG_DIR = os.path.expanduser('~/.config/clid/')
@@ -222,6 +221,12 @@ FORMAT_SPECS = {
 # for matching format specifiers
 FORMAT_PAT = re.compile(r'%.')
 
+# values of the `search_mode` option; see searchindex.SearchIndex
+SEARCH_MODES = ('substring', 'fuzzy')
+
+# names of all tag fields handled by clid, in the order used when storing them
+TAG_NAMES = ('title', 'artist', 'album', 'album_artist', 'genre', 'date', 'track', 'comment')
+
 # dict with  {name of textbox: name of field like artist. album, etc}
 TAG_FIELDS = {
     'dat': 'date',
@@ -247,17 +252,19 @@ DATE_PATTERN = re.compile(r"""(?x)\s*
                 )?)?)?\s*
                 """)
 
-# name of valid keys other than single chars
+# name of valid keys other than single chars, and the name of their key code
+# in curses(KEY_*) or curses.ascii; looked up only by the app, so that clid
+# can be used without curses(see cli)
 VALID_KEYS_EXTRA = {
-    'esc': curses.ascii.ESC,
-    'tab': curses.ascii.TAB,
-    'end': curses.KEY_END,
-    'home': curses.KEY_HOME,
-    'space': curses.ascii.SP,
-    'insert': curses.KEY_IC,
-    'delete': curses.KEY_DC,
-    'page_up': curses.KEY_PPAGE,
-    'page_down': curses.KEY_NPAGE,
+    'esc': 'ESC',
+    'tab': 'TAB',
+    'end': 'KEY_END',
+    'home': 'KEY_HOME',
+    'space': 'SP',
+    'insert': 'KEY_IC',
+    'delete': 'KEY_DC',
+    'page_up': 'KEY_PPAGE',
+    'page_down': 'KEY_NPAGE',
 }
 
 # regex for valid keybindings of the form `^A`, `a`, `A`
@@ -4,3 +4,4 @@
 
 from .mp3db import Mp3DataBase
 from .prefdb import PreferencesDataBase
+from .browsedb import BrowseDataBase
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+
+"""Database for browsing `music_dir` one directory at a time"""
+
+import os
+
+from clid import base
+from clid import scan
+
+
+class BrowseDataBase(base.ClidDataBase):
+    """Tree of directories and mp3 files in `music_dir`, keyed by abs path.
+       A directory is listed only when it is expanded, so a huge library can be
+       browsed at once, and memory is used only for the parts that have been
+       explored. Files with the same name in different directories are kept
+       apart, unlike in Mp3DataBase.
+       Attributes:
+            root(str): abs path of `music_dir`, ending with a separator
+            rows(list):
+                abs paths of directories and files being shown, in the order
+                they are shown. Paths of directories end with a separator.
+            expanded(set): abs paths of directories whose contents are shown
+    """
+    def __init__(self, app):
+        super().__init__(app)
+        self.load_tree()
+
+    def load_tree(self):
+        """[Re]load the tree, showing only the contents of `music_dir`. Used
+           when `music_dir` is changed.
+        """
+        self.root = os.path.join(os.path.abspath(self.app.prefdb.get_pref('music_dir')), '')
+        self.expanded = set()
+        self.rows = self._list(self.root)
+
+    def _list(self, directory):
+        """Return(list) abs paths of sub directories and then of mp3 files in
+           `directory`, each sorted by name
+        """
+        mp3_files, sub_dirs = scan.list_dir(directory)
+        key = lambda path: os.path.basename(path.rstrip(os.sep)).lower()
+        return (sorted((os.path.join(path, '') for path, _ in sub_dirs), key=key)
+                + sorted((path for path, _ in mp3_files), key=key))
+
+    def get_values_to_display(self):
+        return self.rows
+
+    @staticmethod
+    def is_dir(path):
+        """Check whether `path`(from `rows`) is a directory"""
+        return path.endswith(os.sep)
+
+    def depth(self, path):
+        """Return(int) number of directories between `root` and `path`"""
+        return path[len(self.root):].rstrip(os.sep).count(os.sep)
+
+    def toggle(self, index):
+        """Show the contents of the directory at `index` in `rows` if they are
+           hidden, and hide them otherwise. The directory is listed again every
+           time it is expanded, so changes on disk are picked up.
+        """
+        path = self.rows[index]
+        if not self.is_dir(path):
+            return
+        if path in self.expanded:
+            end = index + 1
+            while end < len(self.rows) and self.rows[end].startswith(path):
+                end += 1
+            self.expanded.difference_update(self.rows[index:end])
+            del self.rows[index + 1:end]
+        else:
+            self.expanded.add(path)
+            self.rows[index + 1:index + 1] = self._list(path)
+
+    def rename_file(self, old, new):
+        """Replace `old` with `new` in `rows`, if it is being shown"""
+        self.rename_files([(old, new)])
+
+    def rename_files(self, renames):
+        """Like `rename_file`, for each (old, new) in `renames`, in order"""
+        shown_as = {}   # current path of a file as key, and its path in `rows`
+        for old, new in renames:
+            # a file may be renamed more than once(like through a temporary name)
+            shown_as[new] = shown_as.pop(old, old)
+        new_paths = {path: new for new, path in shown_as.items()}
+        self.rows[:] = [new_paths.get(path, path) for path in self.rows]   # same list is being shown
+
+    def parse_info_for_status(self, str_needing_info, *args, **kwargs):
+        """Return preview of tags(see Mp3DataBase.preview_of_path) if
+           `str_needing_info` is a file, or its path relative to `root` if
+           it is a directory
+        """
+        path = str_needing_info
+        if self.is_dir(path):
+            return os.path.relpath(path, self.root) + os.sep + ' '
+        return self.app.mp3db.preview_of_path(path)
@@ -3,11 +3,25 @@
 """Database for managing music files"""
 
 import os
-import glob
+import time
+import collections
 
 from clid import base
-from clid import const
+from clid import scan
+from clid import watch
+from clid import query
+from clid import library
+from clid import preview
+from clid import indexview
+from clid import livesearch
 from clid import readtag
+from clid import indexbuild
+from clid import prefetch
+from clid import searchindex
+from clid import sortedlist
+from clid import tagcache
+from clid import tagindex
+from clid import tagwriter
 
 
 class Mp3DataBase(base.ClidDataBase):
@@ -17,81 +31,712 @@ class Mp3DataBase(base.ClidDataBase):
             preview_format(str):
                 String with format specifiers used to display preview of
                 files' tags; Eg: '%a - %l - %t'
-            format_specs(list):
-                List of format specifiers in preview_format; Eg:['%l', '%a']
-            meta_cache(dict):
-                Cache which holds the metadata of files as they are selected.
-                Basename of file as key and metadata as value.
-            mp3_basenames(list):
-                Holds basename of mp3 files in alphabetical order.
-            file_dict(dict):
-                Basename as key and abs path as value, of mp3 files.
+            preview(preview.PreviewFormat):
+                `preview_format` compiled, used to make previews
+            library(library.Library):
+                Compact store of all mp3 files and tags that have been read.
+            tag_cache(tagcache.TagCache):
+                Cache of tags of files as they are read(from disk or `tag_index`),
+                with abs path as key. Its size is limited by `tag_cache_size`.
+            unreadable_files(set): abs path of files whose tags couldn't be read
+            tag_index(tagindex.TagIndex):
+                On-disk index of tags, so that unchanged files don't have to be
+                read again when the app is restarted.
+            mp3_basenames(sortedlist.SortedList):
+                Holds basename of mp3 files in alphabetical order. Updated in
+                place when files are added, removed or renamed.
+            rows_by_name(dict):
+                Basename as key and index of the file in `library` as value.
+            prefetcher(prefetch.Prefetcher):
+                Reads tags of files near the cursor in the background.
+            index_builder(indexbuild.IndexBuilder):
+                Reads tags of all files which aren't indexed in worker processes,
+                when many of them aren't, like the first time clid is run.
+                None if no files are being read.
+            watcher(watch.Watcher):
+                Watches `music_dir` for changes, if `watch_music_dir` is enabled.
+                None otherwise.
+            own_events(collections.Counter):
+                Events `watcher` is expected to report for files renamed by
+                clid(see `rename_files`), which have already been applied.
+            write_queue(tagwriter.WriteBehindQueue):
+                Writes tags in the background, if `write_behind` is enabled.
+                None until tags are first queued(see `queue_tags`).
+            scanned(bool):
+                False until listing `music_dir` is started. It is listed when
+                the list of files is first shown(see
+                `forms.MainView.beforeEditing`), so it isn't listed at all
+                at startup if `browse_mode` is enabled.
+            scanner(scan.Scanner):
+                Lists `music_dir` in the background; files are added by
+                `apply_scanned` as they are found. None once every file
+                has been added.
+            search_index(searchindex.SearchIndex):
+                Index of `mp3_basenames`(with rows in `library` as ids) used by
+                searches; made on the first search after `music_dir` is listed,
+                and updated as files change. None until then.
+            live_search(livesearch.LiveSearch):
+                Runs searches typed in the command line in the background.
     """
+    # shown in the status line until tags of the file have been read
+    PREVIEW_PLACEHOLDER = 'Reading tags... '
+    # shown in the status line if tags of the file couldn't be read
+    PREVIEW_UNREADABLE = 'Unable to read tags '
+    # at most about these many files found by `scanner` are added at a time,
+    # so that keys aren't ignored for long while a large library is listed
+    SCANNED_PER_CALL = 10000
+    # seconds for which `own_events` are waited for; `watch.PollingWatcher`
+    # reports renames as other events, so they may never come
+    OWN_EVENTS_TIMEOUT = 10
 
     def __init__(self, app):
         super().__init__(app)
-        self.load_mp3_files_from_music_dir()
+        self.tag_index = tagindex.TagIndex()
+        self.library = library.Library()
+        self.tag_cache = tagcache.TagCache(max_bytes=0)
+        self.unreadable_files = set()
+        self.load_tag_cache_size()
+        self.watcher = None
+        self.own_events = collections.Counter()
+        self._own_events_until = 0
+        self.scanner = None
+        self.prefetcher = None
+        self.index_builder = None
+        self.write_queue = None
+        self.search_index = None
+        self.live_search = livesearch.LiveSearch(self.iter_filtered_values)
+        self.load_prefetcher()
+        self.rows_by_name = {}
+        self.mp3_basenames = sortedlist.SortedList()
+        self.scanned = False
         self.load_preview_format()
 
+    def load_prefetcher(self):
+        """[Re]create the prefetcher. Used when `prefetch_workers` is changed."""
+        if self.prefetcher is not None:
+            self.prefetcher.shutdown()
+        self.prefetcher = prefetch.Prefetcher(
+            read=self._load_tag_record,
+            workers=int(self.app.prefdb.get_pref('prefetch_workers'))
+        )
+
+    def load_tag_cache_size(self):
+        """[Re]load the maximum size of `tag_cache`. Used when `tag_cache_size`
+           option is changed by user.
+        """
+        self.tag_cache.resize(int(self.app.prefdb.get_pref('tag_cache_size')) * 1024 * 1024)
+
     def load_preview_format(self):
         """[Re]load the preview format and. Used when `preview_format` option
-           is changed by user.
+           is changed by user. Previews are made from `tag_cache`, so no file
+           has to be read again.
            Attributes Changed:
-                meta_cache, preview_format, format_specs
+                preview_format, preview
         """
-        self.meta_cache = dict()   # empty the meta_cache as preview format has changed
         self.preview_format = self.app.prefdb.get_pref('preview_format')
-        self.format_specs = const.FORMAT_PAT.findall(self.preview_format)
+        self.preview = preview.PreviewFormat(self.preview_format)
 
     def load_mp3_files_from_music_dir(self):
-        """Re[load] the list of mp3 files in case `music_dir` is changed
+        """Start [re]listing mp3 files in `music_dir`, like when it is changed.
+           The list of files is emptied; files are added by `apply_scanned`
+           as they are found in the background.
            Attributes Changed:
-                file_dict, mp3_basenames
+                library, rows_by_name, mp3_basenames, unreadable_files,
+                scanner, watcher, scanned
+        """
+        self.stop_scanning()
+        self.stop_indexing()
+        self.stop_watching()   # started again once every file is found
+        with self.live_search.stopped():   # searches read `library` and `mp3_basenames`
+            self.library.clear()
+            self.rows_by_name = {}
+            self.mp3_basenames = sortedlist.SortedList()   # alphabetically ordered filenames
+            self.search_index = None
+        self.unreadable_files = set()
+        self.scanner = scan.Scanner(os.path.abspath(self.app.prefdb.get_pref('music_dir')), self.tag_index)
+        self.scanned = True
+
+    def stop_scanning(self):
+        """Stop listing `music_dir` started by `load_mp3_files_from_music_dir`"""
+        if self.scanner is not None:
+            self.scanner.stop()
+            self.scanner = None
+
+    def scanning_progress(self):
+        """Return(int) number of files found so far while `music_dir` is listed,
+           or None if it isn't being listed
         """
-        mp3_files = []
-        mp3_dir = self.app.prefdb.get_pref('music_dir')
-        # get all mp3 files in the dir and sub-dirs
-        for dir_tree in os.walk(mp3_dir, followlinks=True):
-            mp3_found = glob.glob(os.path.join(dir_tree[0], '*.mp3'))
-            mp3_files.extend(mp3_found)
+        if self.scanner is None:
+            return None
+        return self.scanner.found
 
-        # make a dict with the basename as key and absolute path as value
-        self.file_dict = {os.path.basename(mp3): mp3 for mp3 in mp3_files}
-        # alphabetically ordered  tuple of filenames
-        self.mp3_basenames = tuple(sorted(self.file_dict.keys()))
+    def apply_scanned(self):
+        """Add files found by `scanner` since the last call to `library` and
+           `mp3_basenames`. Once every file has been found, indexed tags of
+           files which have changed or were removed are dropped, files which
+           aren't indexed are read(see `start_indexing`), and `music_dir` is
+           watched for changes.
+           Returns:
+                bool: True if files were added, or every file has been found
+        """
+        if self.scanner is None:
+            return False
+        found = self.scanner.get_files(limit=self.SCANNED_PER_CALL)
+        if found:
+            with self.live_search.stopped():   # searches read `mp3_basenames`
+                self._add_scanned(found)
+        if not self.scanner.finished():
+            return bool(found)
+
+        for path in self.scanner.stale:
+            self.tag_cache.pop(path)
+        self.scanner = None
+        self.start_indexing()
+        self.start_watching()
+        return True
+
+    def _add_scanned(self, found):
+        """Add files in `found`(see `scan.Scanner.get_files`) to `library` and
+           `mp3_basenames`. Tags of indexed files are kept in `library`, so
+           that searching by tags(see `query`) doesn't have to read files.
+        """
+        new = []   # basenames not in `mp3_basenames` yet
+        for path, _, record in found:
+            name = os.path.basename(path)
+            if name not in self.rows_by_name:
+                new.append(name)
+            self._add_file(path)
+            if record is None:
+                self.tag_cache.pop(path)   # not indexed, or changed since it was read
+            else:
+                self.library.set_tags(self.rows_by_name[name], record)
+        if self.search_index is not None and len(found) > searchindex.MAX_CHANGES:
+            self.search_index = None   # quicker to make it again
+        if self.search_index is None:
+            self.mp3_basenames.update(new)
+        else:
+            for name in set(os.path.basename(path) for path, _, _ in found):
+                self._update_order(name)
+
+    def start_indexing(self):
+        """Read tags of all files in `library` which aren't indexed, in worker
+           processes(see `index_workers`), if there are many of them. Otherwise
+           they are read by `prefetcher` as they are shown.
+        """
+        self.stop_indexing()
+        library = self.library
+        paths = [library.path(row) for row in library.rows() if not library.known[row]]
+        if len(paths) >= indexbuild.MIN_FILES:
+            workers = int(self.app.prefdb.get_pref('index_workers')) or None   # 0: one per core
+            self.index_builder = indexbuild.IndexBuilder(paths, workers=workers)
+
+    def stop_indexing(self):
+        """Stop reading tags started by `start_indexing`"""
+        if self.index_builder is not None:
+            self.index_builder.stop()
+            self.index_builder = None
+
+    def indexing_progress(self):
+        """Return (done, total, files read per second) of `index_builder`, or
+           None if no files are being read
+        """
+        if self.index_builder is None:
+            return None
+        return (self.index_builder.done, self.index_builder.total, self.index_builder.rate())
+
+    def apply_indexed(self):
+        """Add tags read by `index_builder` since the last call to `library` and
+           `tag_index`. Files whose tags became known in some other way(like
+           being edited) meanwhile are left as they are.
+           Returns:
+                bool: True if tags of any file were read
+        """
+        if self.index_builder is None:
+            return False
+        results = self.index_builder.get_results()
+        entries = []
+        for path, stat, record, _ in results:
+            row = self._get_row(path)
+            if row is None or self.library.known[row]:
+                continue
+            if record is None:
+                self.unreadable_files.add(path)
+            else:
+                # not kept in `tag_cache`, which would only keep the last few files
+                self.library.set_tags(row, record)
+                entries.append((path, stat, record))
+        self.tag_index.put_many(entries)
+        if self.index_builder.finished():
+            self.index_builder = None
+        return bool(results)
+
+    def start_watching(self):
+        """[Re]start watching `music_dir` for changes if `watch_music_dir`
+           is enabled; stop watching otherwise
+        """
+        self.stop_watching()
+        if self.app.prefdb.is_option_enabled('watch_music_dir'):
+            mp3_dir = os.path.abspath(self.app.prefdb.get_pref('music_dir'))
+            self.watcher = watch.make_watcher(mp3_dir)
+            self.watcher.start()
+
+    def stop_watching(self):
+        """Stop watching `music_dir` for changes"""
+        if self.watcher is not None:
+            self.watcher.stop()
+            self.watcher = None
+
+    def apply_fs_events(self):
+        """Update the list of files with the changes found by `watcher` since
+           the last call. Only the files that changed are forgotten from the
+           caches; files whose tags were saved by clid itself are kept(see
+           `_saved_by_clid`).
+           Returns:
+                bool: True if the list of files or tags of a file changed
+        """
+        if self.watcher is None:
+            return False
+        events = self._drop_own_events(self.watcher.get_events())
+        if any(kind == watch.RESCAN for kind, *_ in events):
+            self.load_mp3_files_from_music_dir()
+            return True
+        with self.live_search.stopped():   # searches read `mp3_basenames`
+            names = self._apply_fs_events(events)
+            for name in names:
+                self._update_order(name)
+        return bool(events)
+
+    def _expect_own_events(self, renames):
+        """Add the events `watcher` will report for `renames`((old, new) abs
+           paths, already applied) to `own_events`
+        """
+        for old, new in renames:
+            if watch.is_mp3(old) and watch.is_mp3(new):
+                event = (watch.RENAMED, old, new)
+            elif watch.is_mp3(old):   # to a name the watcher ignores
+                event = (watch.REMOVED, old)
+            elif watch.is_mp3(new):
+                event = (watch.ADDED, new)
+            else:
+                continue
+            self.own_events[event] += 1
+        self._own_events_until = time.monotonic() + self.OWN_EVENTS_TIMEOUT
+
+    def _drop_own_events(self, events):
+        """Return(list) `events` without those in `own_events`. Applying them
+           again would move tags of a chain of renames(like c->d, b->c) to
+           the wrong files.
+        """
+        if time.monotonic() > self._own_events_until:
+            self.own_events.clear()
+        if not self.own_events:
+            return events
+        kept = []
+        for event in events:
+            if self.own_events[event] > 0:
+                self.own_events[event] -= 1
+            else:
+                kept.append(event)
+        self.own_events = +self.own_events   # drop events which have all been reported
+        return kept
+
+    def _apply_fs_events(self, events):
+        """Update `library` with `events`(see `apply_fs_events`).
+           Returns:
+                set: basenames of files added, removed or renamed
+        """
+        names = set()
+        for kind, path, *new in events:
+            if kind in (watch.ADDED, watch.CHANGED) and self._saved_by_clid(path):
+                continue   # tags are stored by `set_tag_record`
+            names.add(os.path.basename(path))
+            if kind in (watch.ADDED, watch.CHANGED):
+                # a file can be added over a known one, like when it is
+                # written elsewhere and renamed over it; its tags are stale
+                self._forget_tags(path)
+                self._add_file(path)
+            elif kind == watch.REMOVED:
+                self._remove_file(path)
+            elif kind == watch.REMOVED_DIR:
+                prefix = os.path.join(path, '')
+                for row in [row for row in self.rows_by_name.values()
+                            if self.library.path(row).startswith(prefix)]:
+                    names.add(self.library.names[row])
+                    self._remove_file(self.library.path(row))
+            elif kind == watch.RENAMED:
+                names.add(os.path.basename(new[0]))
+                if self._get_row(path) is not None:
+                    self._rename_file(path, new[0])
+                    self.tag_index.rename(path, new[0])
+                else:
+                    self._add_file(new[0])
+        return names
+
+    def _saved_by_clid(self, path):
+        """Check whether `path`, which changed on disk, was last written by
+           clid: its tags are still being written by `write_queue`, or it is
+           the same file(size, mtime and inode) that was indexed after they
+           were written
+        """
+        if self._get_row(path) is None:
+            return False
+        if self._pending_tags(path) is not None:
+            return True
+        try:
+            stat = os.stat(path)
+        except OSError:   # removed since
+            return False
+        return self.tag_index.get(path, stat) is not None
+
+    def _update_order(self, name):
+        """Add `name` to `mp3_basenames` and `search_index` if it is in
+           `rows_by_name`, and remove it from them otherwise
+        """
+        row = self.rows_by_name.get(name)
+        if row is None:
+            if name in self.mp3_basenames:
+                self.mp3_basenames.remove(name)
+        elif name not in self.mp3_basenames:
+            self.mp3_basenames.add(name)
+        # a file with the same name in another directory has another row
+        if self.search_index is not None and self.search_index.id_of(name) != row:
+            self.search_index.remove(name)
+            if row is not None:
+                self.search_index.add(name, row)
+
+    def _get_row(self, path):
+        """Return index of `path` in `library`, or None if it is not in it"""
+        row = self.rows_by_name.get(os.path.basename(path))
+        if row is not None and self.library.path(row) == path:
+            return row
+        return None
+
+    def _add_file(self, path):
+        """Add `path` to `library` if it is not already in it. A file with the
+           same basename in another directory is replaced.
+        """
+        if self._get_row(path) is None:
+            name = os.path.basename(path)
+            if name in self.rows_by_name:
+                self.library.remove(self.rows_by_name[name])
+            self.rows_by_name[name] = self.library.add(path)
+
+    def _remove_file(self, path):
+        """Remove `path` from `library` and forget its tags"""
+        self._forget_tags(path)
+        row = self._get_row(path)
+        if row is not None:
+            self.library.remove(row)
+            del self.rows_by_name[os.path.basename(path)]
+
+    def _forget_tags(self, path):
+        """Remove tags of `path` from all caches, as the file has changed"""
+        row = self._get_row(path)
+        if row is not None:
+            self.library.forget_tags(row)
+        self.tag_cache.pop(path)
+        self.unreadable_files.discard(path)
+        self.tag_index.remove(path)
+
+    def _rename_file(self, old, new):
+        """Replace `old` with `new` in `library` and the caches in memory,
+           without updating `mp3_basenames`(see `_update_order`) and `tag_index`
+        """
+        row = self._get_row(old)
+        if row is not None:   # files shown only by the browser aren't in `library`
+            del self.rows_by_name[os.path.basename(old)]
+            if os.path.basename(new) in self.rows_by_name:   # overwritten by rename
+                self.library.remove(self.rows_by_name[os.path.basename(new)])
+            self.library.rename(row, new)
+            self.rows_by_name[os.path.basename(new)] = row
+
+        record = self.tag_cache.pop(old)
+        if record is not None:
+            self.tag_cache.put(new, record)
 
     def get_values_to_display(self):
         """Return values that is to be displayed in the corresponding form"""
         return self.mp3_basenames
 
+    def get_filtered_values(self, search):
+        """Return basenames containing `search`, ignoring case and accents, or
+           the best matches of `search` if `search_mode` is fuzzy, or basenames
+           of files matching `search` if it is a query of tags(see `query`).
+           Any search running in the background is cancelled.
+        """
+        return self.live_search.run(search)
+
+    def iter_filtered_values(self, search):
+        """Yield indexview.IndexView of basenames matching `search`(see
+           `get_filtered_values`), or `mp3_basenames` itself if every file matches.
+           Views refer to files by their row in `library`, so they show files
+           that are renamed later by their new name.
+           Regex searches are done by `ClidDataBase.iter_filtered_values`.
+           Not thread safe; use `get_filtered_values` or `search_in_background`.
+        """
+        names = self.mp3_basenames
+        if query.is_query(search):
+            try:
+                matches = query.compile_query(search, self.library)
+            except query.InvalidQuery:
+                yield names
+                return
+            # going through `names` keeps the results in alphabetical order
+            get_row, chunk = self.rows_by_name.get, self.SEARCH_CHUNK
+            for start in range(0, len(names), chunk):
+                rows = [row for row in map(get_row, names[start:start + chunk]) if row is not None]
+                yield indexview.IndexView(self.library.names, matches(rows))
+            return
+        if search == '' or self.app.prefdb.is_option_enabled('use_regex_in_search'):
+            yield from super().iter_filtered_values(search)
+            return
+        if self.search_index is None or self.search_index.changes > searchindex.MAX_CHANGES:
+            self.search_index = searchindex.SearchIndex(
+                names, ids=map(self.rows_by_name.__getitem__, names)
+            )
+        if self.app.prefdb.get_pref('search_mode') == 'fuzzy':
+            rows = self.search_index.fuzzy_search(search)
+        else:
+            rows = self.search_index.search(search)
+        yield indexview.IndexView(self.library.names, rows)
+
+    def make_view(self, values, indexes):
+        """Return(indexview.IndexView) files at `indexes` in `values`, by their
+           row in `library`(see `iter_filtered_values`)
+        """
+        get_row = self.rows_by_name.__getitem__
+        return indexview.IndexView(self.library.names, [get_row(values[index]) for index in indexes])
+
+    def search_in_background(self, search):
+        """Start searching for `search`(see `get_filtered_values`) in the
+           background, cancelling the search that is running
+        """
+        self.live_search.request(search)
+
+    def cancel_search(self):
+        """Stop the search running in the background"""
+        self.live_search.cancel()
+
+    def apply_search_results(self):
+        """Return(list) basenames found so far by the search running in the
+           background, or None if nothing was found since the last call
+        """
+        return self.live_search.get_results()
+
     def get_abs_path(self, path):
-        """Return the absolute path of path from self.file_dict"""
-        return self.file_dict[path]
+        """Return the absolute path of path(basename of a file)"""
+        return self.library.path(self.rows_by_name[path])
 
-    def parse_info_for_status(self, str_needing_info, force=False):
+    def get_tag_record(self, filename, force=False):
+        """Return the tags of a file as a readtag.TagRecord. Tags are taken from
+           `tag_cache`, `library` or `tag_index` if possible, and read from the
+           file only if it is not indexed.
+           Args:
+                filename(str): basename of the file
+                force(bool): read the tags from the file even if they are known
+        """
+        row = self.rows_by_name[filename]
+        path = self.library.path(row)
+        if force:
+            record = self._read_tag_record(path)
+        else:
+            record = self.tag_cache.get(path)
+            if record is not None:
+                return record
+            record = self.library.get_tags(row)
+            if record is not None:
+                self.tag_cache.put(path, record)
+                return record
+            record = self._load_tag_record(path)
+        self._store_tag_record(row, path, record)
+        return record
+
+    def set_tag_record(self, path, record):
+        """Store tags(readtag.TagRecord) that have just been written to `path`,
+           so that the file doesn't have to be read again. If newer tags are
+           still queued for `path`(see `queue_tags`), they are kept in place
+           of the written ones, and nothing is indexed until they're written.
+        """
+        pending = self._pending_tags(path)
+        if pending is not None:
+            self._store_tag_record(self._get_row(path), path, readtag.update_record(record, pending))
+            return
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:   # removed after it was written
+            return
+        self.tag_index.put(path, stat, record)
+        self._store_tag_record(self._get_row(path), path, record)
+
+    def get_tags_to_edit(self, path):
+        """Return tags(readtag.TagRecord) of `path` to be shown for editing.
+           They are read from the file, unless tags queued by `queue_tags`
+           haven't been written to it yet.
+        """
+        pending = self._pending_tags(path)
+        if pending is None:
+            return readtag.ReadTags(path).record()
+        record = self.get_known_tag_record(path)   # updated by `queue_tags`
+        if record is None:   # dropped from `tag_cache`
+            record = readtag.update_record(readtag.ReadTags(path).record(), pending)
+        return record
+
+    def _pending_tags(self, path):
+        """Return(dict) tags queued for `path` and not yet written, or None"""
+        if self.write_queue is None:
+            return None
+        return self.write_queue.pending_tags(path)
+
+    def queue_tags(self, paths, tags):
+        """Write `tags` to `paths` in the background. `library` and `tag_cache`
+           are updated at once, so that the new tags are shown before they
+           are written. Tags read from the written files are stored later
+           by `apply_written`.
+           Args:
+                paths(list): abs paths of files
+                tags(dict): name of tag as key and its new value as value
+        """
+        if self.write_queue is None:   # its thread is started only when needed
+            self.write_queue = tagwriter.WriteBehindQueue()
+        padding = int(self.app.prefdb.get_pref('tag_padding'))
+        for path in paths:
+            row = self._get_row(path)
+            record = self.tag_cache.get(path)
+            if record is None and row is not None:
+                record = self.library.get_tags(row)
+            if record is None:
+                record = self._load_tag_record(path)
+            self._store_tag_record(row, path, readtag.update_record(record, tags))
+            self.write_queue.put(path, tags, padding=padding)
+
+    def pending_writes(self):
+        """Return the number of files queued by `queue_tags` and not yet written"""
+        if self.write_queue is None:
+            return 0
+        return len(self.write_queue)
+
+    def apply_written(self):
+        """Store tags of files written by `write_queue` since the last call
+           Returns:
+                list: tagwriter.WriteResult of files that couldn't be written
+        """
+        failed = []
+        if self.write_queue is None:
+            return failed
+        for result in self.write_queue.get_results():
+            if result.error is not None:
+                failed.append(result)
+                # tags in the caches were never written
+                self._forget_tags(result.path)
+            else:
+                self.set_tag_record(result.path, result.record)
+        return failed
+
+    def flush_writes(self):
+        """Wait until all queued tags are written, and store them. Used before
+           files are renamed, and when the app is closed.
+           Returns:
+                list: tagwriter.WriteResult of files that couldn't be written
+        """
+        if self.write_queue is not None:
+            self.write_queue.flush()
+        return self.apply_written()
+
+    def _store_tag_record(self, row, path, record):
+        """Keep tags of a file in `library`(if `row` isn't None) and `tag_cache`"""
+        if row is not None:
+            self.library.set_tags(row, record)
+        self.tag_cache.put(path, record)
+        self.unreadable_files.discard(path)
+
+    def _load_tag_record(self, path):
+        """Return tags of `path` from `tag_index`, reading the file if it is not
+           indexed or has changed since(files shown by the browser may not have
+           been checked by `load_mp3_files_from_music_dir`). Doesn't touch
+           `tag_cache`, so it can be called from any thread.
+        """
+        stat = os.stat(path)
+        record = self.tag_index.get(path, stat)
+        if record is None:
+            record = self._read_tag_record(path, stat)
+        return record
+
+    def _read_tag_record(self, path, stat=None):
+        """Read tags of `path` from the file and add them to `tag_index`"""
+        if stat is None:
+            stat = os.stat(path)
+        record = readtag.read_tag_record(path)
+        self.tag_index.put(path, stat, record)
+        return record
+
+    def prefetch(self, filenames):
+        """Read tags of `filenames`(basenames, most wanted first) in the
+           background, skipping files whose tags are already known
+        """
+        rows = (self.rows_by_name[filename] for filename in filenames)
+        self.prefetcher.request([self.library.path(row) for row in rows
+                                 if not self.library.known[row]])
+
+    def prefetch_paths(self, paths):
+        """Like `prefetch`, but for abs paths of files which may not be in
+           `library`, like those shown by the browser
+        """
+        self.prefetcher.request([path for path in paths if path not in self.tag_cache
+                                 and path not in self.unreadable_files])
+
+    def apply_prefetched(self):
+        """Add tags read by `prefetcher` since the last call to `tag_cache`
+           Returns:
+                bool: True if tags of any file were read
+        """
+        results = self.prefetcher.get_results()
+        for path, record in results:
+            if record is None:
+                self.unreadable_files.add(path)
+            else:
+                self._store_tag_record(self._get_row(path), path, record)
+        return bool(results)
+
+    def parse_info_for_status(self, str_needing_info, force=False, wait=True):
         """Make a string that will be displayed in the status line of corresponding
            form, based on the user's `preview_format` option,
-           (Eg: `artist - album - track_name`) and then add it to meta_cache.
+           (Eg: `artist - album - track_name`).
            Args:
                 filename: the filename(basename of file)
-                force: reconstruct the string even if it is already in meta_cache and
-                       add it to meta_cache
+                force: read the tags from the file even if they are already known
+                wait: read the tags now if they aren't known yet. If False, the tags
+                      are read in the background and `PREVIEW_PLACEHOLDER` is returned
            Returns:
                 str: String constructed
            Note:
                 `str_needing_info` will be a basename of a file
         """
         filename = str_needing_info
-        # make a copy of format and replace specifiers with tags
-        p_format = self.preview_format
-        if (filename not in self.meta_cache) or force:
-            meta = readtag.ReadTags(self.get_abs_path(filename))
-            for spec in self.format_specs:
-                tag = const.FORMAT_SPECS[spec]   # get corresponding tag name
-                p_format = p_format.replace(spec, getattr(meta, tag))
-            self.meta_cache[filename] = p_format
+        if not (wait or force):
+            row = self.rows_by_name[filename]
+            if self.library.path(row) in self.unreadable_files:
+                return self.PREVIEW_UNREADABLE
+            if not self.library.known[row]:
+                self.prefetch([filename])
+                return self.PREVIEW_PLACEHOLDER
 
-        return self.meta_cache[filename]
+        return self.format_preview(self.get_tag_record(filename, force=force))
+
+    def preview_of_path(self, path):
+        """Like `parse_info_for_status` with wait=False, but for the abs path of
+           a file which may not be in `library`, like those shown by the browser
+        """
+        if path in self.unreadable_files:
+            return self.PREVIEW_UNREADABLE
+        record = self.tag_cache.get(path)
+        if record is None:
+            self.prefetch_paths([path])
+            return self.PREVIEW_PLACEHOLDER
+        return self.format_preview(record)
+
+    def format_preview(self, meta):
+        """Return the preview of tags in `meta`(readtag.TagRecord) in `preview_format`"""
+        return self.preview.format(meta)
 
     def rename_file(self, old, new):
         """Rename a file. This method replaces all references of `old` with new
@@ -100,10 +745,33 @@ class Mp3DataBase(base.ClidDataBase):
                 old(str): abs path to old name of file
                 new(str): abs path to new name of file
         """
-        del self.file_dict[os.path.basename(old)]
-        self.file_dict[os.path.basename(new)] = new
-        # reconstruct to include new file
-        self.mp3_basenames = tuple(sorted(self.file_dict.keys()))
+        self.rename_files([(old, new)])
 
-        del self.meta_cache[os.path.basename(old)]
-        self.parse_info_for_status(os.path.basename(new))   # replace in meta_cache
+    def rename_files(self, renames):
+        """Like `rename_file`, for each (old, new) in `renames`, in order. Files
+           shown and search results are updated in place. `watcher` reports
+           the renames later; those events are ignored(see `own_events`).
+        """
+        if self.watcher is not None:
+            self._expect_own_events(renames)
+        with self.live_search.stopped():   # searches read `mp3_basenames`
+            if len(renames) > searchindex.MAX_CHANGES:
+                self.search_index = None   # quicker to make it again
+            names = set()
+            for old, new in renames:
+                self._rename_file(old, new)
+                names.update((os.path.basename(old), os.path.basename(new)))
+            for name in names:
+                self._update_order(name)
+        self.tag_index.rename_many(renames)
+
+    def get_known_tag_record(self, path):
+        """Return tags(readtag.TagRecord) of `path` if they are in memory, or
+           None if the file would have to be read
+        """
+        record = self.tag_cache.get(path)
+        if record is None:
+            row = self._get_row(path)
+            if row is not None:
+                record = self.library.get_tags(row)
+        return record
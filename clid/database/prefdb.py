@@ -2,6 +2,9 @@
 
 """Database for managing preferences"""
 
+import curses
+import curses.ascii
+
 import configobj
 
 from clid import base
@@ -65,7 +68,8 @@ class PreferencesDataBase(base.ClidDataBase):
             return key
         else:
             # key is something like space, tab, insert
-            return const.VALID_KEYS_EXTRA[key]
+            name = const.VALID_KEYS_EXTRA[key]
+            return getattr(curses if name.startswith('KEY_') else curses.ascii, name)
 
     def get_section_names(self):
         """Return(list) names of sections in pref"""
@@ -149,8 +153,11 @@ class WhenOptionChanged():
         pass   # doesn't need anything
 
     def music_dir(self):
-        self.app.mp3db.load_mp3_files_from_music_dir()
-        self.app.getForm("MAIN").load_files_to_show()
+        if self.app.mp3db.scanned:   # else listed when Main View is shown
+            self.app.mp3db.load_mp3_files_from_music_dir()
+            self.app.getForm("MAIN").load_files_to_show()
+        self.app.browsedb.load_tree()
+        self.app.getForm("BROWSE").load_files_to_show()
 
     def preview_format(self):
         self.app.mp3db.load_preview_format()
@@ -164,10 +171,38 @@ class WhenOptionChanged():
     def use_regex_in_search(self):
         pass
 
+    def search_mode(self):
+        pass   # read every time files are searched
+
     def mouse_support(self):
         self.app.configure_mouse_support()
 
+    def browse_mode(self):
+        pass   # used only at startup
+
+    def watch_music_dir(self):
+        self.app.mp3db.start_watching()
+
+    def prefetch_pages(self):
+        pass   # read every time files are prefetched
+
+    def prefetch_workers(self):
+        self.app.mp3db.load_prefetcher()
+
+    def index_workers(self):
+        pass   # read when files are listed
+
+    def tag_cache_size(self):
+        self.app.mp3db.load_tag_cache_size()
+
+    def tag_padding(self):
+        pass   # read every time tags are saved
+
+    def write_behind(self):
+        pass   # read every time tags are saved
+
     def keybinding(self):
         """Run when keybindings are changed"""
         self.app.getForm("MAIN").load_keys()
         self.app.getForm("SETTINGS").load_keys()
+        self.app.getForm("BROWSE").load_keys()
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+
+"""Fast reader for the text frames of ID3v2.3 and ID3v2.4 tags. Only the
+   frames of the wanted tags are decoded; all other frames(like cover art)
+   are skipped by their headers, without their data being read. Tags that
+   can't be read this way raise UnsupportedTagError, and have to be read
+   with stagger instead(see `readtag.read_tag_record`).
+"""
+
+import re
+import mmap
+import struct
+
+# frame id of each tag which is stored in a single text frame
+TEXT_FRAMES = {
+    'title': b'TIT2',
+    'artist': b'TPE1',
+    'album': b'TALB',
+    'album_artist': b'TPE2',
+    'genre': b'TCON',
+    'track': b'TRCK',
+}
+# frame id of date, for each major version
+DATE_FRAMES = {3: b'TYER', 4: b'TDRC'}
+COMMENT_FRAME = b'COMM'
+# in ID3v2.3, month, day and time of the date are in frames of their own
+V23_DATE_FRAMES = (b'TYER', b'TDAT', b'TIME')
+# patterns used by stagger to parse TDAT and TIME frames
+V23_DAY_PAT = re.compile(r'\s*(?P<month>[01][0-9])\s*-?\s*(?P<day>[0-3][0-9])?\s*$')
+V23_TIME_PAT = re.compile(r'\s*(?P<hour>[0-2][0-9])\s*:?\s*(?P<minute>[0-5][0-9])\s*:?\s*'
+                          r'(?P<second>[0-5][0-9])?\s*$')
+
+# codec and string terminator of each text encoding
+ENCODINGS = (
+    ('latin-1', b'\0'),
+    ('utf-16', b'\0\0'),
+    ('utf-16-be', b'\0\0'),
+    ('utf-8', b'\0'),
+)
+
+HEADER_SIZE = 10
+FRAME_HEADER = struct.Struct('>4s4sH')   # id, size, flags
+FRAME_ID_PAT = re.compile(rb'[A-Z][A-Z0-9]{2}[A-Z0-9 ]\Z')
+
+# tag header flags
+_UNSYNC = 0x80
+_EXTENDED_HEADER = 0x40
+# frame flags that change how the data of a frame has to be read
+# (compression, encryption, grouping, unsynchronisation, data length)
+_FRAME_FORMAT_FLAGS = {3: 0x00e0, 4: 0x004f}
+
+
+class UnsupportedTagError(Exception):
+    """Raised when a tag can't be read by this module"""
+    pass
+
+
+def decode_syncsafe(data):
+    """Decode a syncsafe int(7 bits in each byte) stored in bytes `data`"""
+    value = 0
+    for byte in data:
+        if byte & 0x80:
+            raise UnsupportedTagError('invalid syncsafe int')
+        value = (value << 7) | byte
+    return value
+
+
+def read_header(file):
+    """Read the ID3v2 header at the start of `file`.
+       Args:
+            file: file opened in binary mode
+       Returns:
+            tuple: (version, flags, size) where version is 3 or 4 and size is
+                the number of bytes of the tag, excluding header and footer.
+                None if the file has no tag.
+       Raises:
+            UnsupportedTagError: if the tag is not ID3v2.3 or ID3v2.4, or is
+                unsynchronised
+    """
+    file.seek(0)
+    header = file.read(HEADER_SIZE)
+    if len(header) < HEADER_SIZE or header[:3] != b'ID3':
+        return None
+    version, revision, flags = header[3], header[4], header[5]
+    if version not in (3, 4) or revision != 0:
+        raise UnsupportedTagError('ID3v2.{}.{} tag'.format(version, revision))
+    if flags & _UNSYNC:
+        raise UnsupportedTagError('unsynchronised tag')
+    return (version, flags, decode_syncsafe(header[6:10]))
+
+
+def decode_strings(data, encoding):
+    """Decode the null terminated strings in `data`, like stagger does.
+       Args:
+            data(bytes): data of a frame, after the encoding byte
+            encoding(int): encoding byte of the frame
+       Returns:
+            list: decoded strings
+    """
+    try:
+        codec, term = ENCODINGS[encoding]
+    except IndexError:
+        raise UnsupportedTagError('unknown encoding {}'.format(encoding))
+    strings = []
+    while data:
+        end = data.find(term)
+        # terminator of utf-16 strings must start at an even offset
+        while len(term) == 2 and end != -1 and end & 1:
+            end = data.find(term, end + 1)
+        if end == -1:
+            end = len(data)
+            if len(term) == 2 and end & 1:
+                raise UnsupportedTagError('truncated utf-16 string')
+        try:
+            strings.append(data[:end].decode(codec))
+        except UnicodeDecodeError:
+            raise UnsupportedTagError('invalid string')
+        data = data[end + len(term):]
+    return strings
+
+
+def _read_frames(mapped, version, flags, size, wanted):
+    """Yield (frame id, data) of frames in `wanted`(set of frame ids). Data
+       of other frames is never touched, so it isn't read from the disk.
+    """
+    pos = HEADER_SIZE
+    if flags & _EXTENDED_HEADER:
+        ext_size = mapped[pos:pos + 4]
+        if version == 3:
+            pos += 4 + struct.unpack('>I', ext_size)[0]
+        else:
+            pos += decode_syncsafe(ext_size)
+    end = HEADER_SIZE + size
+    while pos + FRAME_HEADER.size <= end:
+        frame_id, frame_size, frame_flags = FRAME_HEADER.unpack_from(mapped, pos)
+        if not FRAME_ID_PAT.match(frame_id):
+            break   # reached padding
+        if version == 3:
+            frame_size = struct.unpack('>I', frame_size)[0]
+        else:
+            frame_size = decode_syncsafe(frame_size)
+        pos += FRAME_HEADER.size
+        if pos + frame_size > end:
+            raise UnsupportedTagError('frame larger than tag')
+        if frame_id in wanted and frame_size:
+            if frame_flags & _FRAME_FORMAT_FLAGS[version]:
+                raise UnsupportedTagError('compressed or encrypted frame')
+            yield (frame_id, mapped[pos:pos + frame_size])
+        pos += frame_size
+
+
+def _text_strings(data):
+    """Return(list) strings of a text frame from its data(with the encoding
+       byte). Empty strings at the end are dropped, like stagger does, so
+       that b'\\x00Artist\\x00\\x00' is just 'Artist'.
+    """
+    strings = decode_strings(data[1:], data[0])
+    while strings and strings[-1] == '':
+        strings.pop()
+    return strings
+
+
+def _comment(frames):
+    """Return the comment from data of COMM frames, picked like stagger does:
+       the one with lang 'eng' and no description, else the first one with
+       no description.
+    """
+    comment = None
+    for data in frames:
+        if len(data) < 4:
+            raise UnsupportedTagError('invalid COMM frame')
+        lang = data[1:4]
+        strings = decode_strings(data[4:], data[0])
+        desc = strings[0] if strings else ''
+        if desc == '':
+            text = strings[1] if len(strings) > 1 else ''
+            if lang == b'eng':
+                return text
+            if comment is None:
+                comment = text
+    return '' if comment is None else comment
+
+
+def _v23_date(text):
+    """Return the date made from TYER, TDAT and TIME frames, like stagger does.
+       Args:
+            text(dict): frame id as key and list of decoded strings as value
+    """
+    year, date, time = ((text.get(frame_id) or [''])[0] for frame_id in V23_DATE_FRAMES)
+    fields = []
+    try:
+        fields.append(int(year))
+    except ValueError:
+        fields.append(None)
+    match = V23_DAY_PAT.match(date)
+    if match is not None:
+        if match.group('day') is None:
+            raise UnsupportedTagError('invalid TDAT frame')
+        fields.extend([int(match.group('month')), int(match.group('day'))])
+    else:
+        fields.extend([None, None])
+    match = V23_TIME_PAT.match(time)
+    if match is not None:
+        second = match.group('second')
+        fields.extend([int(match.group('hour')), int(match.group('minute')),
+                       None if second is None else int(second)])
+
+    # like stagger, stop at the first field which isn't set
+    date = ''
+    seps = ('', '-', '-', ' ', ':', ':')
+    for sep, width, field in zip(seps, (4, 2, 2, 2, 2, 2), fields):
+        if field is None:
+            break
+        date += sep + '{:0{}}'.format(field, width)
+    return date
+
+
+def read_tags(filename, fields):
+    """Read tags of an mp3 file, decoding only the frames of `fields`.
+       Values are the same as those of stagger's getters, except that genre
+       isn't resolved and track is a str('' if not set).
+       Args:
+            filename(str): path of the file
+            fields(iterable): names of tags to read(see `const.TAG_NAMES`)
+       Returns:
+            dict: name of tag as key and its value(str) as value
+       Raises:
+            UnsupportedTagError: if the tag has to be read by stagger
+    """
+    tags = dict.fromkeys(fields, '')
+    with open(filename, 'rb') as file:
+        header = read_header(file)
+        if header is None:
+            return tags
+        version, flags, size = header
+        wanted = {TEXT_FRAMES[field]: field for field in tags if field in TEXT_FRAMES}
+        if 'date' in tags:
+            wanted[DATE_FRAMES[version]] = 'date'
+            if version == 3:
+                wanted.update(dict.fromkeys(V23_DATE_FRAMES, 'date'))
+        if 'comment' in tags:
+            wanted[COMMENT_FRAME] = 'comment'
+
+        try:
+            mapped = mmap.mmap(file.fileno(), HEADER_SIZE + size, access=mmap.ACCESS_READ)
+        except ValueError:   # tag is larger than the file
+            raise UnsupportedTagError('truncated tag')
+        with mapped:
+            frames = {}
+            for frame_id, data in _read_frames(mapped, version, flags, size, wanted):
+                frames.setdefault(frame_id, []).append(data)
+
+    for frame_id, data in frames.items():
+        if frame_id != COMMENT_FRAME and len(data) > 1:
+            raise UnsupportedTagError('repeated text frame')
+
+    text = {frame_id: _text_strings(data[0])
+            for frame_id, data in frames.items() if frame_id != COMMENT_FRAME}
+    for field, frame_id in TEXT_FRAMES.items():
+        if field in tags:
+            tags[field] = ' / '.join(text.get(frame_id, []))
+
+    if 'track' in tags:
+        try:
+            track = int(text[TEXT_FRAMES['track']][0].partition('/')[0])
+        except (KeyError, IndexError, ValueError):
+            track = 0
+        tags['track'] = str(track) if track else ''
+    if 'date' in tags:
+        if version == 3:
+            tags['date'] = _v23_date(text)
+        elif text.get(DATE_FRAMES[4]):
+            tags['date'] = text[DATE_FRAMES[4]][0]
+    if 'comment' in tags:
+        tags['comment'] = _comment(frames.get(COMMENT_FRAME, []))
+    return tags
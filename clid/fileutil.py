@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+
+"""Helpers for rewriting files when the tag at their start grows"""
+
+import os
+import errno
+import shutil
+import tempfile
+
+# size of chunks copied when data has to pass through Python
+BUFSIZE = 1024 * 1024
+
+# errors raised when a way of copying is not supported by the system or the
+# filesystem(seccomp filters give EPERM); the next way is tried instead
+_UNSUPPORTED_ERRORS = {errno.ENOSYS, errno.EXDEV, errno.EINVAL, errno.EPERM,
+                       errno.EOPNOTSUPP, errno.ENOTSUP, errno.ENOTSOCK}
+
+
+def _copy_file_range(src, dst, offset, count):
+    return os.copy_file_range(src, dst, count, offset)
+
+
+def _sendfile(src, dst, offset, count):
+    return os.sendfile(dst, src, offset, count)
+
+
+def _read_write(src, dst, offset, count):
+    data = memoryview(os.pread(src, min(count, BUFSIZE), offset))
+    written = 0
+    while written < len(data):
+        written += os.write(dst, data[written:])
+    return len(data)
+
+
+# ways of copying, fastest first; the first two copy inside the kernel
+_COPY_FUNCS = [func for func, name in ((_copy_file_range, 'copy_file_range'),
+                                       (_sendfile, 'sendfile'),
+                                       (_read_write, 'pread'))
+               if hasattr(os, name)]
+
+
+def copy_range(src, dst, offset, count):
+    """Copy `count` bytes from `offset` in `src` to the current position in
+       `dst`, without the data passing through Python if possible.
+       Args:
+            src(int): file descriptor to copy from
+            dst(int): file descriptor to copy to
+       Returns:
+            int: number of bytes copied; less than `count` if `src` ended early
+    """
+    copied = 0
+    for copy_func in _COPY_FUNCS:
+        try:
+            while copied < count:
+                done = copy_func(src, dst, offset + copied, count - copied)
+                if done == 0:   # end of `src`
+                    return copied
+                copied += done
+            return copied
+        except OSError as err:
+            if err.errno not in _UNSUPPORTED_ERRORS or copy_func is _read_write:
+                raise
+    return copied
+
+
+def replace_head(path, length, data):
+    """Replace the first `length` bytes of the file `path` with `data`. The
+       new contents are written to a temporary file which is then renamed to
+       `path`, so that the file is never left half written. If `path` is a
+       symlink, the file it points to is replaced.
+       Returns:
+            int: number of bytes written
+    """
+    path = os.path.realpath(path)   # else the link itself would be replaced
+    directory, name = os.path.split(path)
+    fd, temp = tempfile.mkstemp(dir=directory, prefix='.' + name + '.', suffix='.tmp')
+    try:
+        with open(path, 'rb') as src, open(fd, 'wb') as dst:
+            dst.write(data)
+            dst.flush()
+            size = os.fstat(src.fileno()).st_size
+            copied = copy_range(src.fileno(), dst.fileno(), length, size - length)
+            os.fsync(dst.fileno())   # data must be on disk before the rename
+        shutil.copymode(path, temp)
+        os.replace(temp, path)
+    except BaseException:
+        try:
+            os.remove(temp)
+        except OSError:
+            pass
+        raise
+    return len(data) + copied
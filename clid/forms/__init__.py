@@ -4,4 +4,5 @@
 
 from .main import MainView
 from .pref import PreferencesView
+from .browse import BrowseView
 from .editmeta import SingleEditMetaView, MultiEditMetaView
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+
+"""Window for browsing `music_dir` one directory at a time"""
+
+import os
+import curses
+
+from clid import base
+from clid import util
+
+
+class BrowseMultiLine(base.ClidMultiLine):
+    """Tree of directories and files. <Enter> expands or collapses the
+       directory under the cursor, or edits the file under the cursor.
+       Note:
+            self.parent refers to BrowseView -> class
+    """
+    def load_keys(self):
+        super().load_keys()
+        self.handlers.update({
+            curses.KEY_RIGHT: self.h_expand,
+            curses.KEY_LEFT:  self.h_collapse,
+        })
+
+    def display_value(self, vl):
+        """Indent rows by their depth in the tree, and mark directories with
+           '+'(collapsed) or '-'(expanded)
+        """
+        browsedb = self.parent.browsedb
+        indent = '  ' * browsedb.depth(vl)
+        if browsedb.is_dir(vl):
+            mark = '- ' if vl in browsedb.expanded else '+ '
+            return indent + mark + os.path.basename(vl.rstrip(os.sep)) + os.sep
+        return indent + '  ' + os.path.basename(vl)
+
+    def set_current_status(self, *args, **kwargs):
+        """Show preview of the file under cursor, reading tags of files on the
+           screen in the background
+        """
+        super().set_current_status(*args, **kwargs)
+        top = self.start_display_at
+        visible = self.values[top:top + len(self._my_widgets)]
+        self.parent.mp3db.prefetch_paths(
+            [self.get_selected()] + [path for path in visible if not self.parent.browsedb.is_dir(path)]
+        )
+
+    def toggle(self):
+        """Expand or collapse the directory under the cursor"""
+        self.parent.browsedb.toggle(self.cursor_line)
+        self.values = self.parent.browsedb.get_values_to_display()
+        self.display()
+
+    # Handlers
+    @util.run_if_window_not_empty(update_status_line=False)
+    def h_select(self, char):
+        """Expand or collapse directory, or edit the file under the cursor"""
+        path = self.get_selected()
+        if self.parent.browsedb.is_dir(path):
+            self.toggle()
+        else:
+            # abs path; the file may not be in Mp3DataBase yet
+            self.parent.parentApp.current_files = [path]
+            self.parent.parentApp.files_view = 'BROWSE'
+            self.parent.parentApp.switchForm("SINGLEEDIT")
+
+    @util.run_if_window_not_empty(update_status_line=False)
+    def h_expand(self, char):
+        """Expand the directory under the cursor"""
+        path = self.get_selected()
+        if self.parent.browsedb.is_dir(path) and path not in self.parent.browsedb.expanded:
+            self.toggle()
+
+    @util.run_if_window_not_empty(update_status_line=True)
+    def h_collapse(self, char):
+        """Collapse the directory under the cursor, or the one it is in"""
+        browsedb = self.parent.browsedb
+        path = self.get_selected()
+        if path not in browsedb.expanded:
+            depth = browsedb.depth(path)
+            if depth == 0:
+                return
+            # go to the directory containing the file/collapsed directory
+            while browsedb.depth(self.values[self.cursor_line]) >= depth:
+                self.cursor_line -= 1
+        self.toggle()
+
+
+class BrowseView(base.ClidMuttForm):
+    """View showing `music_dir` as a tree, which is listed as it is explored.
+       Attributes:
+            browsedb: Reference to browsedb(see app.ClidApp)
+    """
+    MAIN_WIDGET_CLASS = BrowseMultiLine
+    ACTION_CONTROLLER = base.ClidActionController
+    COMMAND_WIDGET_CLASS = base.ClidCommandLine
+    TITLE = base.ClidMuttForm.TITLE + '- browser '
+
+    def __init__(self, parentApp, *args, **kwargs):
+        self.browsedb = parentApp.browsedb
+        super().__init__(parentApp=parentApp, *args, **kwargs)
+        self.load_keys()
+        # wake up often to show the results of work done in background
+        self.keypress_timeout = 2   # in tenths of a second
+        self.load_files_to_show()
+        self.show_background_work()
+
+    @property
+    def maindb(self):
+        return self.browsedb
+
+    def load_files_to_show(self):
+        """Show the tree from the top"""
+        self.wMain.values = self.browsedb.get_values_to_display()
+        self.wMain.cursor_line = 0
+        if self.wMain.values:
+            self.wMain.set_current_status()
+        else:
+            self.wStatus2.value = 'No Files Found In Directory '
+            self.display()
+
+    def while_waiting(self):
+        """Called by npyscreen when no key is pressed for `keypress_timeout`.
+           Applies results of work done in the background, including files
+           found by a scan of `music_dir` and changes found by the watcher,
+           which are shown by Main View when it is shown again.
+        """
+        changed = self.mp3db.apply_fs_events()
+        changed = self.mp3db.apply_scanned() or changed
+        if changed:
+            self.parentApp.getForm("MAIN").files_changed = True
+        if self.mp3db.apply_prefetched() and self.wMain.values:
+            self.wMain.set_current_status()   # replace placeholder with tags
+        self.mp3db.apply_indexed()   # only to show the progress; previews use `tag_cache`
+        failed = self.mp3db.apply_written()
+        if failed:
+            self.show_notif(title='Error', msg=util.describe_failed_writes(failed, limit=1))
+        self.show_background_work()
@@ -7,20 +7,20 @@ import os
 import npyscreen as npy
 
 from clid import base
+from clid import util
 from clid import const
-from clid import readtag
 
 
 class SingleEditMetaView(base.ClidEditMetaView):
     """Edit the metadata of a *single* track."""
     def create(self):
         file = self.parentApp.current_files[0]
-        meta = readtag.ReadTags(file)
+        meta = self.mp3db.get_tags_to_edit(file)   # may not be written yet
         # show name of file(can be edited)
         self.filenamebox = self.add(
             widgetClass=self._get_textbox_cls()[0], name='Filename',
             labelColor='STANDOUT', color='CONTROL',
-            value=os.path.basename(file).replace('.mp3', '')
+            value=os.path.splitext(os.path.basename(file))[0]
             )
         self.nextrely += 2
         super().create()
@@ -34,11 +34,19 @@ class SingleEditMetaView(base.ClidEditMetaView):
     def do_after_saving_tags(self):
         """Rename the file if necessary."""
         mp3 = self.files[0]
-        new_filename = os.path.join(os.path.dirname(mp3), self.filenamebox.value) + '.mp3'
+        extension = os.path.splitext(mp3)[1]   # kept as it is, like '.MP3'
+        new_filename = os.path.join(os.path.dirname(mp3), self.filenamebox.value) + extension
         if mp3 != new_filename:   # filename was changed
+            # tags may still be waiting to be written to the old filename
+            failed = self.mp3db.flush_writes()
+            if failed:
+                self.show_notif(title='Error', msg=util.describe_failed_writes(failed))
+                if any(result.path == mp3 for result in failed):
+                    return
             os.rename(mp3, new_filename)
             self.mp3db.rename_file(old=mp3, new=new_filename)
-            self.parentApp.getForm("MAIN").load_files_to_show()
+            self.parentApp.browsedb.rename_file(old=mp3, new=new_filename)
+            self.parentApp.getForm("MAIN").show_renamed_file(os.path.basename(new_filename))
 
 
 class MultiEditMetaView(base.ClidEditMetaView):
@@ -2,12 +2,17 @@
 
 """Main View/Window of clid"""
 
+import curses
+
 import npyscreen as npy
 
 from clid import base
 from clid import util
 from clid import const
-from clid import version
+from clid import trace
+from clid import rename
+from clid import indexview
+from clid import selection
 
 
 class MainActionController(base.ClidActionController):
@@ -20,21 +25,28 @@ class MainActionController(base.ClidActionController):
         super().create()
         self.add_action('^/', self.search_for_files, live=True)   # search with '/'
         self.add_action('^:mark', self.mark_item, live=False)
+        self.add_action('^:rename .+', self.rename_files, live=False)
 
     def search_for_files(self, command_line, widget_proxy, live):
         search = command_line[1:]   # first char will be '/' in command_line
-        self.parent.wMain.values = self.parent.mp3db.get_filtered_values(search)
-        if self.parent.wMain.values:
-            self.parent.wMain.cursor_line = 0
-            self.parent.wMain.set_current_status()  # tag preview if a match is found
-        else:
-            self.parent.wStatus2.value = ' '   # show nothing if no files matched
+        self.parent.search_term = search
         self.parent.after_search_now_filter_view = True
-        self.parent.display()
+        if live:
+            # search in the background so typing isn't slowed down; results
+            # are shown by MainView.while_waiting as they are found
+            self.parent.mp3db.search_in_background(search)
+        else:
+            self.parent.show_search_results(self.parent.mp3db.get_filtered_values(search))
 
     def mark_item(self, command_line, widget_proxy, live):
         pass
 
+    def rename_files(self, command_line, widget_proxy, live):
+        """Rename files using their tags.
+           command_line will be of the form `:rename pattern`
+        """
+        self.parent.rename_files(command_line[8:])
+
 class MainMultiLine(base.ClidMultiLine):
     """MultiLine class to be used by clid. `Esc` has been modified to revert
        the screen back to the normal view after a searh has been performed
@@ -43,16 +55,27 @@ class MainMultiLine(base.ClidMultiLine):
        has been performed, selected files will be kept intact and search will
        be reverted
        Attributes:
-            space_selected_values(set):
-                Stores set of files which was selected for batch tagging. A set is
-                used as we don't want the same file to be added more than once
+            selection(selection.Selection):
+                Rows(in `mp3db.library`) of files selected for batch tagging.
+                Kept by row instead of by name, so that drawing a line only
+                has to check a single row, however many files are selected.
+            selection_anchor(int):
+                Line(in `values`) where the last file was selected with
+                `select_item`; files from here to the cursor are selected
+                by `select_range`
+            selection_generation(int):
+                `mp3db.library.generation` when `selection` was last checked
+                by `forget_stale_selection`
        Note:
             self.parent refers to MainView -> class
     """
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.allow_filtering = False   # does NOT refer to search invoked with '/'
-        self.space_selected_values = set()
+        self.selection = selection.Selection()
+        self.selection_anchor = 0
+        self.selection_generation = self.parent.mp3db.library.generation
+        self._last_prefetch_line = 0   # to know the direction of scrolling
 
         self.slow_scroll = self.parent.prefdb.is_option_enabled('smooth_scroll')
 
@@ -62,20 +85,62 @@ class MainMultiLine(base.ClidMultiLine):
         self.handlers.update({
             get_key('esc_key'):            self.h_revert_escape,
             get_key('select_item'):        self.h_multi_select,
+            get_key('select_range'):       self.h_select_range,
+            get_key('select_all'):         self.h_select_all,
+            curses.KEY_SF:                 self.h_extend_selection_down,   # Shift+Down
+            curses.KEY_SR:                 self.h_extend_selection_up,     # Shift+Up
             get_key('reload_music_dir'):   self.h_reload_files,
             get_key('invert_selection'):   self.h_invert_selection,
         })
 
-    def get_relative_index_of_space_selected_values(self):
-        """Return list of indexes of space selected files,
-           *compared to self.parent.wMain.values*
+    def set_current_status(self, *args, **kwargs):
+        """Show preview of the file under cursor. If its tags haven't been read
+           yet, a placeholder is shown until they are read in the background.
         """
-        return [self.values.index(file) for file in self.space_selected_values
-                if file in self.values]
+        super().set_current_status(wait=False, *args, **kwargs)
+        self.prefetch_tags()
+
+    def prefetch_tags(self):
+        """Read in the background tags of files on the screen, and of files in the
+           next `prefetch_pages` pages in the direction the cursor is moving
+        """
+        page = len(self._my_widgets)
+        ahead = page * int(self.parent.prefdb.get_pref('prefetch_pages'))
+        cursor = self.cursor_line
+        # visible lines; cursor may be anywhere on the screen
+        files = [self.values[cursor]]
+        files.extend(self.values[max(cursor - page, 0):cursor + page])
+        if cursor >= self._last_prefetch_line:
+            files.extend(self.values[cursor + page:cursor + page + ahead])
+        else:
+            files.extend(reversed(self.values[max(cursor - page - ahead, 0):max(cursor - page, 0)]))
+        self._last_prefetch_line = cursor
+        self.parent.mp3db.prefetch(files)
+
+    def row_of(self, filename):
+        """Return the row of `filename`(basename) in `mp3db.library`"""
+        return self.parent.mp3db.rows_by_name[filename]
+
+    def forget_stale_selection(self):
+        """Clear `selection` if `mp3db.library` has been made again since it
+           was last checked, like when `music_dir` is listed again, as its
+           rows now refer to other files
+        """
+        generation = self.parent.mp3db.library.generation
+        if generation != self.selection_generation:
+            self.selection.clear()
+            self.selection_anchor = 0
+            self.selection_generation = generation
+
+    def get_selected_files(self):
+        """Return(list) basenames of files selected for batch tagging"""
+        names = self.parent.mp3db.library.names
+        return [names[row] for row in self.selection]
 
     # Handlers
     def h_reload_files(self, char):
         """Reload files in `music_dir`"""
+        self.selection.clear()   # rows change
         self.parent.mp3db.load_mp3_files_from_music_dir()
         self.parent.load_files_to_show()
 
@@ -83,24 +148,26 @@ class MainMultiLine(base.ClidMultiLine):
         """Handler which switches from the filtered view of search results
            to the normal view with the complete list of files, if search results
            are being displayed. If all files are being shown, empty
-           `space_selected_values` to clear multi file selection
+           `selection` to clear multi file selection
         """
         if self.parent.after_search_now_filter_view:
+            self.parent.mp3db.cancel_search()
             self.values = self.parent.mp3db.get_values_to_display()   # revert
             self.parent.after_search_now_filter_view = False
             self.set_current_status()
-        elif self.space_selected_values:   # if files have been selected with space
-            self.space_selected_values = set()
+        elif self.selection:   # if files have been selected with space
+            self.selection.clear()
         self.display()
 
     @util.run_if_window_not_empty(update_status_line=False)
     def h_select(self, char):
         """Select a file using <Enter>(default)"""
-        if self.space_selected_values:
+        self.parent.parentApp.files_view = 'MAIN'
+        if self.selection:
             # add the file under cursor if it is not already in it
-            self.space_selected_values.add(self.get_selected())
-            self.parent.parentApp.set_current_files(self.space_selected_values)
-            self.space_selected_values = set()
+            self.selection.add(self.row_of(self.get_selected()))
+            self.parent.parentApp.set_current_files(self.get_selected_files())
+            self.selection.clear()
             self.parent.parentApp.switchForm("MULTIEDIT")
         else:
             self.parent.parentApp.set_current_files([self.get_selected()])
@@ -111,16 +178,42 @@ class MainMultiLine(base.ClidMultiLine):
         """Add or remove current line from list of lines to be highlighted
            (for batch tagging) when <Space> is pressed.
         """
-        current = self.get_selected()
-        try:
-            self.space_selected_values.remove(current)   # unhighlight file
-        except KeyError:
-            self.space_selected_values.add(current)   # highlight file
+        self.selection.toggle(self.row_of(self.get_selected()))
+        self.selection_anchor = self.cursor_line
+
+    @util.run_if_window_not_empty(update_status_line=False)
+    def h_select_range(self, char):
+        """Select files from the last one selected with <Space> to the cursor"""
+        start, end = sorted((min(self.selection_anchor, len(self.values) - 1), self.cursor_line))
+        self.selection.update(map(self.row_of, self.values[start:end + 1]))
+
+    @util.run_if_window_not_empty(update_status_line=False)
+    def h_extend_selection_down(self, char):
+        """Select the file under the cursor and move down, like Shift+Down
+           in most editors
+        """
+        self.selection.add(self.row_of(self.get_selected()))
+        super().h_cursor_line_down(char)
+        self.selection.add(self.row_of(self.get_selected()))
+        self.selection_anchor = self.cursor_line
+
+    @util.run_if_window_not_empty(update_status_line=False)
+    def h_extend_selection_up(self, char):
+        """Select the file under the cursor and move up"""
+        self.selection.add(self.row_of(self.get_selected()))
+        super().h_cursor_line_up(char)
+        self.selection.add(self.row_of(self.get_selected()))
+        self.selection_anchor = self.cursor_line
+
+    @util.run_if_window_not_empty(update_status_line=False)
+    def h_select_all(self, char):
+        """Select every file shown, like all results of a search"""
+        self.selection.update(map(self.row_of, self.values))
 
     @util.run_if_window_not_empty(update_status_line=False)
     def h_invert_selection(self, char):
         """Invert selection made using <Space>"""
-        self.space_selected_values = set(self.values) - self.space_selected_values
+        self.selection.invert(map(self.row_of, self.values))
 
 
     # HACK: Following two funcions are actually used by npyscreen to display filtered
@@ -133,7 +226,8 @@ class MainMultiLine(base.ClidMultiLine):
 
     def _set_line_highlighting(self, line, value_indexer):
         """Highlight files which were selected with <Space>"""
-        if value_indexer in self.get_relative_index_of_space_selected_values():
+        if 0 <= value_indexer < len(self.values) and \
+                self.row_of(self.values[value_indexer]) in self.selection:
             self.set_is_line_important(line, True)   # mark as important(bold)
         else:
             self.set_is_line_important(line, False)
@@ -147,8 +241,12 @@ class MainView(base.ClidMuttForm):
             after_search_now_filter_view(bool):
                 Used to revert screen(ESC) to standard view after a search
                 (see class MainMultiLine)
-            mp3db: Reference to mp3db(see __main__.ClidApp)
-            prefdb: Reference to prefdb(see __main__.ClidApp)
+            search_term(str): Last string searched for with '/'
+            files_changed(bool): Set by other forms when files were added or
+                changed while this form wasn't shown; they are shown again
+                when it is(see `beforeEditing`)
+            mp3db: Reference to mp3db(see app.ClidApp)
+            prefdb: Reference to prefdb(see app.ClidApp)
        Note:
             self.value refers to an instance of DATA_CONTROLER
     """
@@ -161,8 +259,12 @@ class MainView(base.ClidMuttForm):
         self.load_keys()
 
         self.after_search_now_filter_view = False
+        self.search_term = ''
+        self.files_changed = False
+        # wake up often to show the results of work done in background
+        self.keypress_timeout = 2   # in tenths of a second
         self.load_files_to_show()
-        self.wStatus1.value = 'clid v' + version.VERSION + ' '
+        self.show_background_work()
 
         with open(const.CONFIG_DIR + 'first', 'r') as file:
             first = file.read()
@@ -179,12 +281,194 @@ class MainView(base.ClidMuttForm):
     def maindb(self):
         return self.mp3db
 
+    def beforeEditing(self):
+        """Called by npyscreen every time the form is shown. Listing `music_dir`
+           is started the first time; files are shown as they are found(see
+           `while_waiting`), so that they can be used before a large library
+           has been listed.
+        """
+        if not self.mp3db.scanned:
+            self.mp3db.load_mp3_files_from_music_dir()
+            self.load_files_to_show()
+            self.display()
+            trace.mark('first paint')
+        elif self.files_changed:
+            self.refresh_files_in_place()
+        self.files_changed = False
+
     def load_files_to_show(self):
         """Set the mp3 files that will be displayed"""
+        self.wMain.forget_stale_selection()
         self.wMain.values = self.mp3db.get_values_to_display()
         # display tag preview of first file
         try:
             self.wMain.cursor_line = 0
             self.wMain.set_current_status()
         except IndexError:   # thrown if directory doest not have mp3 files
+            self.show_no_files()
+
+    def show_no_files(self):
+        """Show why the list of files is empty in the lower status line"""
+        if self.mp3db.scanning_progress() is not None:
+            self.wStatus2.value = 'Listing files in {}... '.format(self.prefdb.get_pref('music_dir'))
+        else:
             self.wStatus2.value = 'No Files Found In Directory '
+
+    def while_waiting(self):
+        """Called by npyscreen when no key is pressed for `keypress_timeout`.
+           Applies results of work done in the background.
+        """
+        # written files are indexed first, so that the watcher reporting
+        # them doesn't make them be read again(see `Mp3DataBase.apply_fs_events`)
+        failed = self.mp3db.apply_written()
+        if failed:
+            self.show_notif(title='Error', msg=util.describe_failed_writes(failed, limit=1))
+            if self.wMain.values:
+                self.wMain.set_current_status()   # tags shown were never saved
+        if self.mp3db.apply_fs_events():
+            self.refresh_files_in_place()
+        library = self.mp3db.library
+        removed = len(library.names) - len(library)
+        if self.mp3db.apply_scanned():
+            # results of a search are searched again once every file is found
+            if not (self.after_search_now_filter_view and self.mp3db.scanning_progress() is not None):
+                self.refresh_files_in_place()
+            elif len(library.names) - len(library) != removed:
+                # a file found replaced one with the same name, which may be shown
+                self.drop_removed_files()
+                self.display()
+            trace.mark('files shown')
+            if self.mp3db.scanning_progress() is None:
+                trace.mark('files listed')
+        read = self.mp3db.apply_prefetched()
+        read = self.mp3db.apply_indexed() or read
+        if read and self.wMain.values:
+            self.wMain.set_current_status()   # replace placeholder with tags
+        results = self.mp3db.apply_search_results()
+        if results is not None and self.after_search_now_filter_view:
+            self.show_search_results(results)
+        self.show_background_work()
+
+    def show_search_results(self, results):
+        """Show `results`(sequence) of a search. The cursor is moved to the first
+           file, unless `results` are more files found by the search already
+           being shown(see `Mp3DataBase.apply_search_results`).
+        """
+        more = results is self.wMain.values
+        self.wMain.values = results
+        if not results:
+            self.wStatus2.value = ' '   # show nothing if no files matched
+        elif not more:
+            self.wMain.cursor_line = 0
+            self.wMain.set_current_status()   # tag preview of the first match
+        self.display_changes()
+
+    def drop_removed_files(self):
+        """Stop showing files which were removed from `mp3db.library`, if the
+           files shown are a view of it(like results of a search)
+        """
+        values = self.wMain.values
+        if isinstance(values, indexview.IndexView):
+            names = self.mp3db.library.names
+            values.filter_indexes(lambda row: names[row] is not None)
+            self.wMain.cursor_line = max(min(self.wMain.cursor_line, len(values) - 1), 0)
+            if values:
+                self.wMain.set_current_status()
+            else:
+                self.wStatus2.value = ' '
+        self.forget_removed_selection()
+
+    def forget_removed_selection(self):
+        """Forget selections of files which don't exist anymore"""
+        self.wMain.forget_stale_selection()
+        names = self.mp3db.library.names
+        self.wMain.selection.difference_update(
+            [row for row in self.wMain.selection if row >= len(names) or names[row] is None]
+        )
+
+    def show_renamed_file(self, name):
+        """Move the cursor to the file which was renamed to `name`. Files shown
+           (and results of a search) are updated in place by `mp3db.rename_file`,
+           so the search isn't lost.
+        """
+        self.drop_removed_files()   # files overwritten by the rename are gone
+        values = self.wMain.values
+        try:
+            self.wMain.cursor_line = values.index(name)
+        except ValueError:   # renamed in the browser; it may not be shown here
+            self.wMain.cursor_line = max(min(self.wMain.cursor_line, len(values) - 1), 0)
+        if values:
+            self.wMain.set_current_status()
+
+    def rename_files(self, pattern):
+        """Rename selected files(or all files shown if none are selected) to
+           names made from their tags with `pattern`(see `rename.make_plan`),
+           after the renames have been shown and confirmed
+        """
+        files = self.wMain.get_selected_files() or list(self.wMain.values)
+        if not files:
+            return
+        try:
+            row = self.wMain.row_of(self.wMain.get_selected())
+        except IndexError:
+            row = None
+        try:
+            plan = rename.make_plan(pattern, [self.mp3db.get_abs_path(name) for name in files],
+                                    get_record=self.mp3db.get_known_tag_record,
+                                    existing=self.mp3db.rows_by_name)
+        except rename.InvalidPattern as error:
+            self.show_notif(title='Error', msg=str(error))
+            return
+        if not plan.renames:
+            self.show_notif(title='Info', msg='No files to rename')
+            return
+        if not npy.notify_yes_no(rename.describe_plan(plan), editw=1,
+                                 title='Rename {} file(s)?'.format(len(plan.renames))):
+            return
+
+        # tags may still be waiting to be written to the old filenames
+        failed_writes = self.mp3db.flush_writes()
+        if failed_writes:
+            self.show_notif(title='Error', msg=util.describe_failed_writes(failed_writes))
+            return
+        done, failed = rename.run_plan(plan)
+        self.mp3db.rename_files(done)
+        self.parentApp.browsedb.rename_files(done)
+        self.wMain.selection.clear()
+        if failed:
+            self.show_notif(title='Error', msg=rename.describe_failed_renames(failed, limit=1))
+        else:
+            self.show_notif(title='Info', msg='Renamed {} file(s)'.format(len(plan.renames)))
+        if row is not None:   # keep the cursor on the same file
+            self.show_renamed_file(self.mp3db.library.names[row])
+        self.display()
+
+    def refresh_files_in_place(self):
+        """Show the current list of files(or search results) again, keeping the
+           cursor on the file it was on, at the same line of the screen. Used
+           when files change on disk, and as files are found by a scan.
+        """
+        try:
+            current = self.wMain.get_selected()
+        except IndexError:
+            current = None
+
+        if self.after_search_now_filter_view:
+            self.wMain.values = self.mp3db.get_filtered_values(self.search_term)
+        else:
+            self.wMain.values = self.mp3db.get_values_to_display()
+        self.forget_removed_selection()
+
+        if not self.wMain.values:
+            self.show_no_files()
+            self.display()
+            return
+        if current in self.wMain.values:
+            line = self.wMain.values.index(current)
+            # files added or removed above it don't move it on the screen
+            self.wMain.start_display_at = max(
+                self.wMain.start_display_at + line - self.wMain.cursor_line, 0)
+            self.wMain.cursor_line = line
+        else:
+            self.wMain.cursor_line = min(self.wMain.cursor_line, len(self.wMain.values) - 1)
+        self.wMain.set_current_status()
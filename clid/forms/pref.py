@@ -36,7 +36,7 @@ class PrefMultiline(base.ClidMultiLine):
     def set_current_status(self, *args, **kwargs):
         if self.get_selected() in self.high_lines:
             self.parent.wStatus2.value = ''  # cursor under section name or blank line
-            self.parent.display()
+            self.parent.display_changes()
         else:
             super().set_current_status()
 
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+
+"""Read tags of many files in worker processes, like the first time clid is
+   run and none of the files in `music_dir` have been indexed. Parsing tags is
+   done in Python, so threads would take turns on a single core; processes
+   make reading scale with the number of cores.
+"""
+
+import os
+import time
+import queue
+import functools
+
+from . import util
+from . import readtag
+
+# files are read in worker processes only if there are at least these many
+MIN_FILES = 256
+# number of files sent to a worker process at a time
+CHUNK_SIZE = 64
+
+
+def read_chunk(paths):
+    """Read tags of `paths`. Runs in a worker process, so results are plain
+       tuples, which are much quicker to send back than stagger's objects.
+       Returns:
+            list: (path, stat, tags, error) for each file, where stat is the
+                os.stat_result of the file when it was read and tags is a
+                tuple of values of const.TAG_NAMES; tags is None and error(str)
+                is why if the file couldn't be read
+    """
+    results = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            tags = tuple(readtag.read_tag_record(path))
+        except Exception as error:   # file removed, corrupt tag, etc
+            results.append((path, None, None, str(error)))
+        else:
+            results.append((path, stat, tags, None))
+    return results
+
+
+def _make_records(chunk):
+    """Return(list) results of `read_chunk` with tags as readtag.TagRecord"""
+    return [(path, stat, None if tags is None else readtag.TagRecord(*tags), error)
+            for path, stat, tags, error in chunk]
+
+
+def read_tags(paths, workers=None, pool=None):
+    """Yield (path, stat, record, error)(see `read_chunk`, with tags as
+       readtag.TagRecord) for each of `paths`, in order. Tags are read by
+       `workers`(one per core by default) processes if there are at least
+       `MIN_FILES` files.
+       Args:
+            pool(concurrent.futures.Executor): pool of processes used instead
+                of starting new ones, like when files are read a batch at a time
+    """
+    if len(paths) < MIN_FILES:
+        yield from _make_records(read_chunk(paths))
+        return
+    if pool is None:
+        with util.process_pool(workers) as pool:
+            yield from read_tags(paths, pool=pool)
+        return
+    for chunk in pool.map(read_chunk, util.batches(paths, CHUNK_SIZE)):
+        yield from _make_records(chunk)
+
+
+class IndexBuilder():
+    """Read tags of files in worker processes, in the background. Results are
+       collected in a queue and applied later by the ui thread(see
+       `get_results`), so that the progress can be shown while files are read.
+       Attributes:
+            total(int): Number of files to be read
+            done(int): Number of files whose results have been taken
+            started(float): time.monotonic() when reading started
+    """
+    def __init__(self, paths, workers=None):
+        self.total = len(paths)
+        self.done = 0
+        self.started = time.monotonic()
+        self._results = queue.Queue()
+        self._pool = util.process_pool(workers)
+        self._futures = []
+        for chunk in util.batches(paths, CHUNK_SIZE):
+            future = self._pool.submit(read_chunk, chunk)
+            future.add_done_callback(functools.partial(self._collect, chunk))
+            self._futures.append(future)
+
+    def _collect(self, chunk, future):
+        """Runs in a thread of the pool when a chunk has been read"""
+        if future.cancelled():
+            return
+        try:
+            results = _make_records(future.result())
+        except Exception as error:   # worker process was killed, etc
+            results = [(path, None, None, str(error)) for path in chunk]
+        self._results.put(results)
+
+    def get_results(self):
+        """Return(list) (path, stat, record, error)(see `read_tags`) of all
+           files read since the last call
+        """
+        results = []
+        while True:
+            try:
+                results.extend(self._results.get_nowait())
+            except queue.Empty:
+                break
+        self.done += len(results)
+        return results
+
+    def finished(self):
+        """Check whether results of all files have been taken"""
+        return self.done == self.total
+
+    def rate(self):
+        """Return(float) number of files read per second so far"""
+        return self.done / max(time.monotonic() - self.started, 0.001)
+
+    def stop(self):
+        """Cancel files which haven't been read yet, and stop the workers"""
+        for future in self._futures:
+            future.cancel()
+        self._pool.shutdown(wait=False)
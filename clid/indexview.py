@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+
+"""Lists of files that are a part of a bigger list, like results of a search"""
+
+import array
+
+
+class IndexView():
+    """Read only sequence of some of the items of `base`, kept as the index of
+       each item in `base` instead of as a copy of the item. Making a view of
+       a million items takes 4 MB and a single allocation, and items are looked
+       up only when they are used, like when the lines on the screen are drawn.
+       Attributes:
+            base(sequence): Items the view is made of; should not be modified
+                while the view is in use
+            indexes(array.array): Index(in `base`) of each item of the view
+    """
+    def __init__(self, base, indexes=()):
+        self.base = base
+        self.indexes = indexes if isinstance(indexes, array.array) else array.array('I', indexes)
+
+    def __len__(self):
+        return len(self.indexes)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.base[i] for i in self.indexes[index]]
+        return self.base[self.indexes[index]]
+
+    def __iter__(self):
+        return map(self.base.__getitem__, self.indexes)
+
+    def __contains__(self, item):
+        return any(value == item for value in self)
+
+    def __repr__(self):
+        return '{}({} of {} items)'.format(self.__class__.__name__, len(self), len(self.base))
+
+    def index(self, item):
+        """Return the position of the first occurence of `item` in the view.
+           Raises:
+                ValueError: if `item` is not in the view
+        """
+        for position, value in enumerate(self):
+            if value == item:
+                return position
+        raise ValueError('{!r} is not in the view'.format(item))
+
+    def filter_indexes(self, keep):
+        """Remove items whose index(in `base`) isn't kept by `keep`(callable)"""
+        self.indexes = array.array('I', filter(keep, self.indexes))
+
+    def extend(self, view):
+        """Add the items of `view`(IndexView of the same `base`) to the end"""
+        self.indexes.extend(view.indexes)
+
+
+def join(chunks):
+    """Return the items of `chunks`(iterable of sequences) as a single sequence.
+       If the chunks are IndexViews(of the same base), the first one is extended
+       with the rest, so that items aren't copied. Returns an empty list if
+       there are no chunks.
+    """
+    joined = None
+    for chunk in chunks:
+        if joined is None:
+            joined = chunk
+        elif chunk:
+            joined.extend(chunk)
+    return [] if joined is None else joined
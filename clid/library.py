@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+
+"""Compact in-memory store of mp3 files and their tags. Values are kept in
+   columns(arrays of ints, or lists) instead of one object per file, and
+   repeated strings like directories, artists or albums are stored once.
+"""
+
+import os
+import array
+
+from . import readtag
+from . import searchindex
+
+# tags stored as ids in `Library.strings`, as their values repeat a lot
+STRING_COLUMNS = ('artist', 'album', 'album_artist', 'genre', 'date', 'comment')
+
+# largest track number that fits in `Library.tracks`
+MAX_TRACK = 0xffffffff
+
+
+class StringTable():
+    """Stores each distinct string once, and refers to it with an int id.
+       The id of '' is always 0.
+       Attributes:
+            strings(list): strings with their id as index
+    """
+    def __init__(self):
+        self.strings = ['']
+        self._ids = {'': 0}
+        self._folded = []
+
+    def __len__(self):
+        return len(self.strings)
+
+    def __getitem__(self, string_id):
+        return self.strings[string_id]
+
+    def id_of(self, string):
+        """Return the id of `string`, adding it to the table if necessary"""
+        try:
+            return self._ids[string]
+        except KeyError:
+            self._ids[string] = len(self.strings)
+            self.strings.append(string)
+            return self._ids[string]
+
+    def folded(self):
+        """Return(list) strings folded with `searchindex.fold`, with id as index.
+           Strings are folded only once, as they are never removed from the table.
+        """
+        for string in self.strings[len(self._folded):]:
+            self._folded.append(searchindex.fold(string))
+        return self._folded
+
+
+def year_of(date):
+    """Return the year(int) in a date string like '2003-05-01'; 0 if there is no year"""
+    return int(date[:4]) if date[:4].isdecimal() else 0
+
+
+class Library():
+    """Columnar store of files. Every file is a row, referred to by its
+       index; rows of removed files are left empty and are not reused,
+       so the index of a file never changes.
+       Attributes:
+            dirs(StringTable): directories of files
+            strings(StringTable): values of tags in `STRING_COLUMNS`
+            dir_ids(array.array): id of directory in `dirs`, of each row
+            names(list): basename of each row; None if the file was removed
+            titles(list): title of each row
+            columns(dict): name of a tag in `STRING_COLUMNS` as key and
+                array.array of ids in `strings`, of each row as value
+            tracks(array.array): track number of each row, at most `MAX_TRACK`
+            long_tracks(dict): row as key and track tag as value, of rows
+                whose track number is larger than `MAX_TRACK`
+            years(array.array): year(from date tag) of each row
+            known(bytearray): 1 for each row whose tags are stored, 0 otherwise
+            generation(int): Bumped by `clear`; rows kept elsewhere(like
+                selected files) refer to other files once it changes
+    """
+    def __init__(self):
+        self.generation = 0
+        self.clear()
+
+    def clear(self):
+        """Remove all rows"""
+        self.generation += 1
+        self.dirs = StringTable()
+        self.strings = StringTable()
+        self.dir_ids = array.array('I')
+        self.names = []
+        self.titles = []
+        self.columns = {tag: array.array('I') for tag in STRING_COLUMNS}
+        self.tracks = array.array('I')
+        self.long_tracks = {}
+        self.years = array.array('H')
+        self.known = bytearray()
+        self._removed = 0
+
+    def __len__(self):
+        """Number of files(removed files are not counted)"""
+        return len(self.names) - self._removed
+
+    def rows(self):
+        """Yield index of every row which isn't removed"""
+        for index, name in enumerate(self.names):
+            if name is not None:
+                yield index
+
+    def add(self, path):
+        """Add a file(whose tags are not known yet) and return its index"""
+        directory, name = os.path.split(path)
+        self.dir_ids.append(self.dirs.id_of(directory))
+        self.names.append(name)
+        self.titles.append('')
+        for column in self.columns.values():
+            column.append(0)
+        self.tracks.append(0)
+        self.years.append(0)
+        self.known.append(0)
+        return len(self.names) - 1
+
+    def remove(self, index):
+        """Remove a row"""
+        if self.names[index] is not None:
+            self.forget_tags(index)
+            self.names[index] = None
+            self._removed += 1
+
+    def rename(self, index, path):
+        """Change the path of a row; tags are kept as they are"""
+        directory, self.names[index] = os.path.split(path)
+        self.dir_ids[index] = self.dirs.id_of(directory)
+
+    def path(self, index):
+        """Return abs path of a row"""
+        return os.path.join(self.dirs[self.dir_ids[index]], self.names[index])
+
+    def set_tags(self, index, record):
+        """Store tags(readtag.TagRecord) of a row"""
+        self.titles[index] = record.title
+        for tag, column in self.columns.items():
+            column[index] = self.strings.id_of(getattr(record, tag))
+        track = int(record.track) if record.track.isdecimal() else 0
+        if track > MAX_TRACK:
+            self.long_tracks[index] = record.track   # kept as it is for `get_tags`
+        else:
+            self.long_tracks.pop(index, None)
+        self.tracks[index] = min(track, MAX_TRACK)
+        self.years[index] = min(year_of(record.date), 0xffff)
+        self.known[index] = 1
+
+    def get_tags(self, index):
+        """Return tags(readtag.TagRecord) of a row, or None if they are not stored"""
+        if not self.known[index]:
+            return None
+        strings = self.strings.strings
+        track = self.tracks[index]
+        return readtag.TagRecord(
+            title=self.titles[index],
+            track=self.long_tracks.get(index) or (str(track) if track else ''),
+            **{tag: strings[column[index]] for tag, column in self.columns.items()}
+        )
+
+    def forget_tags(self, index):
+        """Stop storing tags of a row, as they have changed"""
+        self.titles[index] = ''
+        for column in self.columns.values():
+            column[index] = 0
+        self.tracks[index] = 0
+        self.long_tracks.pop(index, None)
+        self.years[index] = 0
+        self.known[index] = 0
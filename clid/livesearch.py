@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+
+"""Search files in the background, so that typing never waits for a search"""
+
+import queue
+import threading
+import contextlib
+
+from clid import indexview
+
+
+class LiveSearch():
+    """Run searches in a background thread. A search yields its results in
+       chunks, which are collected in a queue and applied later by the ui
+       thread(see `get_results`). Starting a search cancels the one that is
+       running; it stops at the end of its current chunk, and chunks it has
+       already found are dropped.
+       Attributes:
+            search(callable):
+                Function called(in the background thread) with a search string,
+                which returns an iterable of lists of results
+            results(queue.Queue): (generation, chunk) of searches; a search
+                ends with an empty chunk
+    """
+    def __init__(self, search):
+        self.search = search
+        self.results = queue.Queue()
+        self._lock = threading.Lock()   # held while a chunk is searched
+        self._cond = threading.Condition()
+        self._wanted = None   # (generation, search) to be run next
+        self._generation = 0   # increased by every search; older ones are stale
+        self._shown = None   # generation of `_values`
+        self._values = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def request(self, search):
+        """Start searching for `search` in the background"""
+        with self._cond:
+            self._generation += 1
+            self._wanted = (self._generation, search)
+            self._cond.notify()
+
+    def cancel(self):
+        """Stop the search that is running, and forget its results"""
+        with self._cond:
+            self._generation += 1
+            self._wanted = None
+
+    @contextlib.contextmanager
+    def stopped(self):
+        """Context manager which cancels the running search, and keeps other
+           searches from running inside it, like while the values searched
+           are being changed
+        """
+        self.cancel()
+        with self._lock:
+            yield
+
+    def run(self, search):
+        """Return(sequence) all results of `search`(see `indexview.join`),
+           searching in the calling thread. The search running in the
+           background(if any) is cancelled.
+        """
+        self.cancel()
+        with self._lock:
+            return indexview.join(self.search(search))
+
+    def _run(self):
+        """Runs in the background thread"""
+        while True:
+            with self._cond:
+                while self._wanted is None:
+                    self._cond.wait()
+                generation, search = self._wanted
+                self._wanted = None
+            try:
+                chunks = iter(self.search(search))
+                while generation == self._generation:
+                    with self._lock:
+                        chunk = next(chunks, None)
+                    if chunk is None:
+                        break
+                    if chunk:
+                        self.results.put((generation, chunk))
+            except Exception:   # files changed while searching, etc
+                pass
+            self.results.put((generation, []))
+
+    def get_results(self):
+        """Return(sequence) results found so far by the latest search, or None
+           if nothing was found since the last call. The first chunk found is
+           extended in place with the rest(see `indexview.join`) by later calls,
+           until another search is started.
+        """
+        changed = False
+        while True:
+            try:
+                generation, chunk = self.results.get_nowait()
+            except queue.Empty:
+                break
+            if generation != self._generation:
+                continue   # cancelled
+            if generation != self._shown:
+                self._shown = generation
+                self._values = chunk
+            elif chunk:
+                self._values.extend(chunk)
+            changed = True
+        return self._values if changed else None
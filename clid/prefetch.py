@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+
+"""Read tags of files in the background, before they are shown"""
+
+import queue
+import concurrent.futures
+
+
+class Prefetcher():
+    """Read tags of files in a thread pool, so that the ui doesn't have to
+       wait for slow disks. Results are collected in a queue and applied
+       later by the ui thread(see `get_results`).
+       Attributes:
+            read(callable):
+                Function called(in a worker thread) with the abs path of a
+                file, which returns its tags
+            results(queue.Queue): (path, tags) of files that have been read;
+                tags is None if the file couldn't be read
+    """
+    def __init__(self, read, workers):
+        self.read = read
+        self.results = queue.Queue()
+        self._pool = concurrent.futures.ThreadPoolExecutor(max_workers=workers)
+        self._pending = {}   # abs path as key and future as value
+
+    def request(self, paths):
+        """Read tags of `paths`(in order) in the background. Earlier requests
+           for other files which haven't started yet are cancelled, so that
+           workers are always busy with files near the cursor.
+        """
+        wanted = set(paths)
+        for path, future in list(self._pending.items()):
+            if path not in wanted and future.cancel():
+                del self._pending[path]
+        for path in paths:
+            if path not in self._pending:
+                self._pending[path] = self._pool.submit(self._read, path)
+
+    def _read(self, path):
+        """Runs in a worker thread"""
+        try:
+            tags = self.read(path)
+        except Exception:   # file removed, corrupt tag, etc
+            tags = None
+        self.results.put((path, tags))
+
+    def get_results(self):
+        """Return(list) (path, tags) of all files read since the last call"""
+        results = []
+        while True:
+            try:
+                path, tags = self.results.get_nowait()
+            except queue.Empty:
+                return results
+            self._pending.pop(path, None)
+            results.append((path, tags))
+
+    def shutdown(self):
+        """Cancel all pending reads and stop the workers"""
+        for future in self._pending.values():
+            future.cancel()
+        self._pool.shutdown(wait=False)
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+
+"""Search files by their tags, with queries like
+   `artist:radiohead year:>=1997 genre:rock -comment:live`
+
+   A query is made of terms separated by spaces; a file matches if it
+   matches every term:
+        field:value     value is in the tag(case and accents are ignored);
+                        use quotes for values with spaces: album:"ok computer"
+        field:          tag is set
+        year:>=1997     compare numbers(year, track) with >=, <=, >, <, =
+        word            word is in the filename
+        -term           file doesn't match term
+   Files whose tags haven't been read yet only match filename terms.
+"""
+
+import re
+import operator
+import collections
+
+from . import const
+from . import searchindex
+
+# tags stored as numbers in library.Library, and their columns
+NUMERIC_FIELDS = {'track': 'tracks', 'year': 'years'}
+FIELDS = const.TAG_NAMES + ('year', 'name')
+
+OPERATORS = {
+    '>=': operator.ge,
+    '<=': operator.le,
+    '>': operator.gt,
+    '<': operator.lt,
+    '=': operator.eq,
+    '': operator.eq,
+}
+
+TERM_PAT = re.compile(r'(?P<negate>-)?(?:(?P<field>[a-z_]+):)?(?:"(?P<quoted>[^"]*)"?|(?P<value>\S+))?')
+QUERY_PAT = re.compile(r'(?:^|\s)-?(?:{}):'.format('|'.join(FIELDS)))
+NUMBER_PAT = re.compile(r'(?P<op>>=|<=|>|<|=)?(?P<number>\d+)')
+
+# a single term of a query; field is 'name' for words without a field
+Term = collections.namedtuple('Term', 'field value negate')
+
+
+class InvalidQuery(Exception):
+    """Raised when a query can't be understood"""
+    pass
+
+
+def is_query(text):
+    """Check whether `text` searches by tags(has a term like `artist:...`),
+       instead of being a plain search of filenames
+    """
+    return QUERY_PAT.search(text) is not None
+
+
+def parse(text):
+    """Return list of `Term`s in `text`
+       Raises:
+            InvalidQuery: if a field doesn't exist
+    """
+    terms = []
+    for match in TERM_PAT.finditer(text):
+        if not match.group(0):
+            continue
+        field = match.group('field') or 'name'
+        if field not in FIELDS:
+            raise InvalidQuery('"{}" is not a tag'.format(field))
+        value = match.group('quoted')
+        if value is None:
+            value = match.group('value') or ''
+        terms.append(Term(field, value, bool(match.group('negate'))))
+    return terms
+
+
+def _string_filter(term, library):
+    """Filter for tags stored in `library.strings`. The strings that match
+       are found once, so each row is checked with a set lookup.
+    """
+    column = library.columns[term.field]
+    key = searchindex.fold(term.value)
+    ids = {string_id for string_id, string in enumerate(library.strings.folded())
+           if string and key in string}
+    known = library.known
+    if term.negate:
+        return lambda rows: [row for row in rows if known[row] and column[row] not in ids]
+    return lambda rows: [row for row in rows if column[row] in ids]
+
+
+def _numeric_filter(term, library):
+    """Filter for tags stored as numbers; 0 means the tag is not set"""
+    column = getattr(library, NUMERIC_FIELDS[term.field])
+    if term.value == '':
+        compare, number = operator.ne, 0
+    else:
+        match = NUMBER_PAT.fullmatch(term.value)
+        if match is None:
+            raise InvalidQuery('"{}" is not a number'.format(term.value))
+        compare, number = OPERATORS[match.group('op') or ''], int(match.group('number'))
+    known = library.known
+    if term.negate:
+        return lambda rows: [row for row in rows if known[row] and not
+                             (column[row] and compare(column[row], number))]
+    return lambda rows: [row for row in rows if column[row] and compare(column[row], number)]
+
+
+def _text_filter(term, library):
+    """Filter for values stored as a list of str in `library`(title, filename)"""
+    if term.field == 'name':
+        column, known = library.names, None
+    else:
+        column, known = library.titles, library.known
+    key = searchindex.fold(term.value)
+    if key == '':   # tag is set
+        matches = bool
+    else:
+        matches = lambda value: key in searchindex.fold(value)
+    if term.negate:
+        return lambda rows: [row for row in rows if (known is None or known[row])
+                             and not matches(column[row])]
+    return lambda rows: [row for row in rows if matches(column[row])]
+
+
+def compile_query(text, library):
+    """Compile `text` into a function which takes an iterable of rows(index)
+       of `library` and returns(list) the rows which match the query.
+       Raises:
+            InvalidQuery
+    """
+    filters = []
+    for term in parse(text):
+        if term.field == 'name' and term.value == '':
+            continue   # a lone '-'
+        if term.field in NUMERIC_FIELDS:
+            filters.append((0, _numeric_filter(term, library)))
+        elif term.field in library.columns:
+            filters.append((0, _string_filter(term, library)))
+        else:
+            filters.append((1, _text_filter(term, library)))   # slower; run last
+    filters.sort(key=lambda item: item[0])
+
+    def run(rows):
+        for _, row_filter in filters:
+            rows = row_filter(rows)
+        return list(rows)
+    return run
@@ -2,9 +2,19 @@
 
 """Modified version of stagger to be used by clid"""
 
-import stagger
+import collections
 
 from . import util
+from . import const
+from . import fastid3
+from . import fileutil
+
+
+# plain(picklable, hashable) snapshot of all tag fields of a file
+TagRecord = collections.namedtuple('TagRecord', const.TAG_NAMES)
+
+# bytes of empty space left after a tag when a file has to be rewritten
+DEFAULT_PADDING = 4096
 
 
 def getter_and_setter_for_tag(tag_field):
@@ -30,11 +40,11 @@ class ReadTags():
        default behaviour to make it easy to write code.
     """
     def __init__(self, filename):
+        import stagger   # slow to import, and usually not needed(see `read_tag_record`)
         try:
             self.meta = stagger.read_tag(filename)
         except stagger.NoTagError:
             self.meta = stagger.Tag23()   # create an ID3v2.3 instance
-        self.write = self.meta.write   # for saving to file
 
     date = property(*getter_and_setter_for_tag('date'))
     album = property(*getter_and_setter_for_tag('album'))
@@ -69,3 +79,68 @@ class ReadTags():
         """
         value = '0' if value == '' else value
         self.meta.track = value
+
+    def write(self, filename, padding=DEFAULT_PADDING):
+        """Save the tags to `filename`. If the new tag fits in the space taken
+           by the old one(including its padding), only the tag is overwritten.
+           Otherwise the file is rewritten with `padding` bytes of empty space
+           after the tag, so that later edits fit.
+           Unlike stagger's `Tag.write`, this can be used from any thread:
+           stagger defers SIGINT while writing, and signal handlers can only
+           be set in the main thread.
+           Returns:
+                int: number of bytes written to disk
+        """
+        import stagger
+        with open(filename, 'rb+') as file:
+            try:
+                length = stagger.tags.detect_tag(file)[2]
+            except stagger.NoTagError:
+                length = 0
+            # pad the tag to exactly `length` bytes if it fits in them
+            self.meta.padding_default, self.meta.padding_max = 0, None
+            tag_data = self.meta.encode(size_hint=length)
+            if len(tag_data) == length:
+                file.seek(0)
+                file.write(tag_data)
+                return length
+        tag_data = self.meta.encode(size_hint=len(tag_data) + padding)
+        return fileutil.replace_head(filename, length, tag_data)
+
+    def record(self):
+        """Return a TagRecord holding the current values of all tag fields"""
+        return TagRecord(*(getattr(self, tag) for tag in const.TAG_NAMES))
+
+
+def read_tag_record(filename):
+    """Return a TagRecord of the tags of `filename`. Only the frames holding
+       these tags are decoded(see `fastid3`); the whole tag is parsed by
+       stagger only if that isn't possible.
+    """
+    try:
+        tags = fastid3.read_tags(filename, const.TAG_NAMES)
+    except fastid3.UnsupportedTagError:
+        return ReadTags(filename).record()
+    tags['genre'] = util.resolve_genre(tags['genre'])
+    return TagRecord(**tags)
+
+
+def update_record(record, tags):
+    """Return a copy of `record`(TagRecord) with values from `tags`(dict of
+       name of tag and value), changed the way `ReadTags` changes them:
+       genre is resolved and track number is stripped of leading zeros.
+    """
+    tags = dict(tags)
+    if 'genre' in tags:
+        tags['genre'] = util.resolve_genre(tags['genre'])
+    if tags.get('track'):
+        tags['track'] = str(int(tags['track'])) if int(tags['track']) else ''
+    return record._replace(**tags)
+
+
+def changed_tags(record, tags):
+    """Return(dict) those of `tags`(dict of name of tag and value) which would
+       change `record`(TagRecord) if they were written(see `update_record`)
+    """
+    return {tag: value for tag, value in tags.items()
+            if getattr(update_record(record, {tag: value}), tag) != getattr(record, tag)}
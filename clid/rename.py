@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+
+"""Rename many files at once, with names made from their tags. A plan of all
+   renames is made first(without opening any file), so that files which can't
+   be renamed are found before anything is renamed.
+"""
+
+import os
+import errno
+import collections
+
+from . import const
+
+# longest filename(in bytes) allowed by most filesystems
+MAX_NAME_BYTES = 255
+# at most these many renames are listed by `describe_plan`
+LISTED_RENAMES = 500
+# files in a cycle of renames(like two files swapping names) are moved out
+# of the way first, to a name starting with this
+TEMP_PREFIX = '.clid-rename-'
+
+Rename = collections.namedtuple('Rename', ['old', 'new'])   # abs paths
+
+# renames: list of Rename; skipped: list of (abs path, reason) of files
+# which won't be renamed
+Plan = collections.namedtuple('Plan', ['renames', 'skipped'])
+
+
+class InvalidPattern(Exception):
+    """Error raised when a pattern can't be used to make filenames"""
+    pass
+
+
+def format_name(pattern, record, extension='.mp3'):
+    """Return the filename(ending with `extension`) made by replacing format
+       specifiers(see const.FORMAT_SPECS) in `pattern` with tags in `record`.
+       Path separators in tags are replaced with '-', so 'AC/DC' becomes 'AC-DC'.
+    """
+    def tag(match):
+        spec = match.group()
+        if spec not in const.FORMAT_SPECS:
+            return spec
+        return getattr(record, const.FORMAT_SPECS[spec]).replace(os.sep, '-').replace('\0', '')
+    return const.FORMAT_PAT.sub(tag, pattern).strip() + extension
+
+
+def check_name(name, extension='.mp3'):
+    """Return(str) why `name`(made by `format_name` with `extension`) can't be
+       used as a filename, or None if it can
+    """
+    if name == extension:
+        return 'every tag in the name is empty'
+    if name.startswith('.'):
+        return "name starts with '.', so the file would be hidden"
+    if len(os.fsencode(name)) > MAX_NAME_BYTES:
+        return 'name is longer than {} bytes'.format(MAX_NAME_BYTES)
+    return None
+
+
+def make_plan(pattern, paths, get_record, existing):
+    """Find the new name of each of `paths`, and which of them can't be renamed.
+       Args:
+            pattern(str): Names are made from this(see `format_name`);
+                Eg: '%n - %a - %t'
+            paths(list): abs paths of files to be renamed
+            get_record(callable): Called with an abs path; returns the tags
+                (readtag.TagRecord) of the file, or None if they aren't known
+            existing(container): basenames of all files(including those in
+                `paths`); a file can't take the name of one which is kept
+       Returns:
+            Plan: renames and files skipped. Files whose name doesn't change
+                are left out.
+       Raises:
+            InvalidPattern: if `pattern` would make paths instead of filenames
+    """
+    if os.sep in pattern or '\0' in pattern:
+        raise InvalidPattern("Pattern can't have '{}'".format(os.sep))
+    renames, skipped = [], []
+    for path in paths:
+        record = get_record(path)
+        if record is None:
+            skipped.append((path, "tags haven't been read yet"))
+            continue
+        extension = os.path.splitext(path)[1]   # kept as it is, like '.MP3'
+        name = format_name(pattern, record, extension)
+        problem = check_name(name, extension)
+        if problem is not None:
+            skipped.append((path, problem))
+        elif name != os.path.basename(path):
+            new = os.path.join(os.path.dirname(path), name)
+            # disk is checked once; whether the name is freed may change below
+            renames.append((Rename(path, new), name, os.path.lexists(new)))
+
+    # skipping a file keeps its name taken, which may make more collisions
+    while True:
+        freed_paths = {rename.old for rename, _, _ in renames}
+        freed_names = {os.path.basename(path) for path in freed_paths}
+        wanted = collections.Counter(name for _, name, _ in renames)
+        kept = []
+        for rename, name, on_disk in renames:
+            if wanted[name] > 1:
+                skipped.append((rename.old, 'another file would get the name ' + name))
+            elif rename.new in freed_paths:
+                kept.append((rename, name, on_disk))   # renamed to the old name of another file
+            elif (name in existing and name not in freed_names) or on_disk:
+                skipped.append((rename.old, 'a file named {} already exists'.format(name)))
+            else:
+                kept.append((rename, name, on_disk))
+        if len(kept) == len(renames):
+            return Plan([rename for rename, _, _ in renames], skipped)
+        renames = kept
+
+
+def order_renames(renames):
+    """Return(list) Rename steps which do `renames`(from `make_plan`), so that
+       a file is renamed only after the file with its new name has been renamed.
+       Files in a cycle are first moved to a temporary name.
+    """
+    by_name = {os.path.basename(rename.old): rename for rename in renames}
+    steps = []
+    state = {}   # basename as key; 1 while its chain is followed, 2 once done
+    for name in by_name:
+        chain = []   # each rename waits for the next one
+        while name in by_name and name not in state:
+            state[name] = 1
+            chain.append(name)
+            name = os.path.basename(by_name[name].new)
+        if state.get(name) == 1:   # chain came back to itself
+            rename = by_name[name]
+            temp = os.path.join(os.path.dirname(rename.old), TEMP_PREFIX + name)
+            steps.append(Rename(rename.old, temp))
+            by_name[name] = Rename(temp, rename.new)
+        for name in reversed(chain):
+            steps.append(by_name[name])
+            state[name] = 2
+    return steps
+
+
+def run_plan(plan):
+    """Rename files in `plan`(see `make_plan`). A file is never renamed over
+       one which isn't being renamed(like one made after the plan), and once a
+       rename fails, those which would have taken its name aren't done.
+       Returns:
+            tuple: (done, failed) where done is a list of Rename steps(see
+                `order_renames`) which succeeded, and failed is a list of
+                (Rename, OSError) of those which didn't
+    """
+    steps = order_renames(plan.renames)
+    freed = {step.old for step in steps}   # moved away by an earlier step
+    stuck = set()     # files which should have been moved, but weren't
+    missing = set()   # paths which should have got a file, but didn't
+    done, failed = [], []
+    for step in steps:
+        if step.new in stuck or step.old in missing:
+            error = OSError(errno.ECANCELED, "an earlier rename it needs failed")
+        elif step.new not in freed and os.path.lexists(step.new):
+            error = FileExistsError(errno.EEXIST, os.strerror(errno.EEXIST), step.new)
+        else:
+            try:
+                os.rename(step.old, step.new)
+            except OSError as err:
+                error = err
+            else:
+                done.append(step)
+                continue
+        failed.append((step, error))
+        stuck.add(step.old)
+        missing.add(step.new)
+    return (done, failed)
+
+
+def describe_plan(plan, limit=LISTED_RENAMES):
+    """Return a diff-like listing of `plan`(see `make_plan`), showing files
+       which will be skipped and at most `limit` renames
+    """
+    lines = []
+    if plan.skipped:
+        lines.append('Skipped {} file(s):'.format(len(plan.skipped)))
+        lines.extend('  {}: {}'.format(os.path.basename(path), reason)
+                     for path, reason in plan.skipped[:limit])
+        lines.append('')
+    for rename in plan.renames[:limit]:
+        lines.append('- ' + os.path.basename(rename.old))
+        lines.append('+ ' + os.path.basename(rename.new))
+    if len(plan.renames) > limit:
+        lines.append('... and {} more'.format(len(plan.renames) - limit))
+    return '\n'.join(lines)
+
+
+def describe_failed_renames(failed, limit=10):
+    """Return a message listing renames(from `run_plan`) which failed, showing
+       at most `limit` of them
+    """
+    lines = ['{}: {}'.format(os.path.basename(step.old), error.strerror or error)
+             for step, error in failed[:limit]]
+    return 'Unable to rename {} file(s):\n{}'.format(len(failed), '\n'.join(lines))
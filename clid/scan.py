@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+
+"""Find mp3 files in a directory tree"""
+
+import os
+import queue
+import collections
+import threading
+import concurrent.futures
+
+# number of directories listed at the same time; helps a lot on network mounts
+SCAN_WORKERS = 8
+
+
+def is_mp3_name(name):
+    """Check whether `name`(a basename) is that of an mp3 file. Hidden files
+       are left out, like glob('*.mp3') does: macOS keeps metadata of
+       'song.mp3' in '._song.mp3', and `rename` moves files to hidden names
+       for a while.
+    """
+    return name.lower().endswith('.mp3') and not name.startswith('.')
+
+
+def list_dir(path):
+    """List a single directory.
+       Returns:
+            tuple: (mp3_files, sub_dirs), both lists of (abs path, os.stat_result).
+            Both lists are empty if `path` can't be read.
+    """
+    mp3_files, sub_dirs = [], []
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir():   # follows symlinks
+                        sub_dirs.append((entry.path, entry.stat()))
+                    elif is_mp3_name(entry.name) and entry.is_file():
+                        mp3_files.append((entry.path, entry.stat()))
+                except OSError:   # broken symlink, permission denied, etc
+                    pass
+    except OSError:
+        pass
+    return (mp3_files, sub_dirs)
+
+
+def scan_mp3_dirs(root, workers=SCAN_WORKERS):
+    """Recursively find mp3 files in `root`, listing directories in parallel.
+       Every directory is listed only once, even if it can be reached more
+       than once through symlinks(symlink cycles are not followed).
+       Args:
+            root(str): abs path of directory to be searched
+            workers(int): number of directories to be listed at the same time
+       Yields:
+            list: (abs path, os.stat_result) of mp3 files in a directory, as soon
+            as it is listed. Directories without mp3 files are not yielded.
+    """
+    try:
+        root_stat = os.stat(root)
+    except OSError:
+        return
+    visited = {(root_stat.st_dev, root_stat.st_ino)}
+
+    pool = concurrent.futures.ThreadPoolExecutor(max_workers=workers)
+    # futures are put here as they are done; waiting on all pending futures
+    # each time(concurrent.futures.wait) gets slow with thousands of them
+    listed = queue.Queue()
+    running = set()   # futures not yet taken from `listed`
+    # directories found but not submitted; only a few more than `workers`
+    # are listed ahead of the caller, so that files of directories the
+    # caller hasn't got to yet don't pile up in memory
+    to_list = collections.deque([root])
+
+    try:
+        while to_list or running:
+            while to_list and len(running) < workers * 2:
+                future = pool.submit(list_dir, to_list.popleft())
+                future.add_done_callback(listed.put)
+                running.add(future)
+            future = listed.get()
+            running.discard(future)
+            mp3_files, sub_dirs = future.result()
+            for path, stat in sub_dirs:
+                dir_id = (stat.st_dev, stat.st_ino)
+                if dir_id not in visited:
+                    visited.add(dir_id)
+                    to_list.append(path)
+            if mp3_files:
+                yield mp3_files
+    finally:
+        # the caller may stop iterating before the whole tree is scanned
+        for future in running:
+            future.cancel()
+        pool.shutdown(wait=False)
+
+
+def scan_mp3_files(root, workers=SCAN_WORKERS):
+    """Like `scan_mp3_dirs`, but yield (abs path, os.stat_result) of
+       each mp3 file
+    """
+    for mp3_files in scan_mp3_dirs(root, workers):
+        yield from mp3_files
+
+
+class Scanner():
+    """List mp3 files in a directory tree(see `scan_mp3_dirs`) in a background
+       thread. Files are collected in a queue and added later by the ui
+       thread(see `get_files`), so that files can be shown as they are found
+       instead of after the whole tree has been listed. Indexed tags of the
+       files are looked up in the same thread, as they are found.
+       Attributes:
+            root(str): abs path of directory being listed
+            found(int): Number of files found so far
+            stale(list): abs paths of files whose indexed tags were dropped as
+                the files changed or were removed(see `tagindex.TagIndex.sync`),
+                once the whole tree has been listed
+    """
+    def __init__(self, root, tag_index, workers=SCAN_WORKERS):
+        self.root = root
+        self.found = 0
+        self.stale = []
+        self._tag_index = tag_index
+        self._files = queue.Queue()
+        self._stopped = threading.Event()
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(workers,), daemon=True)
+        self._thread.start()
+
+    def _run(self, workers):
+        """Body of the background thread"""
+        stats = {}
+        dirs = scan_mp3_dirs(self.root, workers)
+        try:
+            for mp3_files in dirs:
+                if self._stopped.is_set():
+                    return
+                dir_stats = dict(mp3_files)
+                records = self._tag_index.get_many(dir_stats)
+                self._files.put([(path, stat, records.get(path)) for path, stat in mp3_files])
+                stats.update(dir_stats)
+                self.found += len(mp3_files)
+            self.stale = self._tag_index.sync(stats, root=os.path.join(self.root, ''))
+        finally:
+            dirs.close()
+            self._done.set()
+
+    def get_files(self, limit=None):
+        """Return(list) (abs path, os.stat_result, record) of files found since
+           the last call, where record is the readtag.TagRecord of the file if
+           it is indexed and hasn't changed since, and None otherwise. Files of
+           a directory are taken together; no more directories are taken once
+           there are at least `limit` files.
+        """
+        files = []
+        while limit is None or len(files) < limit:
+            try:
+                files.extend(self._files.get_nowait())
+            except queue.Empty:
+                break
+        return files
+
+    def finished(self):
+        """Check whether the whole tree has been listed, and every file taken"""
+        return self._done.is_set() and self._files.empty()
+
+    def stop(self):
+        """Stop listing. The thread exits after the directory being listed."""
+        self._stopped.set()
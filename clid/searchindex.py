@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+
+"""Index of names of files, used to search them as the user types"""
+
+import re
+import heapq
+import array
+import bisect
+import unicodedata
+import collections
+
+# number of recent queries whose results are kept
+CACHED_QUERIES = 32
+# a query is considered to match most names if it matches more than
+# 1/DENSE of them; such queries are answered by checking every name
+DENSE = 8
+# number of results of a fuzzy search; only the best matches are worth showing
+FUZZY_RESULTS = 500
+# names added to or removed from an index after it was made, beyond which
+# searches slow down enough that the index should be made again
+MAX_CHANGES = 1000
+
+# scores of a fuzzy match(see `fuzzy_score`), similar to those used by fzf
+SCORE_MATCH = 16          # every char of the query
+BONUS_BOUNDARY = 8        # char at the start of a word
+BONUS_CONSECUTIVE = 4     # char right after the previous one
+BONUS_FIRST_CHAR = 2      # bonus of the first char is multiplied by this
+PENALTY_GAP_START = 3     # chars skipped between two chars of the query
+PENALTY_GAP_EXTENSION = 1
+SEPARATORS = frozenset(' \t-_.,;:/\\()[]{}&+\'"')
+
+
+def fold(text):
+    """Return `text` casefolded and without accents, so that 'Björk' and
+       'bjork' are the same
+    """
+    if text.isascii():
+        return text.lower()
+    text = unicodedata.normalize('NFKD', text.casefold())
+    return ''.join(char for char in text if not unicodedata.combining(char))
+
+
+def fuzzy_score(key, name):
+    """Return(int) how well `name` matches the chars of `key` in order, or
+       None if it doesn't. Both should be folded(see `fold`). The chars
+       are found from the left, then the match is made as short as it can
+       be without moving its end, like fzf's v1 algorithm. Chars at the
+       start of words and chars right after each other score higher; the
+       score is highest if `key` is at the start of a word.
+    """
+    end = -1
+    for char in key:
+        end = name.find(char, end + 1)
+        if end == -1:
+            return None
+    start = end + 1
+    for char in reversed(key):
+        start = name.rfind(char, 0, start)
+
+    score = 0
+    position = start - 1
+    chunk_bonus = 0   # bonus of the first char of the current run of chars
+    for char in key:
+        found = name.find(char, position + 1)
+        bonus = BONUS_BOUNDARY if found == 0 or name[found - 1] in SEPARATORS else 0
+        if found == position + 1 and position >= start:
+            bonus = max(bonus, chunk_bonus, BONUS_CONSECUTIVE)
+        else:
+            if position >= start:
+                score -= PENALTY_GAP_START + PENALTY_GAP_EXTENSION * (found - position - 2)
+            chunk_bonus = bonus
+        if position < start:
+            bonus *= BONUS_FIRST_CHAR
+        score += SCORE_MATCH + bonus
+        position = found
+    return score
+
+
+class SearchIndex():
+    """Find names which contain a string, ignoring case and accents. Folded
+       names(see `fold`) are joined into a single string with a newline after
+       each, which is searched with `str.find`; this skips over names which
+       don't match without running any Python code for them. Results of
+       recent queries are kept, so that typing more characters only has to
+       check names which matched before, and backspace is instant.
+       Names can be added and removed(like when a file is renamed) without
+       making the index again; names added are kept apart and checked one by
+       one, and names removed are left out of results(see `changes`).
+       Attributes:
+            names(tuple): sorted names that are searched, as they were when
+                the index was made
+            ids(array.array): id of each name(like its row in a library),
+                returned by searches; ids of names added later follow
+    """
+    def __init__(self, names, ids=None):
+        self.names = tuple(names)
+        self.ids = array.array('I', range(len(self.names)) if ids is None else ids)
+        # newlines separate names in `_blob`, so they can't be in a name
+        self._blob = '\n'.join(fold(name).replace('\n', '\0') for name in self.names)
+        self._starts = array.array('I')   # offset of each name in `_blob`
+        offset = 0
+        for name in self._blob.split('\n'):
+            self._starts.append(offset)
+            offset += len(name) + 1
+        self._starts.append(offset)   # makes the end of the last name easy to find
+        self._recent = collections.OrderedDict()   # folded query as key and rows as value
+        self._recent_fuzzy = collections.OrderedDict()   # same, for fuzzy searches
+        # names added later are rows len(names) onwards
+        self._size = len(self.names)
+        self._extra = []         # folded names added later
+        self._extra_names = []   # and the names themselves
+        self._ranks = []         # index in `names` before which they belong
+        self._removed = set()    # rows of names removed
+
+    @property
+    def changes(self):
+        """Number of names added or removed since the index was made"""
+        return len(self._extra) + len(self._removed)
+
+    def add(self, name, name_id):
+        """Add `name`, which is found by searches as `name_id`"""
+        self._extra.append(fold(name).replace('\n', '\0'))
+        self._extra_names.append(name)
+        self._ranks.append(bisect.bisect_left(self.names, name))
+        self.ids.append(name_id)
+        self._forget_recent()
+
+    def remove(self, name):
+        """Remove `name`, if it is in the index"""
+        row = self._row_of(name)
+        if row is not None:
+            self._removed.add(row)
+            self._forget_recent()
+
+    def id_of(self, name):
+        """Return the id of `name`, or None if it is not in the index"""
+        row = self._row_of(name)
+        return None if row is None else self.ids[row]
+
+    def search(self, query):
+        """Return(array.array) ids of names containing `query`, in the order
+           they are in `names`
+        """
+        key = fold(query)
+        if '\n' in key:
+            return array.array('I')
+        rows = self._recent.get(key)
+        if rows is None:
+            rows = self._find(key)
+            self._recent[key] = rows
+            if len(self._recent) > CACHED_QUERIES:
+                self._recent.popitem(last=False)
+        else:
+            self._recent.move_to_end(key)
+        if self._removed:
+            rows = [row for row in rows if row not in self._removed]
+        if self._extra:
+            rows = self._in_order(rows)
+        return array.array('I', map(self.ids.__getitem__, rows))
+
+    def fuzzy_search(self, query, limit=FUZZY_RESULTS):
+        """Return(array.array) ids of at most `limit` names which have the
+           chars of `query` in order, best matches(see `fuzzy_score`) first.
+           Shorter names come first among names with the same score.
+        """
+        key = fold(query)
+        if key == '' or '\n' in key:
+            return array.array('I')
+        rows = self._recent_fuzzy.get(key)
+        if rows is None:
+            rows = self._find_fuzzy(key)
+            self._recent_fuzzy[key] = rows
+            if len(self._recent_fuzzy) > CACHED_QUERIES:
+                self._recent_fuzzy.popitem(last=False)
+        else:
+            self._recent_fuzzy.move_to_end(key)
+
+        if self._removed:
+            rows = [row for row in rows if row not in self._removed]
+
+        starts, name, size, extra = self._starts, self._key, self._size, self._extra
+        length = lambda row: starts[row + 1] - starts[row] if row < size else len(extra[row - size]) + 1
+        # no name scores higher than those with `key` at the start of a word,
+        # so other names don't have to be scored if there are enough of them
+        perfect = [row for row in rows if _at_word_start(key, name(row))]
+        best = heapq.nsmallest(limit, perfect, key=lambda row: (length(row), row))
+        if len(best) < limit:
+            perfect = set(perfect)
+            scored = ((-fuzzy_score(key, name(row)), length(row), row) for row in rows
+                      if row not in perfect)
+            best.extend(row for _, _, row in heapq.nsmallest(limit - len(best), scored))
+        return array.array('I', map(self.ids.__getitem__, best))
+
+    def _find_fuzzy(self, key):
+        """Return(array.array) index of names which have the chars of `key` in order"""
+        # names matching `key` also match every query whose chars are in
+        # `key` in order, like a query typed before `key`
+        if len(key) == 1:
+            return self._find(key)
+        candidates = min((rows for old_key, rows in self._recent_fuzzy.items()
+                          if _is_subsequence(old_key, key)), key=len, default=None)
+        pattern = re.compile('[^\n]*?'.join(re.escape(char) for char in key))
+        if candidates is not None:
+            search = pattern.search
+            return array.array('I', (row for row in candidates if search(self._key(row))))
+        return self._find_all(pattern)
+
+    def _find_all(self, pattern):
+        """Return(array.array) index of names in which compiled `pattern` is found.
+           `pattern` must not match newlines.
+        """
+        rows = array.array('I')
+        search, starts = pattern.search, self._starts
+        match = search(self._blob)
+        while match is not None:
+            row = bisect.bisect_right(starts, match.start()) - 1
+            rows.append(row)
+            match = search(self._blob, starts[row + 1])   # continue from the next name
+        rows.extend(self._find_extra(search))
+        return rows
+
+    def _key(self, row):
+        """Return the folded name of `row`"""
+        if row >= self._size:
+            return self._extra[row - self._size]
+        return self._blob[self._starts[row]:self._starts[row + 1] - 1]
+
+    def _find(self, key):
+        """Return(array.array) index of names containing `key`"""
+        dense = len(self.names) // DENSE
+        # names containing `key` also contain every part of it, so results of
+        # an earlier query that is a part of `key` are the only candidates
+        candidates = min((rows for old_key, rows in self._recent.items() if old_key in key),
+                         key=len, default=None)
+        if candidates is not None and len(candidates) < dense:
+            return array.array('I', (row for row in candidates if key in self._key(row)))
+        if self._blob.count(key) > dense:
+            rows = array.array('I', (row for row, name in enumerate(self._blob.split('\n'))
+                                     if key in name))
+        else:
+            rows = array.array('I')
+            find, starts = self._blob.find, self._starts
+            position = find(key)
+            while position != -1:
+                row = bisect.bisect_right(starts, position) - 1
+                rows.append(row)
+                position = find(key, starts[row + 1])   # continue from the next name
+        rows.extend(self._find_extra(lambda name: key in name))
+        return rows
+
+    def _find_extra(self, matches):
+        """Return(list) rows of names added later, whose folded name `matches`"""
+        return [self._size + index for index, name in enumerate(self._extra) if matches(name)]
+
+    def _row_of(self, name):
+        """Return the row of `name`, or None if it is not in the index"""
+        for index in range(len(self._extra_names) - 1, -1, -1):   # added last, found first
+            if self._extra_names[index] == name and self._size + index not in self._removed:
+                return self._size + index
+        row = bisect.bisect_left(self.names, name)
+        if row < self._size and self.names[row] == name and row not in self._removed:
+            return row
+        return None
+
+    def _in_order(self, rows):
+        """Return(list) `rows` with rows of names added later moved to where
+           they belong in `names`
+        """
+        size, ranks, extra_names = self._size, self._ranks, self._extra_names
+        extra = sorted((row for row in rows if row >= size),
+                       key=lambda row: (ranks[row - size], extra_names[row - size]))
+        if not extra:
+            return rows
+        # a name added later comes before the name at its rank
+        key = lambda row: (row, 1, '') if row < size else \
+            (ranks[row - size], 0, extra_names[row - size])
+        return list(heapq.merge((row for row in rows if row < size), extra, key=key))
+
+    def _forget_recent(self):
+        """Forget results of recent queries, as names have changed"""
+        self._recent.clear()
+        self._recent_fuzzy.clear()
+
+
+def _at_word_start(key, name):
+    """Check whether `key` is at the start of a word in `name`"""
+    position = name.find(key)
+    while position != -1:
+        if position == 0 or name[position - 1] in SEPARATORS:
+            return True
+        position = name.find(key, position + 1)
+    return False
+
+
+def _is_subsequence(part, text):
+    """Check whether chars of `part` are in `text` in order"""
+    chars = iter(text)
+    return all(char in chars for char in part)
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+
+"""Set of files selected for batch tagging"""
+
+
+class Selection():
+    """Set of selected rows(index) of a library.Library. A byte is kept for
+       every row up to the last one selected, so checking whether a row is
+       selected doesn't depend on how many are selected, and the selection
+       doesn't change when the files shown are filtered by a search.
+    """
+    def __init__(self):
+        self._bits = bytearray()
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def __contains__(self, row):
+        return row < len(self._bits) and self._bits[row] == 1
+
+    def __iter__(self):
+        """Yield selected rows in increasing order"""
+        find, row = self._bits.find, -1
+        while True:
+            row = find(1, row + 1)
+            if row == -1:
+                return
+            yield row
+
+    def add(self, row):
+        """Select `row`"""
+        if row >= len(self._bits):
+            self._bits.extend(bytes(row + 1 - len(self._bits)))
+        if not self._bits[row]:
+            self._bits[row] = 1
+            self._count += 1
+
+    def discard(self, row):
+        """Deselect `row` if it is selected"""
+        if row in self:
+            self._bits[row] = 0
+            self._count -= 1
+
+    def toggle(self, row):
+        """Select `row` if it isn't selected, deselect it otherwise"""
+        if row in self:
+            self.discard(row)
+        else:
+            self.add(row)
+
+    def update(self, rows):
+        """Select all of `rows`"""
+        for row in rows:
+            self.add(row)
+
+    def difference_update(self, rows):
+        """Deselect all of `rows`"""
+        for row in rows:
+            self.discard(row)
+
+    def invert(self, rows):
+        """Select those of `rows` which aren't selected, and deselect everything
+           else(including rows not in `rows`)
+        """
+        old = self._bits
+        self.clear()
+        self.update(row for row in rows if not (row < len(old) and old[row]))
+
+    def clear(self):
+        """Deselect all rows"""
+        self._bits = bytearray()
+        self._count = 0
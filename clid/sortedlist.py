@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+
+"""List which keeps its items sorted as they are added and removed"""
+
+import bisect
+import itertools
+
+# max number of items in a sublist of SortedList is twice this
+LOAD = 1000
+# `update` makes the list again if it adds at least 1/REBUILD_RATIO as many
+# items as there are
+REBUILD_RATIO = 16
+
+
+class SortedList():
+    """Sequence of sorted(and unique) items, like basenames of files in the
+       order they are shown. Items are kept in sublists of at most 2 * `LOAD`
+       items, so adding or removing an item moves only the items of a single
+       sublist, and finding an item or the item at an index is a binary search,
+       however many items there are.
+    """
+    def __init__(self, items=()):
+        items = sorted(items)
+        self._lists = [items[start:start + LOAD] for start in range(0, len(items), LOAD)]
+        self._maxes = [sublist[-1] for sublist in self._lists]   # last item of each sublist
+        self._len = len(items)
+        self._offsets = None   # index of the first item of each sublist; see `_locate`
+
+    def __len__(self):
+        return self._len
+
+    def __iter__(self):
+        return itertools.chain.from_iterable(self._lists)
+
+    def __contains__(self, item):
+        try:
+            self._find(item)
+        except ValueError:
+            return False
+        return True
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self._len)
+            if step != 1:
+                return list(self)[index]
+            items = []
+            if start >= stop:
+                return items
+            sublist, position = self._locate(start)
+            while len(items) < stop - start:
+                items.extend(self._lists[sublist][position:position + stop - start - len(items)])
+                sublist, position = sublist + 1, 0
+            return items
+        if index < 0:
+            index += self._len
+        if not 0 <= index < self._len:
+            raise IndexError('SortedList index out of range')
+        sublist, position = self._locate(index)
+        return self._lists[sublist][position]
+
+    def __repr__(self):
+        return '{}({} items)'.format(self.__class__.__name__, self._len)
+
+    def index(self, item):
+        """Return the index of `item`.
+           Raises:
+                ValueError: if `item` is not in the list
+        """
+        sublist, position = self._find(item)
+        if self._offsets is None:
+            self._make_offsets()
+        return self._offsets[sublist] + position
+
+    def add(self, item):
+        """Insert `item` where it belongs"""
+        if not self._lists:
+            self._lists.append([item])
+            self._maxes.append(item)
+        else:
+            sublist = bisect.bisect_left(self._maxes, item)
+            if sublist == len(self._maxes):   # after every item
+                sublist -= 1
+                self._lists[sublist].append(item)
+                self._maxes[sublist] = item
+            else:
+                bisect.insort(self._lists[sublist], item)
+            if len(self._lists[sublist]) > 2 * LOAD:   # split it in two
+                items = self._lists[sublist]
+                self._lists[sublist:sublist + 1] = [items[:LOAD], items[LOAD:]]
+                self._maxes[sublist:sublist + 1] = [items[LOAD - 1], items[-1]]
+        self._len += 1
+        self._offsets = None
+
+    def update(self, items):
+        """Insert each of `items`, none of which should be in the list already.
+           If there are many of them, the list is made again, which is much
+           quicker than inserting them one by one.
+        """
+        new = sorted(items)
+        if len(new) * REBUILD_RATIO <= self._len:
+            for item in new:
+                self.add(item)
+        else:
+            # two sorted runs, which sorted() merges in a single pass
+            self.__init__(list(self) + new)
+
+    def remove(self, item):
+        """Remove `item`.
+           Raises:
+                ValueError: if `item` is not in the list
+        """
+        sublist, position = self._find(item)
+        items = self._lists[sublist]
+        del items[position]
+        if items:
+            self._maxes[sublist] = items[-1]
+        else:
+            del self._lists[sublist]
+            del self._maxes[sublist]
+        self._len -= 1
+        self._offsets = None
+
+    def _find(self, item):
+        """Return (sublist, position) of `item`; raises ValueError if it is missing"""
+        sublist = bisect.bisect_left(self._maxes, item)
+        if sublist < len(self._maxes):
+            items = self._lists[sublist]
+            position = bisect.bisect_left(items, item)
+            if items[position] == item:
+                return (sublist, position)
+        raise ValueError('{!r} is not in list'.format(item))
+
+    def _locate(self, index):
+        """Return (sublist, position) of the item at `index`(0 <= index < len)"""
+        if self._offsets is None:
+            self._make_offsets()
+        sublist = bisect.bisect_right(self._offsets, index) - 1
+        return (sublist, index - self._offsets[sublist])
+
+    def _make_offsets(self):
+        """Find the index of the first item of each sublist. Done only after
+           items have been added or removed, and an index is needed.
+        """
+        self._offsets = [0]
+        self._offsets.extend(itertools.accumulate(map(len, self._lists)))
+        self._offsets.pop()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+
+"""In-memory cache of tags of files, with a limit on its size"""
+
+import sys
+import collections
+
+
+def size_of_record(path, record):
+    """Return the approximate number of bytes used by an entry in TagCache"""
+    return (sys.getsizeof(path) + sys.getsizeof(record)
+            + sum(sys.getsizeof(value) for value in record))
+
+
+class TagCache():
+    """Cache of tags(readtag.TagRecord) with abs path of file as key. When
+       the cache grows larger than `max_bytes`, least recently used entries
+       are removed.
+       Attributes:
+            max_bytes(int): Maximum(approximate) size of the cache
+            size(int): Current(approximate) size of the cache in bytes
+    """
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._records = collections.OrderedDict()
+
+    def __contains__(self, path):
+        return path in self._records
+
+    def __len__(self):
+        return len(self._records)
+
+    def get(self, path, default=None):
+        """Return the tags of `path` and mark it as recently used"""
+        try:
+            self._records.move_to_end(path)
+        except KeyError:
+            return default
+        return self._records[path]
+
+    def put(self, path, record):
+        """Add or replace tags of `path`, removing old entries if necessary"""
+        self.pop(path)
+        self._records[path] = record
+        self.size += size_of_record(path, record)
+        self._shrink()
+
+    def pop(self, path):
+        """Remove `path` from the cache and return its tags(None if not cached)"""
+        record = self._records.pop(path, None)
+        if record is not None:
+            self.size -= size_of_record(path, record)
+        return record
+
+    def resize(self, max_bytes):
+        """Change the maximum size of the cache"""
+        self.max_bytes = max_bytes
+        self._shrink()
+
+    def clear(self):
+        """Remove everything from the cache"""
+        self._records.clear()
+        self.size = 0
+
+    def _shrink(self):
+        """Remove least recently used entries until the cache fits in `max_bytes`"""
+        while self.size > self.max_bytes and self._records:
+            path, record = self._records.popitem(last=False)
+            self.size -= size_of_record(path, record)
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+
+"""Persistent on-disk index of the tags of mp3 files, so that files which
+   haven't changed since the last run don't have to be read again.
+"""
+
+import os
+import sqlite3
+import threading
+
+from . import const
+from . import readtag
+
+# location of the index file
+INDEX_FILE = const.CONFIG_DIR + 'index.db'
+
+# max number of paths looked up by a single query(sqlite allows 999 variables)
+MAX_VARIABLES = 500
+
+# bumped whenever the layout of the table(or the way tags are read) changes;
+# old indexes are rebuilt
+SCHEMA_VERSION = 2
+
+_COLUMNS = ', '.join(const.TAG_NAMES)
+_PLACEHOLDERS = ', '.join('?' * (len(const.TAG_NAMES) + 4))
+
+
+def stat_key(stat):
+    """Return the values from `stat`(os.stat_result) which are compared to
+       decide whether a file has changed since it was indexed.
+    """
+    return (stat.st_size, stat.st_mtime_ns, stat.st_ino)
+
+
+class TagIndex():
+    """SQLite backed store of tags, keyed by the absolute path of a file.
+       Size, mtime and inode of the file are stored along with its tags;
+       an entry is dropped when any of them changes(see `sync`).
+       Attributes:
+            _conn(sqlite3.Connection): Connection to the index file
+            _lock(threading.Lock):
+                A connection cannot be used by more than one thread at a time
+    """
+    def __init__(self, filename=INDEX_FILE):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(filename, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._create_table()
+
+    def _create_table(self):
+        """Create the table, dropping an index made by an older version of clid"""
+        version = self._conn.execute('PRAGMA user_version').fetchone()[0]
+        if version != SCHEMA_VERSION:
+            self._conn.execute('DROP TABLE IF EXISTS tags')
+            self._conn.execute('PRAGMA user_version = {}'.format(SCHEMA_VERSION))
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS tags ('
+            'path TEXT PRIMARY KEY, size INTEGER, mtime INTEGER, inode INTEGER, '
+            + ', '.join(tag + ' TEXT' for tag in const.TAG_NAMES) + ')'
+        )
+        self._conn.commit()
+
+    def sync(self, stats, root):
+        """Forget files under `root` which have changed on disk since they were
+           indexed, or which no longer exist.
+           Args:
+                stats(dict): abs path as key and os.stat_result as value, of
+                    every mp3 file currently in `root`
+                root(str): abs path of the directory `stats` was made from
+           Returns:
+                list: abs paths of files that were forgotten
+        """
+        with self._lock:
+            rows = self._conn.execute('SELECT path, size, mtime, inode FROM tags')
+            stale = []
+            for path, *key in rows:
+                if path in stats:
+                    if tuple(key) != stat_key(stats[path]):
+                        stale.append((path,))
+                elif path.startswith(root):
+                    stale.append((path,))
+            self._conn.executemany('DELETE FROM tags WHERE path = ?', stale)
+            self._conn.commit()
+        return [path for path, in stale]
+
+    def forget_missing(self, root):
+        """Forget files under `root` which no longer exist. Unlike `sync`, the
+           stat data of every file isn't needed, so memory used doesn't grow
+           with the number of files; each indexed file is looked up on disk.
+           Files which have changed are left to be replaced by `put_many`.
+           Returns:
+                list: abs paths of files that were forgotten
+        """
+        with self._lock:
+            rows = self._conn.execute('SELECT path FROM tags WHERE substr(path, 1, ?) = ?',
+                                      (len(root), root))
+            missing = [(path,) for path, in rows if not os.path.lexists(path)]
+            self._conn.executemany('DELETE FROM tags WHERE path = ?', missing)
+            self._conn.commit()
+        return [path for path, in missing]
+
+    def get(self, path, stat=None):
+        """Return the TagRecord of `path`, or None if it is not indexed.
+           Args:
+                stat(os.stat_result): if given, None is also returned if the
+                    file has changed since it was indexed
+        """
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT size, mtime, inode, {} FROM tags WHERE path = ?'.format(_COLUMNS), (path,)
+            ).fetchone()
+        if row is None or (stat is not None and tuple(row[:3]) != stat_key(stat)):
+            return None
+        return readtag.TagRecord(*row[3:])
+
+    def get_many(self, stats):
+        """Return(dict) abs path as key and TagRecord as value, of the files in
+           `stats`(dict of abs path and os.stat_result) which are indexed and
+           haven't changed since
+        """
+        paths = list(stats)
+        rows = []
+        with self._lock:
+            for start in range(0, len(paths), MAX_VARIABLES):
+                batch = paths[start:start + MAX_VARIABLES]
+                rows.extend(self._conn.execute(
+                    'SELECT path, size, mtime, inode, {} FROM tags WHERE path IN ({})'.format(
+                        _COLUMNS, ', '.join('?' * len(batch))), batch
+                ))
+        return {row[0]: readtag.TagRecord(*row[4:]) for row in rows
+                if tuple(row[1:4]) == stat_key(stats[row[0]])}
+
+    def put(self, path, stat, record):
+        """Add or replace the tags of `path`.
+           Args:
+                stat(os.stat_result): stat data of `path` when it was read
+                record(readtag.TagRecord): tags of `path`
+        """
+        self.put_many([(path, stat, record)])
+
+    def put_many(self, entries):
+        """Like `put`, for each (path, stat, record) in `entries`, saving all of
+           them at once
+        """
+        with self._lock:
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO tags VALUES ({})'.format(_PLACEHOLDERS),
+                ((path, *stat_key(stat), *record) for path, stat, record in entries)
+            )
+            self._conn.commit()
+
+    def rename(self, old, new):
+        """Move the entry of `old` to `new`. A rename doesn't change size,
+           mtime or inode of a file, so the entry stays valid.
+        """
+        self.rename_many([(old, new)])
+
+    def rename_many(self, renames):
+        """Like `rename`, for each (old, new) in `renames`, in order. All
+           of them are saved at once, which is much faster for many files.
+        """
+        with self._lock:
+            for old, new in renames:
+                self._conn.execute('DELETE FROM tags WHERE path = ?', (new,))
+                self._conn.execute('UPDATE tags SET path = ? WHERE path = ?', (new, old))
+            self._conn.commit()
+
+    def remove(self, path):
+        """Forget `path`"""
+        with self._lock:
+            self._conn.execute('DELETE FROM tags WHERE path = ?', (path,))
+            self._conn.commit()
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+
+"""Write tags to many files at once, or in the background"""
+
+import os
+import queue
+import atexit
+import threading
+import collections
+import concurrent.futures
+
+from . import util
+from . import readtag
+
+# number of files written at the same time
+WRITE_WORKERS = 4
+# batches of files waiting to be written, for each worker; see `write_tags_to_many_files`
+PENDING_PER_WORKER = 4
+# number of files sent to a worker process at a time
+PROCESS_BATCH = 32
+
+# result of writing tags to a file; see `write_tags_to_files`
+WriteResult = collections.namedtuple('WriteResult', 'path record written error')
+
+
+def write_tags(path, tags, padding=readtag.DEFAULT_PADDING):
+    """Write `tags` to a file.
+       Args:
+            path(str): abs path of the file
+            tags(dict): name of tag as key and its new value as value; tags
+                not in it are left as they are
+            padding(int): see `readtag.ReadTags.write`
+       Returns:
+            tuple: (record, written) where record is the readtag.TagRecord of
+                all tags of the file after writing, and written is the number
+                of bytes written to disk
+    """
+    meta = readtag.ReadTags(path)
+    for tag, value in tags.items():
+        setattr(meta, tag, value)
+    written = meta.write(path, padding=padding)
+    return (meta.record(), written)
+
+
+def write_tags_to_files(paths, tags, padding=readtag.DEFAULT_PADDING,
+                        workers=WRITE_WORKERS, processes=False):
+    """Write the same `tags` to many files(see `write_tags_to_many_files`)"""
+    return write_tags_to_many_files(((path, tags) for path in paths), padding=padding,
+                                    workers=workers, processes=processes)
+
+
+def write_tags_to_many_files(jobs, padding=readtag.DEFAULT_PADDING,
+                             workers=WRITE_WORKERS, processes=False):
+    """Write tags to many files in a thread pool(see `write_tags`). Files are
+       written in the background while results are consumed; the remaining
+       files are cancelled if the generator is closed early.
+       Args:
+            jobs(iterable): (path, tags) of each file; taken only as files are
+                written, so that a long stream of jobs isn't held in memory
+            processes(bool): Use a pool of processes instead; encoding tags
+                keeps a thread busy, so this is faster for large batches.
+                Files are sent to a process `PROCESS_BATCH` at a time.
+       Yields:
+            WriteResult: for each file as soon as it is done; error is None if
+                the file was saved, else record is None, written is 0 and
+                error is the exception
+    """
+    if processes:
+        pool, batch_size = util.process_pool(workers), PROCESS_BATCH
+    else:
+        pool, batch_size = concurrent.futures.ThreadPoolExecutor(max_workers=workers), 1
+    with pool:
+        # at most these many batches are waiting to be written at a time
+        max_pending = (workers or os.cpu_count() or 1) * PENDING_PER_WORKER
+        futures = {}
+        try:
+            for batch in util.batches(jobs, batch_size):
+                futures[pool.submit(write_tags_to_batch, batch, padding)] = batch
+                if len(futures) >= max_pending:
+                    done, _ = concurrent.futures.wait(
+                        futures, return_when=concurrent.futures.FIRST_COMPLETED
+                    )
+                    for future in done:
+                        yield from _results_of(future, futures.pop(future))
+            for future in concurrent.futures.as_completed(futures):
+                yield from _results_of(future, futures[future])
+        finally:
+            for future in futures:
+                future.cancel()
+
+
+def write_tags_to_batch(batch, padding):
+    """Return(list) WriteResult of writing each (path, tags) in `batch`"""
+    results = []
+    for path, tags in batch:
+        try:
+            results.append(WriteResult(path, *write_tags(path, tags, padding), error=None))
+        except Exception as error:   # permission denied, corrupt tag, etc
+            results.append(WriteResult(path, None, 0, error))
+    return results
+
+
+def _results_of(future, batch):
+    """Return(list) WriteResult of `future`(done) which wrote `batch`"""
+    try:
+        return future.result()
+    except Exception as error:   # worker process was killed, etc
+        return [WriteResult(path, None, 0, error) for path, _ in batch]
+
+
+class WriteBehindQueue():
+    """Write tags to files in a background thread, so that the ui doesn't
+       wait for the disk. Tags queued for a file which hasn't been written
+       yet are merged with the new ones, so that it is written only once.
+       Results are collected in a queue and applied later by the ui
+       thread(see `get_results`).
+       Attributes:
+            results(queue.Queue): WriteResult of files that have been written
+    """
+    def __init__(self):
+        self.results = queue.Queue()
+        self._pending = collections.OrderedDict()   # path as key and (tags, padding) as value
+        self._writing = None   # (path, tags) being written
+        self._changed = threading.Condition()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        # don't lose edits if the app exits in some other way than `ClidApp.quit`
+        atexit.register(self.flush)
+
+    def __len__(self):
+        """Number of files waiting to be written"""
+        with self._changed:
+            return len(self._pending) + (self._writing is not None)
+
+    def put(self, path, tags, padding=readtag.DEFAULT_PADDING):
+        """Write `tags`(see `write_tags`) to `path` in the background"""
+        with self._changed:
+            pending_tags = self._pending.get(path, ({}, padding))[0]
+            pending_tags.update(tags)
+            self._pending[path] = (pending_tags, padding)
+            self._changed.notify_all()
+
+    def pending_tags(self, path):
+        """Return(dict) tags queued for `path` which haven't been written yet,
+           or None if no tags are queued for it
+        """
+        with self._changed:
+            tags = None
+            if self._writing is not None and self._writing[0] == path:
+                tags = dict(self._writing[1])
+            if path in self._pending:
+                tags = tags or {}
+                tags.update(self._pending[path][0])
+            return tags
+
+    def _run(self):
+        """Body of the background thread"""
+        while True:
+            with self._changed:
+                while not self._pending:
+                    self._changed.wait()
+                path, (tags, padding) = self._pending.popitem(last=False)
+                self._writing = (path, tags)
+            try:
+                result = WriteResult(path, *write_tags(path, tags, padding), error=None)
+            except Exception as error:   # permission denied, file removed, etc
+                result = WriteResult(path, None, 0, error)
+            self.results.put(result)
+            with self._changed:
+                self._writing = None
+                self._changed.notify_all()
+
+    def flush(self):
+        """Wait until all queued files have been written"""
+        with self._changed:
+            while self._pending or self._writing is not None:
+                self._changed.wait()
+
+    def get_results(self):
+        """Return(list) WriteResult of all files written since the last call"""
+        results = []
+        while True:
+            try:
+                results.append(self.results.get_nowait())
+            except queue.Empty:
+                return results
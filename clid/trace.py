@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+
+"""Time taken by each phase of startup, shown by `clid --startup-trace`
+   after the app is closed. Imported first(see `clid/__init__.py`), so
+   that the time taken to import the rest of clid is counted too.
+"""
+
+import sys
+import time
+
+# time.perf_counter() when clid started being imported
+STARTED = time.perf_counter()
+
+enabled = False
+# (phase, time.perf_counter() when it ended) of each phase, in order
+_phases = []
+
+
+def mark(phase):
+    """Note that `phase`(str) has just ended, the first time it ends"""
+    if enabled and all(name != phase for name, _ in _phases):
+        _phases.append((phase, time.perf_counter()))
+
+
+def report(file=sys.stderr):
+    """Print the time taken by each phase, and since clid started"""
+    print('Startup trace\n  {:<18} {:>9} {:>8}'.format('phase', 'ms', 'total'), file=file)
+    last = STARTED
+    for phase, ended in _phases:
+        print('  {:<18} {:>9.1f} {:>8.1f}'.format(
+            phase, (ended - last) * 1000, (ended - STARTED) * 1000), file=file)
+        last = ended
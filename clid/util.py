@@ -2,6 +2,8 @@
 
 """Common utilities for clid"""
 
+import os
+
 from . import const
 
 
@@ -36,6 +38,53 @@ def resolve_genre(num_gen):
         return num_gen
 
 
+def batches(iterable, size):
+    """Yield lists of `size` items of `iterable`(the last one may be shorter)"""
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def process_pool(workers=None):
+    """Return a concurrent.futures.ProcessPoolExecutor with `workers`(one per
+       core by default) processes. They are started by a fork server(or
+       spawned where there is none) instead of being forked from this
+       process: the ui has threads and an sqlite connection open, and a
+       forked worker could deadlock on a lock held by one of them.
+    """
+    import multiprocessing
+    import concurrent.futures
+    method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+    return concurrent.futures.ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context(method)
+    )
+
+
+def format_size(size):
+    """Return `size`(number of bytes) in a readable form; Eg: '1.5 MB'"""
+    for unit in ('bytes', 'KB', 'MB', 'GB'):
+        if size < 1024 or unit == 'GB':
+            break
+        size /= 1024
+    return '{} {}'.format(round(size, 1), unit)
+
+
+def describe_failed_writes(results, limit=10):
+    """Return a message listing files whose tags couldn't be saved.
+       Args:
+            results(list): tagwriter.WriteResult of the files
+            limit(int): max number of files listed
+    """
+    lines = ['{}: {}'.format(os.path.basename(result.path), result.error)
+             for result in results[:limit]]
+    return 'Unable to save tags of {} file(s):\n{}'.format(len(results), '\n'.join(lines))
+
+
 def is_date_in_valid_format(date):
     """See if date string is in a format acceptable by stagger.
        Returns:
@@ -49,9 +98,10 @@ def is_date_in_valid_format(date):
 
 def is_track_number_valid(track):
     """Check if track number is a valid one. `track` must be '' or
-       a number string.
+       a number string that int() accepts('½' and '²' are numeric, but
+       aren't)
     """
-    return track.isnumeric() or track == ''
+    return track.isdecimal() or track == ''
 
 
 def run_if_window_not_empty(update_status_line):
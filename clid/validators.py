@@ -7,6 +7,7 @@
 
 import os
 
+from . import util
 from . import const
 
 
@@ -25,6 +26,21 @@ def true_or_false(test):
         )
 
 
+def integer(test, minimum=0):
+    """Checks whether `test` is a whole number not less than `minimum`.
+       Used by other functions.
+    """
+    if not (test.isdigit() and int(test) >= minimum):
+        raise ValidationError(
+            '"{}" is not valid; value should be a number not less than {}'.format(test, minimum)
+        )
+
+
+def positive_integer(test):
+    """Checks whether `test` is a whole number greater than 0"""
+    integer(test, minimum=1)
+
+
 def music_dir(test):
     """Checks whether `test` exists and is a directory.
        Args:
@@ -53,13 +69,40 @@ def preview_format(test):
             raise ValidationError('"{}" is not a valid format specifier'.format(spec))
 
 
+def search_mode(test):
+    """Checks whether `test` is one of const.SEARCH_MODES"""
+    if test not in const.SEARCH_MODES:
+        raise ValidationError('Acceptable values are {}; "{}" is not valid'.format(
+            ', '.join('"{}"'.format(mode) for mode in const.SEARCH_MODES), test
+        ))
+
+
+def tag(name, value):
+    """Checks whether `value` can be saved as the tag `name`(like 'artist')"""
+    if name not in const.TAG_NAMES:
+        raise ValidationError('"{}" is not a tag'.format(name))
+    if name == 'date' and not util.is_date_in_valid_format(value):
+        raise ValidationError('Date should be of the form YYYY-MM-DD HH:MM:SS')
+    if name == 'track' and not util.is_track_number_valid(value):
+        raise ValidationError('Track number can only take integer values')
+
+
 VALIDATORS = {
     'music_dir': music_dir,
     'vim_mode': true_or_false,
     'smooth_scroll': true_or_false,
     'preview_format': preview_format,
     'use_regex_in_search': true_or_false,
-    'mouse_support': true_or_false
+    'search_mode': search_mode,
+    'mouse_support': true_or_false,
+    'watch_music_dir': true_or_false,
+    'browse_mode': true_or_false,
+    'prefetch_pages': integer,
+    'prefetch_workers': positive_integer,
+    'index_workers': integer,
+    'tag_cache_size': positive_integer,
+    'tag_padding': integer,
+    'write_behind': true_or_false
 }
 
 
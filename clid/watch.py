@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+
+"""Watch a directory tree for added, removed, renamed and modified mp3 files,
+   so that the file list can be updated without rescanning everything.
+   inotify is used on Linux; other systems fall back to polling.
+"""
+
+import os
+import time
+import queue
+import ctypes
+import select
+import struct
+import threading
+import ctypes.util
+
+from . import scan
+
+# kinds of changes put in Watcher.events; all are tuples of (kind, path),
+# except RENAMED which is (RENAMED, old_path, new_path)
+ADDED = 'added'
+REMOVED = 'removed'
+CHANGED = 'changed'
+RENAMED = 'renamed'
+REMOVED_DIR = 'removed_dir'   # path is a directory; all files under it are gone
+RESCAN = 'rescan'             # changes were lost; whole tree has to be read again
+
+# seconds between two scans of PollingWatcher
+POLL_INTERVAL = 5
+# PollingWatcher spends at most about this fraction of the time scanning; a
+# tree which takes long to scan is scanned less often than POLL_INTERVAL
+MAX_POLL_LOAD = 0.1
+
+
+def is_mp3(path):
+    """Check whether `path` is that of an mp3 file(see `scan.is_mp3_name`)"""
+    return scan.is_mp3_name(os.path.basename(path))
+
+
+class Watcher():
+    """Base class for watchers. Changes are collected in a queue by a
+       background thread, and applied later by the ui thread(see `get_events`).
+       Attributes:
+            root(str): abs path of directory being watched
+            events(queue.Queue): changes that have not been applied yet
+    """
+    def __init__(self, root):
+        self.root = root
+        self.events = queue.Queue()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        """Start watching in a background thread. The tree is read by the
+           thread, so this returns at once even for a large tree.
+        """
+        self._thread.start()
+
+    def stop(self):
+        """Stop watching. The thread exits the next time it wakes up."""
+        self._stopped.set()
+
+    def get_events(self):
+        """Return(list) all changes collected since the last call"""
+        events = []
+        while True:
+            try:
+                events.append(self.events.get_nowait())
+            except queue.Empty:
+                return events
+
+    def _run(self):
+        """Body of the background thread"""
+        pass
+
+
+class PollingWatcher(Watcher):
+    """Find changes by scanning the tree every `POLL_INTERVAL` seconds and
+       comparing stat data with the previous scan. A file which disappears
+       while a file with the same inode appears is reported as renamed.
+    """
+    def __init__(self, root):
+        super().__init__(root)
+        self._files = {}
+        self._interval = POLL_INTERVAL
+
+    def _snapshot(self):
+        """Return dict with abs path as key and stat data as value. Large
+           trees are scanned less often(see `MAX_POLL_LOAD`).
+        """
+        started = time.monotonic()
+        files = dict(scan.scan_mp3_files(self.root))
+        self._interval = max(POLL_INTERVAL, (time.monotonic() - started) / MAX_POLL_LOAD)
+        return files
+
+    def _run(self):
+        self._files = self._snapshot()
+        while not self._stopped.wait(self._interval):
+            old, new = self._files, self._snapshot()
+            removed = {(old[path].st_dev, old[path].st_ino): path
+                       for path in old.keys() - new.keys()}
+            for path in new.keys() - old.keys():
+                renamed_from = removed.pop((new[path].st_dev, new[path].st_ino), None)
+                if renamed_from is None:
+                    self.events.put((ADDED, path))
+                else:
+                    self.events.put((RENAMED, renamed_from, path))
+            for path in removed.values():
+                self.events.put((REMOVED, path))
+            for path in old.keys() & new.keys():
+                # a file replaced by another(written elsewhere and renamed over
+                # it) may have the same size and mtime, but not the same inode
+                if (old[path].st_size, old[path].st_mtime_ns, old[path].st_ino) != \
+                        (new[path].st_size, new[path].st_mtime_ns, new[path].st_ino):
+                    self.events.put((CHANGED, path))
+            self._files = new
+
+
+class InotifyWatcher(PollingWatcher):
+    """Find changes using inotify(Linux only), called through ctypes.
+       Every directory in the tree has its own watch; they are added by the
+       background thread. If they can't be(like when the tree has more
+       directories than max_user_watches allows), the tree is polled instead.
+       Raises:
+            OSError: if inotify is not available
+    """
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_DELETE_SELF = 0x00000400
+    IN_Q_OVERFLOW = 0x00004000
+    IN_IGNORED = 0x00008000
+    IN_ISDIR = 0x40000000
+    IN_NONBLOCK = 0o4000
+    IN_CLOEXEC = 0o2000000
+
+    WATCH_MASK = (IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE
+                  | IN_DELETE | IN_DELETE_SELF)
+    EVENT_HEADER = struct.Struct('iIII')   # wd, mask, cookie, length of name
+
+    def __init__(self, root):
+        super().__init__(root)
+        libc_name = ctypes.util.find_library('c')
+        if libc_name is None:
+            raise OSError('libc not found')
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(self._libc, 'inotify_init1'):
+            raise OSError('inotify is not available')
+        self._fd = self._libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        self._dirs = {}   # watch descriptor as key and abs path of dir as value
+
+    def _add_watch(self, path):
+        """Watch a single directory"""
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), self.WATCH_MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_add_watch failed', path)
+        self._dirs[wd] = path
+
+    def _add_tree(self, path, visited=None):
+        """Watch `path` and all directories under it. Symlinks to directories
+           are followed, like `scan.scan_mp3_dirs` does, so every directory
+           that is listed is watched; each directory is watched only once, so
+           symlink cycles are not followed.
+           Args:
+                visited(set): (st_dev, st_ino) of directories already watched
+                    by this call
+        """
+        if visited is None:
+            visited = set()
+        if self._stopped.is_set():
+            return
+        stat = os.stat(path)
+        dir_id = (stat.st_dev, stat.st_ino)
+        if dir_id in visited:
+            return
+        visited.add(dir_id)
+        self._add_watch(path)
+        sub_dirs = []
+        with os.scandir(path) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir():   # follows symlinks
+                        sub_dirs.append(entry.path)
+                except OSError:   # broken symlink, permission denied, etc
+                    pass
+        for sub_dir in sub_dirs:
+            try:
+                self._add_tree(sub_dir, visited)
+            except FileNotFoundError:   # removed while we were looking
+                pass
+
+    def _remove_tree(self, path):
+        """Stop watching `path` and all directories under it"""
+        prefix = os.path.join(path, '')
+        for wd, directory in list(self._dirs.items()):
+            if directory == path or directory.startswith(prefix):
+                self._libc.inotify_rm_watch(self._fd, wd)
+                del self._dirs[wd]
+
+    def _dir_added(self, path):
+        """Watch a directory created in or moved into the tree and report
+           the mp3 files already in it. Directories moved inside the tree keep
+           their watch descriptors; adding them again updates their paths.
+        """
+        try:
+            self._add_tree(path)
+        except OSError:
+            self.events.put((RESCAN, self.root))
+            return
+        for mp3, _ in scan.scan_mp3_files(path):
+            self.events.put((ADDED, mp3))
+
+    def _read_events(self):
+        """Yield (mask, cookie, abs path) of events waiting to be read"""
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return
+        offset = 0
+        while offset < len(data):
+            wd, mask, cookie, length = self.EVENT_HEADER.unpack_from(data, offset)
+            offset += self.EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b'\0'))
+            offset += length
+            if mask & self.IN_Q_OVERFLOW:
+                yield (mask, cookie, None)
+            elif wd in self._dirs:
+                directory = self._dirs[wd]
+                if mask & self.IN_IGNORED:
+                    del self._dirs[wd]   # directory was removed
+                    continue
+                yield (mask, cookie, os.path.join(directory, name) if name else directory)
+
+    def _run(self):
+        try:
+            self._add_tree(self.root)
+        except OSError:   # too many directories, etc
+            os.close(self._fd)
+            self._dirs.clear()
+            super()._run()
+            return
+        try:
+            while not self._stopped.is_set():
+                if not select.select([self._fd], [], [], 0.5)[0]:
+                    continue
+                moved_from = {}   # cookie as key and old path as value
+                for mask, cookie, path in self._read_events():
+                    if path is None:
+                        self.events.put((RESCAN, self.root))
+                    elif mask & self.IN_MOVED_FROM:
+                        moved_from[cookie] = (path, mask & self.IN_ISDIR)
+                    elif mask & self.IN_ISDIR:
+                        if mask & (self.IN_CREATE | self.IN_MOVED_TO):
+                            old = moved_from.pop(cookie, None)
+                            if old is not None:
+                                self.events.put((REMOVED_DIR, old[0]))
+                            self._dir_added(path)
+                        elif mask & self.IN_DELETE:
+                            self.events.put((REMOVED_DIR, path))
+                    elif mask & self.IN_CREATE and os.path.isdir(path):
+                        self._dir_added(path)   # symlink to a directory
+                    elif mask & self.IN_MOVED_TO:
+                        old = moved_from.pop(cookie, (None, 0))[0]
+                        self._file_moved(old, path)
+                    elif is_mp3(path):
+                        if mask & self.IN_CREATE:
+                            self.events.put((ADDED, path))
+                        elif mask & self.IN_CLOSE_WRITE:
+                            self.events.put((CHANGED, path))
+                        elif mask & self.IN_DELETE:
+                            self.events.put((REMOVED, path))
+                # moved out of the watched tree
+                for path, is_dir in moved_from.values():
+                    if is_dir:
+                        self._remove_tree(path)
+                        self.events.put((REMOVED_DIR, path))
+                    elif is_mp3(path):
+                        self.events.put((REMOVED, path))
+        finally:
+            os.close(self._fd)
+
+    def _file_moved(self, old, new):
+        """Report a file moved to `new` from `old`(None if `old` is not in tree)"""
+        if old is not None and is_mp3(old):
+            if is_mp3(new):
+                self.events.put((RENAMED, old, new))
+            else:
+                self.events.put((REMOVED, old))
+        elif is_mp3(new):   # like `song.mp3.part` -> `song.mp3`
+            self.events.put((ADDED, new))
+
+
+def make_watcher(root):
+    """Return a watcher for `root`: an InotifyWatcher if inotify can be used,
+       PollingWatcher otherwise. The watcher is not started, and the tree
+       isn't read until it is.
+    """
+    try:
+        return InotifyWatcher(root)
+    except OSError:
+        return PollingWatcher(root)
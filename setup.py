@@ -104,7 +104,7 @@ setup(
     },
     entry_points={
         'console_scripts': [
-            'clid = clid.__main__:run'
+            'clid = clid.cli:main'
         ]
     }
 )
@@ -0,0 +1,70 @@
+"""Fixtures shared by the tests"""
+
+import os
+import struct
+import time
+
+import configobj
+import pytest
+
+from clid import tagindex
+from clid.database import mp3db
+
+
+def write_mp3(path, title=''):
+    """Write a file holding only an ID3v2.3 tag with `title`(if it isn't '')"""
+    frames = b''
+    if title:
+        data = b'\x03' + title.encode()   # utf-8
+        frames = b'TIT2' + struct.pack('>IH', len(data), 0) + data
+    size = bytes((len(frames) >> shift) & 0x7f for shift in (21, 14, 7, 0))   # syncsafe
+    with open(path, 'wb') as file:
+        file.write(b'ID3\x03\x00\x00' + size + frames)
+
+
+def wait_until(condition, timeout=5):
+    """Call `condition` until it returns True, failing after `timeout` seconds"""
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            pytest.fail('timed out')
+        time.sleep(0.05)
+
+
+class Prefs():
+    """Default settings from config.ini, some of which are changed by tests"""
+    def __init__(self, **changed):
+        config = configobj.ConfigObj(os.path.join(os.path.dirname(mp3db.__file__), '..', 'config.ini'))
+        self.general = dict(config['General'], **changed)
+
+    def get_pref(self, option):
+        return self.general[option]
+
+    def is_option_enabled(self, option):
+        return self.get_pref(option) == 'true'
+
+
+class App():
+    """The parts of `ClidApp` used by Mp3DataBase"""
+    def __init__(self, **prefs):
+        self.prefdb = Prefs(**prefs)
+
+
+@pytest.fixture
+def make_db(tmp_path, monkeypatch):
+    """Return a function which makes an Mp3DataBase of `music_dir` with
+       `prefs`, and its own tag index
+    """
+    index_file, make_index = str(tmp_path / 'index.db'), tagindex.TagIndex
+    monkeypatch.setattr(tagindex, 'TagIndex', lambda: make_index(index_file))
+    made = []
+
+    def make(music_dir, **prefs):
+        db = mp3db.Mp3DataBase(App(music_dir=str(music_dir), **prefs))
+        made.append(db)
+        return db
+    yield make
+    for db in made:
+        db.stop_watching()
+        db.stop_scanning()
+        db.prefetcher.shutdown()
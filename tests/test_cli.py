@@ -0,0 +1,12 @@
+"""Tests for clid.cli"""
+
+import pytest
+
+from clid import cli
+
+
+def test_startup_trace_is_rejected_with_a_command(capsys):
+    with pytest.raises(SystemExit) as exited:
+        cli.main(['--startup-trace', 'index'])
+    assert exited.value.code == 2
+    assert '--startup-trace' in capsys.readouterr().err
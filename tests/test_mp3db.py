@@ -0,0 +1,74 @@
+"""Tests for clid.database.mp3db"""
+
+import time
+
+import pytest
+
+from clid import watch
+from clid import rename
+
+from conftest import write_mp3, wait_until
+
+
+def scan(db):
+    """List `music_dir` of `db`, like the main view does"""
+    db.load_mp3_files_from_music_dir()
+    wait_until(lambda: db.apply_scanned() and db.scanner is None)
+
+
+@pytest.mark.parametrize('titles', [
+    {'a': 'b', 'b': 'c', 'c': 'd'},   # chain: c->d, b->c, a->b
+    {'a': 'c', 'b': 'b', 'c': 'a'},   # cycle: a->c, c->a
+])
+def test_renames_reported_by_watcher_are_not_applied_again(tmp_path, make_db, titles):
+    music = tmp_path / 'music'
+    music.mkdir()
+    for name, title in titles.items():
+        write_mp3(str(music / (name + '.mp3')), title)
+    db = make_db(music, watch_music_dir='true')
+    scan(db)
+    if not isinstance(db.watcher, watch.InotifyWatcher):
+        pytest.skip('inotify is not available')
+    time.sleep(0.5)   # watches are added by the watcher's thread
+    for name in list(db.mp3_basenames):
+        db.get_tag_record(name)
+
+    plan = rename.make_plan('%t', [str(music / (name + '.mp3')) for name in titles],
+                            get_record=db.get_known_tag_record, existing=db.rows_by_name)
+    done, failed = rename.run_plan(plan)
+    assert not failed
+    db.rename_files(done)
+    time.sleep(1)   # for the watcher to report the renames
+    db.apply_fs_events()
+    assert not db.own_events
+
+    assert sorted(db.mp3_basenames) == sorted(title + '.mp3' for title in titles.values())
+    for title in titles.values():
+        assert db.get_tag_record(title + '.mp3').title == title
+        assert db.get_tag_record(title + '.mp3', force=True).title == title
+
+
+def test_files_saved_by_clid_are_not_read_again(tmp_path, make_db):
+    music = tmp_path / 'music'
+    music.mkdir()
+    for name in ('saved', 'edited'):
+        write_mp3(str(music / (name + '.mp3')), 'old')
+    db = make_db(music, watch_music_dir='true')
+    scan(db)
+    if not isinstance(db.watcher, watch.InotifyWatcher):
+        pytest.skip('inotify is not available')
+    time.sleep(0.5)   # watches are added by the watcher's thread
+
+    for name in ('saved', 'edited'):
+        path = str(music / (name + '.mp3'))
+        write_mp3(path, 'new')   # like tagwriter does
+        db.set_tag_record(path, db.get_tag_record(name + '.mp3')._replace(title='new'))
+    write_mp3(str(music / 'edited.mp3'), 'other')   # by another program
+    time.sleep(1)   # for the watcher to report the writes
+    assert db.apply_fs_events()
+
+    saved = str(music / 'saved.mp3')
+    assert db.library.get_tags(db.rows_by_name['saved.mp3']).title == 'new'
+    assert db.tag_index.get(saved) is not None
+    assert db.library.get_tags(db.rows_by_name['edited.mp3']) is None
+    assert db.get_tag_record('edited.mp3', force=True).title == 'other'
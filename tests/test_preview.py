@@ -0,0 +1,23 @@
+"""Tests for clid.preview"""
+
+from clid import preview
+from clid import readtag
+
+
+def make_record(**tags):
+    return readtag.TagRecord(**dict(dict.fromkeys(readtag.TagRecord._fields, ''), **tags))
+
+
+def test_tags_are_inserted_once():
+    formatter = preview.PreviewFormat('{%a} - %t %x')
+    record = make_record(artist='50%t', title='Song {0}')
+    assert formatter.format(record) == '{50%t} - Song {0} %x'
+
+
+def test_format_many_is_format_of_each_record():
+    formatter = preview.PreviewFormat('%a - %l - %n. %t')
+    records = [make_record(artist='Artist', album='Album {}'.format(number),
+                           track=str(number), title='Title %a')
+               for number in range(5)]
+    assert formatter.format_many(iter(records)) == [formatter.format(record) for record in records]
+    assert formatter.format_many([]) == []
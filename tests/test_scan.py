@@ -0,0 +1,43 @@
+"""Tests for clid.scan"""
+
+import os
+import time
+
+from clid import scan
+from clid import watch
+
+
+def test_hidden_files_are_not_listed(tmp_path):
+    for name in ('song.mp3', 'LOUD.MP3', '._song.mp3', '.clid-rename-x.mp3', 'cover.jpg'):
+        (tmp_path / name).touch()
+    (tmp_path / '.hidden').mkdir()
+    (tmp_path / '.hidden' / 'inside.mp3').touch()
+
+    mp3_files, sub_dirs = scan.list_dir(str(tmp_path))
+    assert sorted(os.path.basename(path) for path, _ in mp3_files) == ['LOUD.MP3', 'song.mp3']
+    assert [os.path.basename(path) for path, _ in sub_dirs] == ['.hidden']
+    found = sorted(os.path.basename(path) for path, _ in scan.scan_mp3_files(str(tmp_path)))
+    assert found == ['LOUD.MP3', 'inside.mp3', 'song.mp3']
+
+
+def test_watcher_ignores_hidden_files():
+    assert watch.is_mp3('/music/song.mp3')
+    assert watch.is_mp3('/music/.hidden/song.mp3')
+    assert not watch.is_mp3('/music/._song.mp3')
+    assert not watch.is_mp3('/music/.clid-rename-song.mp3')
+
+
+def test_directories_are_listed_only_a_little_ahead(tmp_path, monkeypatch):
+    for number in range(100):
+        (tmp_path / str(number)).mkdir()
+        (tmp_path / str(number) / 'song.mp3').touch()
+    listed = []
+    list_dir = scan.list_dir
+    monkeypatch.setattr(scan, 'list_dir', lambda path: listed.append(path) or list_dir(path))
+
+    dirs = scan.scan_mp3_dirs(str(tmp_path), workers=2)
+    next(dirs)
+    time.sleep(0.2)   # let the workers run ahead as far as they can
+    assert len(listed) <= 1 + 2 * 2 + 1
+    assert sum(1 for _ in dirs) == 99
+    assert len(listed) == 101